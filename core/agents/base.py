@@ -1,13 +1,18 @@
+import asyncio
+from functools import partial
 from typing import Any, Callable, Optional
 
 from core.agents.response import AgentResponse
+from core.agents.speculation import Speculation, current_speculation
 from core.config import get_config
 from core.db.models import ProjectState
 from core.llm.base import BaseLLMClient, LLMError
+from core.llm.hedging import HedgedLLMClient
+from core.llm.request_log import LLMRequestLog
 from core.log import get_logger
 from core.proc.process_manager import ProcessManager
 from core.state.state_manager import StateManager
-from core.ui.base import AgentSource, UIBase, UserInput, pythagora_source
+from core.ui.base import AgentSource, UIBase, UISource, UserInput, pythagora_source
 
 log = get_logger(__name__)
 
@@ -38,6 +43,11 @@ class BaseAgent:
         self.process_manager = process_manager
         self.prev_response = prev_response
         self.step = step
+        self.speculation: Optional[Speculation] = None
+        # If set, LLM requests are collected here instead of being logged right away (see DescriptionWorker)
+        self.deferred_requests: Optional[list[LLMRequestLog]] = None
+        # Concurrent requests of the agent may fail at the same time; their errors are handled one by one
+        self.error_handler_lock = asyncio.Lock()
 
     @property
     def current_state(self) -> ProjectState:
@@ -70,6 +80,7 @@ class BaseAgent:
         initial_text: Optional[str] = None,
         allow_empty: bool = False,
         hint: Optional[str] = None,
+        speculate: Optional[Speculation] = None,
     ) -> UserInput:
         """
         Ask a question to the user and return the response.
@@ -85,78 +96,150 @@ class BaseAgent:
         :param allow_empty: Allow empty input.
         :param hint: Text to display in a popup as a hint to the question.
         :param initial_text: Initial text input.
+        :param speculate: LLM call to run speculatively while waiting for the default answer (optional).
         :return: User response.
         """
-        response = await self.ui.ask_question(
-            question,
-            buttons=buttons,
-            default=default,
-            buttons_only=buttons_only,
-            allow_empty=allow_empty,
-            hint=hint,
-            initial_text=initial_text,
-            source=self.ui_source,
-        )
+        speculation = None
+        if speculate and buttons_only and default and get_config().orchestrator.speculative_prefetch:
+            speculation = speculate
+            speculation.start(default)
+
+        # Files can be described in the background while we're waiting for the user
+        worker = self.state_manager.description_worker
+        if worker:
+            worker.set_idle(True)
+        try:
+            response = await self.ui.ask_question(
+                question,
+                buttons=buttons,
+                default=default,
+                buttons_only=buttons_only,
+                allow_empty=allow_empty,
+                hint=hint,
+                initial_text=initial_text,
+                source=self.ui_source,
+            )
+        except BaseException:
+            if speculation:
+                await speculation.discard()
+            raise
+        finally:
+            if worker:
+                worker.set_idle(False)
+
+        if speculation:
+            if speculation.matches(response):
+                await self.discard_speculation()
+                self.speculation = speculation
+            else:
+                await speculation.discard()
+
         await self.state_manager.log_user_input(question, response)
         return response
 
-    async def stream_handler(self, content: str):
+    async def take_speculation(self, name: str) -> Optional[Any]:
+        """
+        Get the result of the speculative LLM call, if the user answered as expected.
+
+        :param name: Name of the speculative call.
+        :return: Result of the call, or None if there's no (successful) speculative call with that name.
+        """
+        if self.speculation is None or self.speculation.name != name:
+            return None
+        speculation, self.speculation = self.speculation, None
+        return await speculation.result()
+
+    async def discard_speculation(self):
+        """
+        Discard the result of the speculative LLM call that wasn't used (if any).
+        """
+        if self.speculation is not None:
+            speculation, self.speculation = self.speculation, None
+            await speculation.discard()
+
+    def sub_source(self, key: str, label: str) -> AgentSource:
+        """
+        Create a UI source for a part of the agent's work.
+
+        When the agent makes several LLM requests concurrently, their output
+        is streamed under separate sources, so the UI can keep them apart.
+
+        :param key: Key of the part, unique within the agent (eg. "epic-1").
+        :param label: Human-readable label of the part (eg. "epic 1").
+        :return: UI source.
+        """
+        return AgentSource(f"{self.display_name} ({label})", f"{self.agent_type}:{key}")
+
+    async def stream_handler(self, content: str, *, source: Optional[UISource] = None):
         """
         Handle streamed response from the LLM.
 
         Serves as a callback to `AgentBase.llm()` so it can stream the responses to the UI.
 
         :param content: Response content.
+        :param source: UI source to stream to (default: the agent's own source).
         """
+        source = source or self.ui_source
 
-        await self.ui.send_stream_chunk(content, source=self.ui_source)
+        await self.ui.send_stream_chunk(content, source=source)
 
         if content is None:
-            await self.ui.send_message("", source=self.ui_source)
+            await self.ui.send_message("", source=source)
 
     async def error_handler(self, error: LLMError, message: Optional[str] = None) -> bool:
         """
         Handle error responses from the LLM.
 
+        If several requests of the agent fail at the same time, the user
+        is asked about them one at a time.
+
         :param error: The exception that was thrown the the LLM client.
         :param message: Optional message to show.
         :return: Whether the request should be retried.
         """
 
-        if error == LLMError.KEY_EXPIRED:
-            await self.ui.send_key_expired(message)
-            answer = await self.ask_question(
-                "Would you like to retry the last step?",
-                buttons={"yes": "Yes", "no": "No"},
-                buttons_only=True,
-            )
-            if answer.button == "yes":
-                return True
-        elif error == LLMError.GENERIC_API_ERROR:
-            await self.stream_handler(message)
-            answer = await self.ui.ask_question(
-                "Would you like to retry the failed request?",
-                buttons={"yes": "Yes", "no": "No"},
-                buttons_only=True,
-                source=pythagora_source,
-            )
-            if answer.button == "yes":
-                return True
-        elif error == LLMError.RATE_LIMITED:
-            await self.stream_handler(message)
-
-        return False
-
-    def get_llm(self, name=None, stream_output=False) -> Callable:
+        if current_speculation.get() is not None:
+            # Don't bother the user about speculative requests, the request will be made again if needed
+            return False
+
+        async with self.error_handler_lock:
+            if error == LLMError.KEY_EXPIRED:
+                await self.ui.send_key_expired(message)
+                answer = await self.ask_question(
+                    "Would you like to retry the last step?",
+                    buttons={"yes": "Yes", "no": "No"},
+                    buttons_only=True,
+                )
+                if answer.button == "yes":
+                    return True
+            elif error == LLMError.GENERIC_API_ERROR:
+                await self.stream_handler(message)
+                answer = await self.ui.ask_question(
+                    "Would you like to retry the failed request?",
+                    buttons={"yes": "Yes", "no": "No"},
+                    buttons_only=True,
+                    source=pythagora_source,
+                )
+                if answer.button == "yes":
+                    return True
+            elif error == LLMError.RATE_LIMITED:
+                await self.stream_handler(message)
+
+            return False
+
+    def get_llm(self, name=None, stream_output=False, source: Optional[UISource] = None) -> Callable:
         """
         Get a new instance of the agent-specific LLM client.
 
         The client initializes the UI stream handler and stores the
         request/response to the current state's log. The agent name
         can be overridden in case the agent needs to use a different
-        model configuration.
+        model configuration. If the agent configuration has a hedging
+        policy, the client hedges stalled requests with a backup model.
 
         :param name: Name of the agent for configuration (default: class name).
+        :param stream_output: Whether to stream the response to the UI.
+        :param source: UI source to stream the response to (default: the agent's own source).
         :return: LLM client for the agent.
         """
 
@@ -166,9 +249,22 @@ class BaseAgent:
         config = get_config()
 
         llm_config = config.llm_for_agent(name)
-        client_class = BaseLLMClient.for_provider(llm_config.provider)
-        stream_handler = self.stream_handler if stream_output else None
-        llm_client = client_class(llm_config, stream_handler=stream_handler, error_handler=self.error_handler)
+        stream_handler = None
+        if stream_output:
+            stream_handler = partial(self.stream_handler, source=source) if source else self.stream_handler
+        hedge = config.hedge_for_agent(name)
+        if hedge:
+            policy, backup_config = hedge
+            llm_client = HedgedLLMClient(
+                llm_config,
+                backup_config,
+                policy,
+                stream_handler=stream_handler,
+                error_handler=self.error_handler,
+            )
+        else:
+            client_class = BaseLLMClient.for_provider(llm_config.provider)
+            llm_client = client_class(llm_config, stream_handler=stream_handler, error_handler=self.error_handler)
 
         async def client(convo, **kwargs) -> Any:
             """
@@ -178,7 +274,13 @@ class BaseAgent:
             see `pythagora.llm.openai_client.OpenAIClient()`.
             """
             response, request_log = await llm_client(convo, **kwargs)
-            await self.state_manager.log_llm_request(request_log, agent=self)
+            speculation = current_speculation.get()
+            if speculation is not None:
+                speculation.record(request_log)
+            if self.deferred_requests is not None:
+                self.deferred_requests.append(request_log)
+            else:
+                await self.state_manager.log_llm_request(request_log, agent=self)
             return response
 
         return client
@@ -1,14 +1,16 @@
 from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
 from core.agents.base import BaseAgent
 from core.agents.convo import AgentConvo
 from core.agents.response import AgentResponse
-from core.config import CHECK_LOGS_AGENT_NAME, magic_words
+from core.config import CHECK_LOGS_AGENT_NAME, get_config, magic_words
 from core.db.models.project_state import IterationStatus
 from core.llm.parser import JSONParser
 from core.log import get_logger
+from core.proc.condenser import OutputCondenser
 from core.telemetry import telemetry
 
 log = get_logger(__name__)
@@ -317,17 +319,36 @@ class BugHunter(BaseAgent):
             0 : (-1 if omit_last_cycle else None)
         ]
 
+        condenser = OutputCondenser(get_config().proc.max_prompt_output_tokens)
         for hunting_cycle in hunting_cycles:
+            backend_logs = self.condense_logs(convo, condenser, hunting_cycle.get("backend_logs"))
+            frontend_logs = self.condense_logs(convo, condenser, hunting_cycle.get("frontend_logs"))
             convo = convo.assistant(hunting_cycle["human_readable_instructions"]).template(
                 "log_data",
-                backend_logs=hunting_cycle.get("backend_logs"),
-                frontend_logs=hunting_cycle.get("frontend_logs"),
+                backend_logs=backend_logs,
+                frontend_logs=frontend_logs,
                 fix_attempted=hunting_cycle.get("fix_attempted"),
                 user_feedback=hunting_cycle.get("user_feedback"),
             )
 
         return convo
 
+    @staticmethod
+    def condense_logs(convo: AgentConvo, condenser: OutputCondenser, logs: Optional[str]) -> Optional[str]:
+        """
+        Condense the logs pasted by the user, recording the tokens saved in the conversation.
+
+        :param convo: Conversation the logs will be added to.
+        :param condenser: Output condenser to use.
+        :param logs: Logs to condense (if any).
+        :return: Condensed logs, or None if there were no logs.
+        """
+        if logs is None:
+            return None
+        condensed = condenser.condense(logs)
+        convo.condensed_tokens_saved += condensed.saved_tokens
+        return condensed.text
+
     def set_data_for_next_hunting_cycle(self, human_readable_instructions, new_status):
         self.next_state.current_iteration["description"] = human_readable_instructions
         self.next_state.current_iteration["bug_hunting_cycles"] += [
@@ -6,12 +6,17 @@ from pydantic import BaseModel, Field
 from core.agents.base import BaseAgent
 from core.agents.convo import AgentConvo
 from core.agents.response import AgentResponse, ResponseType
-from core.config import CODE_MONKEY_AGENT_NAME, DESCRIBE_FILES_AGENT_NAME
+from core.config import CODE_MONKEY_AGENT_NAME, DESCRIBE_FILES_AGENT_NAME, get_config
 from core.llm.parser import JSONParser, OptionalCodeBlockParser
 from core.log import get_logger
 
 log = get_logger(__name__)
 
+# Bump when the describe_file prompt changes, to invalidate the cached descriptions
+DESCRIBER_VERSION = 1
+# Maximum number of files to describe concurrently
+MAX_CONCURRENT_DESCRIPTIONS = 5
+
 
 class FileDescription(BaseModel):
     summary: str = Field(
@@ -68,18 +73,80 @@ class CodeMonkey(BaseAgent):
         response: str = await llm(convo, temperature=0, parser=OptionalCodeBlockParser())
         return AgentResponse.code_review(self, file_name, instructions, file_content, response, attempt)
 
+    def get_describer(self) -> str:
+        """
+        Identify the model and prompt used to describe files.
+
+        Cached descriptions are only reused if made with the same describer.
+
+        :return: Describer identifier.
+        """
+        llm_config = get_config().llm_for_agent(DESCRIBE_FILES_AGENT_NAME)
+        return f"{llm_config.provider.value}/{llm_config.model}/v{DESCRIBER_VERSION}"
+
+    async def describe_file(self, llm, path: str, content: str) -> FileDescription:
+        log.debug(f"Describing file {path}")
+        convo = (
+            AgentConvo(self)
+            .template(
+                "describe_file",
+                path=path,
+                content=content,
+            )
+            .require_schema(FileDescription)
+        )
+        return await llm(convo, parser=JSONParser(spec=FileDescription))
+
     async def describe_files(self) -> AgentResponse:
+        """
+        Describe the files that don't have a description yet.
+
+        Descriptions are looked up in the description cache (by content hash)
+        first, and only the remaining files are described by the LLM, running
+        up to MAX_CONCURRENT_DESCRIPTIONS requests concurrently. Each distinct
+        content is described only once.
+        """
         llm = self.get_llm(DESCRIBE_FILES_AGENT_NAME)
-        to_describe = {
-            file.path: file.content.content for file in self.current_state.files if not file.meta.get("description")
+        describer = self.get_describer()
+        to_describe = {file.path: file for file in self.current_state.get_undescribed_files()}
+
+        content_ids = {file.content_id for file in to_describe.values() if file.content.content != ""}
+        descriptions = {
+            content_id: FileDescription(summary=fd.description, references=fd.references)
+            for content_id, fd in (await self.state_manager.get_file_descriptions(content_ids, describer)).items()
         }
+        if descriptions:
+            log.debug(f"Using {len(descriptions)} cached file descriptions")
+
+        missing = {}
+        for file in to_describe.values():
+            if file.content_id in content_ids and file.content_id not in descriptions:
+                missing.setdefault(file.content_id, file)
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DESCRIPTIONS)
+
+        async def describe(file) -> FileDescription:
+            async with semaphore:
+                return await self.describe_file(llm, file.path, file.content.content)
+
+        # A failed description shouldn't throw away the ones that completed (and were paid for)
+        results = await asyncio.gather(*[describe(file) for file in missing.values()], return_exceptions=True)
+        error = None
+        for content_id, llm_response in zip(missing, results):
+            if isinstance(llm_response, BaseException):
+                error = error or llm_response
+                continue
+            descriptions[content_id] = llm_response
+            await self.state_manager.save_file_description(
+                content_id, describer, llm_response.summary, llm_response.references
+            )
 
         for file in self.next_state.files:
-            content = to_describe.get(file.path)
-            if content is None:
+            current = to_describe.get(file.path)
+            if current is None:
                 continue
 
-            if content == "":
+            if current.content.content == "":
                 file.meta = {
                     **file.meta,
                     "description": "Empty file",
@@ -87,21 +154,15 @@ class CodeMonkey(BaseAgent):
                 }
                 continue
 
-            log.debug(f"Describing file {file.path}")
-            convo = (
-                AgentConvo(self)
-                .template(
-                    "describe_file",
-                    path=file.path,
-                    content=content,
-                )
-                .require_schema(FileDescription)
-            )
-            llm_response: FileDescription = await llm(convo, parser=JSONParser(spec=FileDescription))
-
+            description = descriptions.get(current.content_id)
+            if description is None:
+                continue
             file.meta = {
                 **file.meta,
-                "description": llm_response.summary,
-                "references": llm_response.references,
+                "description": description.summary,
+                "references": description.references,
             }
+
+        if error is not None:
+            raise error
         return AgentResponse.done(self)
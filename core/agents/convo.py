@@ -16,6 +16,38 @@ if TYPE_CHECKING:
 
 log = get_logger(__name__)
 
+# Serialized (dereferenced) JSON schemas, by model class
+_schema_cache: dict[type[BaseModel], str] = {}
+
+
+def get_schema_text(model: type[BaseModel]) -> str:
+    """
+    Get the JSON schema for the model, in the form shown to the LLM.
+
+    We want to make the schema as simple as possible to avoid confusing the LLM,
+    so we remove (dereference) all the refs we can and show the "final" schema version.
+
+    The schema only depends on the model class, so it's computed once and cached.
+
+    :param model: Pydantic model class.
+    :return: JSON schema text.
+    """
+    schema_txt = _schema_cache.get(model)
+    if schema_txt is not None:
+        return schema_txt
+
+    def remove_defs(d):
+        if isinstance(d, dict):
+            return {k: remove_defs(v) for k, v in d.items() if k != "$defs"}
+        elif isinstance(d, list):
+            return [remove_defs(v) for v in d]
+        else:
+            return d
+
+    schema_txt = json.dumps(remove_defs(jsonref.loads(json.dumps(model.model_json_schema()))))
+    _schema_cache[model] = schema_txt
+    return schema_txt
+
 
 class AgentConvo(Convo):
     prompt_loader: Optional[JinjaFileTemplate] = None
@@ -86,6 +118,7 @@ class AgentConvo(Convo):
         child = AgentConvo(self.agent_instance)
         child.messages = deepcopy(self.messages)
         child.prompt_log = deepcopy(self.prompt_log)
+        child.condensed_tokens_saved = self.condensed_tokens_saved
         return child
 
     def trim(self, trim_index: int, trim_count: int) -> "AgentConvo":
@@ -98,17 +131,7 @@ class AgentConvo(Convo):
         return self
 
     def require_schema(self, model: BaseModel) -> "AgentConvo":
-        def remove_defs(d):
-            if isinstance(d, dict):
-                return {k: remove_defs(v) for k, v in d.items() if k != "$defs"}
-            elif isinstance(d, list):
-                return [remove_defs(v) for v in d]
-            else:
-                return d
-
-        # We want to make the schema as simple as possible to avoid confusing the LLM,
-        # so we remove (dereference) all the refs we can and show the "final" schema version.
-        schema_txt = json.dumps(remove_defs(jsonref.loads(json.dumps(model.model_json_schema()))))
+        schema_txt = get_schema_text(model)
         self.user(
             f"IMPORTANT: Your response MUST conform to this JSON schema:\n```\n{schema_txt}\n```."
             f"YOU MUST NEVER add any additional fields to your response, and NEVER add additional preamble like 'Here is your JSON'."
@@ -0,0 +1,193 @@
+import asyncio
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from core.agents.code_monkey import MAX_CONCURRENT_DESCRIPTIONS, CodeMonkey, FileDescription
+from core.config import DESCRIBE_FILES_AGENT_NAME
+from core.llm.base import LLMError
+from core.log import get_logger
+
+if TYPE_CHECKING:
+    from core.db.models import File, ProjectState
+    from core.state.state_manager import StateManager
+    from core.ui.base import UIBase
+
+log = get_logger(__name__)
+
+
+class DescriptionWorker:
+    """
+    Describe project files in the background, while waiting for the user.
+
+    Instead of describing new and changed files as a blocking step after
+    each commit, the Orchestrator schedules them here. The files are
+    described (by the same LLM and prompt as `CodeMonkey.describe_files`)
+    only while the UI is waiting for user input, eg. while the user is
+    testing the app, so the background requests don't compete with the
+    agent's own LLM requests. Requests that are already running when the
+    user responds are allowed to finish.
+
+    Descriptions are merged into the next project state (and stored in the
+    description cache) on the next commit, by `apply()`.
+
+    The database session isn't safe to use concurrently, so the background
+    requests don't touch it: their LLM request logs are kept aside and,
+    like the description cache lookups and stores, only written to the
+    database by `schedule()` and `apply()`, called from the Orchestrator.
+    The background requests don't interact with the user either: failed
+    requests aren't retried, and the files are described again later.
+    """
+
+    def __init__(self, state_manager: "StateManager", ui: "UIBase"):
+        """
+        Create a new description worker.
+
+        :param state_manager: State manager.
+        :param ui: User interface (not used by the background requests).
+        """
+        self.state_manager = state_manager
+        self.agent = CodeMonkey(state_manager, ui)
+        self.agent.error_handler = self._error_handler
+        self.agent.deferred_requests = []
+        # Content ID -> (path, content) of the files waiting to be described
+        self.pending: dict[str, tuple[str, str]] = {}
+        # Content ID -> description of the described files, waiting to be applied
+        self.results: dict[str, FileDescription] = {}
+        self.running: set[str] = set()
+        self.idle = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether there are files waiting to be (or being) described."""
+        return bool(self.pending or self.running)
+
+    async def schedule(self, files: Iterable["File"]) -> int:
+        """
+        Schedule the files without a description to be described in the background.
+
+        Descriptions found in the description cache are applied to the next
+        state immediately, and empty files are described as such.
+
+        :param files: Project files (usually from the current state).
+        :return: Number of files scheduled for the background description.
+        """
+        missing = [file for file in files if not file.meta.get("description")]
+        if not missing:
+            return 0
+
+        describer = self.agent.get_describer()
+        content_ids = {file.content_id for file in missing if file.content.content != ""}
+        cached = await self.state_manager.get_file_descriptions(content_ids, describer)
+        for content_id, fd in cached.items():
+            self.results[content_id] = FileDescription(summary=fd.description, references=fd.references)
+        await self.apply(self.state_manager.next_state, store=False)
+
+        empty_files = {file.path for file in missing if file.content.content == ""}
+        for file in self.state_manager.next_state.files:
+            if file.path in empty_files and not (file.meta or {}).get("description"):
+                file.meta = {**(file.meta or {}), "description": "Empty file", "references": []}
+
+        for file in missing:
+            content_id = file.content_id
+            if content_id in content_ids and content_id not in self.results and content_id not in self.running:
+                self.pending.setdefault(content_id, (file.path, file.content.content))
+
+        if self.pending and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+        return len(self.pending)
+
+    def set_idle(self, idle: bool):
+        """
+        Mark the UI as idle (waiting for user input) or busy.
+
+        :param idle: Whether the UI is idle.
+        """
+        if idle:
+            self.idle.set()
+        else:
+            self.idle.clear()
+
+    @staticmethod
+    async def _error_handler(error: LLMError, message: Optional[str] = None) -> bool:
+        # The user is busy answering a foreground question, so don't ask them about retrying
+        log.debug(f"Background description request failed ({error.value}): {message}")
+        return False
+
+    async def _run(self):
+        llm = self.agent.get_llm(DESCRIBE_FILES_AGENT_NAME)
+
+        async def describe_next():
+            while self.pending:
+                await self.idle.wait()
+                if not self.pending:
+                    break
+                content_id, (path, content) = self.pending.popitem()
+                self.running.add(content_id)
+                try:
+                    self.results[content_id] = await self.agent.describe_file(llm, path, content)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:  # noqa
+                    log.warning(f"Error describing file {path} in the background: {err}", exc_info=True)
+                finally:
+                    self.running.discard(content_id)
+
+        await asyncio.gather(*[describe_next() for _ in range(MAX_CONCURRENT_DESCRIPTIONS)])
+
+    async def apply(self, state: "ProjectState", *, store: bool = True) -> int:
+        """
+        Merge the descriptions made so far into the project state.
+
+        :param state: Project state to update (usually the next state).
+        :param store: Whether to store the new descriptions in the description cache.
+        :return: Number of files updated.
+        """
+        requests, self.agent.deferred_requests = self.agent.deferred_requests, []
+        for request_log in requests:
+            await self.state_manager.log_llm_request(request_log, agent=self.agent)
+
+        if not self.results:
+            return 0
+
+        n_applied = 0
+        for file in state.files:
+            if (file.meta or {}).get("description"):
+                continue
+            description = self.results.get(file.content_id)
+            if description is None:
+                continue
+            file.meta = {
+                **(file.meta or {}),
+                "description": description.summary,
+                "references": description.references,
+            }
+            n_applied += 1
+
+        if store:
+            describer = self.agent.get_describer()
+            for content_id, description in self.results.items():
+                await self.state_manager.save_file_description(
+                    content_id, describer, description.summary, description.references
+                )
+            self.results = {}
+
+        if n_applied:
+            log.debug(f"Applied {n_applied} file descriptions made in the background")
+        return n_applied
+
+    async def stop(self):
+        """
+        Stop the worker, cancelling any running requests.
+
+        Descriptions that weren't applied yet (and their LLM request logs) are lost.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.pending = {}
+        self.results = {}
+        self.agent.deferred_requests = []
+
+
+__all__ = ["DescriptionWorker"]
@@ -8,10 +8,11 @@ from core.agents.base import BaseAgent
 from core.agents.convo import AgentConvo
 from core.agents.mixins import RelevantFilesMixin
 from core.agents.response import AgentResponse, ResponseType
+from core.agents.speculation import Speculation
 from core.config import TASK_BREAKDOWN_AGENT_NAME
 from core.db.models.project_state import IterationStatus, TaskStatus
 from core.db.models.specification import Complexity
-from core.llm.parser import JSONParser
+from core.llm.parser import StreamingJSONParser
 from core.log import get_logger
 from core.telemetry import telemetry
 
@@ -162,7 +163,7 @@ class Developer(RelevantFilesMixin, BaseAgent):
             .template("parse_task")
             .require_schema(TaskSteps)
         )
-        response: TaskSteps = await llm(convo, parser=JSONParser(TaskSteps), temperature=0)
+        response: TaskSteps = await llm(convo, parser=StreamingJSONParser(TaskSteps), temperature=0)
 
         self.set_next_steps(response, source)
 
@@ -217,15 +218,15 @@ class Developer(RelevantFilesMixin, BaseAgent):
 
         current_task_index = self.current_state.tasks.index(current_task)
 
-        llm = self.get_llm(TASK_BREAKDOWN_AGENT_NAME, stream_output=True)
-        convo = AgentConvo(self).template(
-            "breakdown",
-            task=current_task,
-            iteration=None,
-            current_task_index=current_task_index,
-            docs=self.current_state.docs,
-        )
-        response: str = await llm(convo)
+        convo = self.breakdown_convo()
+        response = await self.take_speculation("breakdown")
+        if response is not None:
+            # Prefetched while the user was confirming the task, show it as if it was streamed
+            await self.stream_handler(response)
+            await self.stream_handler(None)
+        else:
+            llm = self.get_llm(TASK_BREAKDOWN_AGENT_NAME, stream_output=True)
+            response: str = await llm(convo)
 
         await self.get_relevant_files(None, response)
 
@@ -237,7 +238,7 @@ class Developer(RelevantFilesMixin, BaseAgent):
 
         llm = self.get_llm()
         convo.assistant(response).template("parse_task").require_schema(TaskSteps)
-        response: TaskSteps = await llm(convo, parser=JSONParser(TaskSteps), temperature=0)
+        response: TaskSteps = await llm(convo, parser=StreamingJSONParser(TaskSteps), temperature=0)
 
         # There might be state leftovers from previous tasks that we need to clean here
         self.next_state.modified_files = {}
@@ -287,6 +288,40 @@ class Developer(RelevantFilesMixin, BaseAgent):
             ]
         log.debug(f"Next steps: {self.next_state.unfinished_steps}")
 
+    def breakdown_convo(self) -> AgentConvo:
+        """
+        Prepare the conversation asking the LLM to break down the current task.
+
+        :return: Agent conversation.
+        """
+        current_task = self.current_state.current_task
+        return AgentConvo(self).template(
+            "breakdown",
+            task=current_task,
+            iteration=None,
+            current_task_index=self.current_state.tasks.index(current_task),
+            docs=self.current_state.docs,
+        )
+
+    async def speculate_breakdown(self) -> str:
+        """
+        Break down the current task speculatively, before the user confirms it.
+
+        :return: Task breakdown (instructions).
+        """
+        llm = self.get_llm(TASK_BREAKDOWN_AGENT_NAME)
+        return await llm(self.breakdown_convo())
+
+    def breakdown_is_next(self) -> bool:
+        """
+        Check whether the task breakdown is the next LLM call if the user confirms the task.
+
+        Otherwise, external docs are fetched or relevant files are selected first.
+        """
+        if self.current_state.docs is None and self.current_state.specification.complexity != Complexity.SIMPLE:
+            return False
+        return not (self.current_state.files and self.current_state.relevant_files is None)
+
     async def ask_to_execute_task(self) -> bool:
         """
         Asks the user to approve, skip or edit the current task.
@@ -308,6 +343,8 @@ class Developer(RelevantFilesMixin, BaseAgent):
             default="yes",
             buttons_only=True,
             hint=description,
+            # Most users just confirm the task, so we can start breaking it down right away
+            speculate=Speculation("breakdown", self.speculate_breakdown) if self.breakdown_is_next() else None,
         )
         if user_response.button == "yes":
             # Execute the task as is
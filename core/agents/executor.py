@@ -1,4 +1,7 @@
+import asyncio
+from copy import deepcopy
 from datetime import datetime, timezone
+from os.path import join
 from typing import Optional
 
 from pydantic import BaseModel, Field
@@ -6,17 +9,26 @@ from pydantic import BaseModel, Field
 from core.agents.base import BaseAgent
 from core.agents.convo import AgentConvo
 from core.agents.response import AgentResponse
+from core.config import get_config
 from core.llm.parser import JSONParser
 from core.log import get_logger
+from core.proc.command_cache import CommandCache
+from core.proc.condenser import OutputCondenser
 from core.proc.exec_log import ExecLog
+from core.proc.planner import plan_concurrent_commands
 from core.proc.process_manager import ProcessManager
+from core.proc.resource_monitor import ResourceMonitor
 from core.state.state_manager import StateManager
-from core.ui.base import AgentSource, UIBase, UISource
+from core.ui.base import UIBase, UISource
 
 log = get_logger(__name__)
 
 CMD_OUTPUT_SOURCE_NAME = "Command output"
 CMD_OUTPUT_SOURCE_TYPE = "cli-output"
+# Where to save the full command output, relative to the project root
+PROCESS_LOG_DIR = join(".gpt-pilot", "logs")
+# Where to save the command cache, relative to the project root
+COMMAND_CACHE_PATH = join(".gpt-pilot", "command-cache.json")
 
 
 class CommandResult(BaseModel):
@@ -44,15 +56,25 @@ class Executor(BaseAgent):
         """
         Create a new Executor agent
         """
-        self.ui_source = AgentSource(self.display_name, self.agent_type)
+        super().__init__(state_manager, ui)
         self.cmd_ui_source = UISource(CMD_OUTPUT_SOURCE_NAME, CMD_OUTPUT_SOURCE_TYPE)
 
-        self.ui = ui
-        self.state_manager = state_manager
+        # Commands started ahead of their step, by step ID
+        self.pending: dict[str, asyncio.Task] = {}
+        root_dir = state_manager.get_full_project_root()
+        proc_config = get_config().proc
         self.process_manager = ProcessManager(
-            root_dir=state_manager.get_full_project_root(),
+            root_dir=root_dir,
             output_handler=self.output_handler,
             exit_handler=self.exit_handler,
+            max_output_size=proc_config.max_output_size,
+            log_dir=join(root_dir, PROCESS_LOG_DIR) if proc_config.spill_output else None,
+            command_cache=(
+                CommandCache(state_manager.file_system, join(root_dir, COMMAND_CACHE_PATH))
+                if proc_config.cache_commands
+                else None
+            ),
+            persistent_shell=proc_config.persistent_shell,
         )
 
     def for_step(self, step):
@@ -68,13 +90,15 @@ class Executor(BaseAgent):
     async def exit_handler(self, process):
         pass
 
-    async def run(self) -> AgentResponse:
-        if not self.step:
-            raise ValueError("No current step set (probably an Orchestrator bug)")
+    async def confirm(self, step: dict) -> bool:
+        """
+        Ask the user whether to run the command step.
 
-        options = self.step["command"]
+        :param step: Command step.
+        :return: True if the command should be run.
+        """
+        options = step["command"]
         cmd = options["command"]
-        cmd_name = cmd[:30] + "..." if len(cmd) > 33 else cmd
         timeout = options.get("timeout")
 
         if timeout:
@@ -88,24 +112,209 @@ class Executor(BaseAgent):
             default="yes",
             buttons_only=True,
         )
-        if confirm.button == "no":
+        return confirm.button != "no"
+
+    def discard_stale_commands(self):
+        """
+        Cancel the commands started ahead for steps that are no longer pending.
+
+        This happens if the steps were changed (eg. by the Developer) before
+        we got to them.
+        """
+        step_ids = {step.get("id") for step in self.current_state.unfinished_steps}
+        for step_id in list(self.pending):
+            if step_id not in step_ids:
+                log.debug(f"Cancelling command started ahead for removed step {step_id}")
+                self.pending.pop(step_id).cancel()
+
+    async def stop(self):
+        """
+        Cancel the commands started ahead that haven't been committed yet.
+
+        Their processes are terminated, and their results are lost.
+        """
+        tasks = list(self.pending.values())
+        self.pending = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if tasks:
+            log.debug(f"Cancelled {len(tasks)} command(s) started ahead")
+
+    async def confirm_batch(self, steps: list[dict]) -> list[dict]:
+        """
+        Ask the user whether to run the command steps, in a single question.
+
+        :param steps: Command steps, starting with the current one.
+        :return: The steps to run now: all of them, only the current one, or none.
+        """
+        commands = []
+        for i, step in enumerate(steps):
+            options = step["command"]
+            timeout = options.get("timeout")
+            commands.append(f"{i + 1}. {options['command']}" + (f" ({timeout}s timeout)" if timeout else ""))
+
+        answer = await self.ask_question(
+            "Can I run these commands? The ones that are independent of each other will run at the same time:\n"
+            + "\n".join(commands),
+            buttons={"yes": "Yes, run all", "first": "Only the first one", "no": "No"},
+            default="yes",
+            buttons_only=True,
+        )
+        if answer.button == "no":
+            return []
+        if answer.button == "first":
+            return steps[:1]
+        return steps
+
+    async def start_concurrent_commands(self) -> Optional[asyncio.Task]:
+        """
+        Start the current command step, along with following commands that are independent of it.
+
+        The user is asked to confirm all the commands at once. The commands
+        they don't confirm (if they only confirm the current one) are asked
+        about again when their steps come up. The results of the commands
+        started ahead are kept in `self.pending` until their steps come up, so
+        they're committed in order. Output of the commands is only streamed to
+        the UI live if a single command is running.
+
+        The output of each command is analyzed against the task and steps as
+        they are now, even if the analysis finishes after the steps change.
+
+        With the persistent shell session enabled, commands are never started
+        ahead, so they all run in the session.
+
+        :return: Task running the current command, or None if the user declined it.
+        """
+        if self.process_manager.shell:
+            # Commands running concurrently couldn't all run in the shell session, and the ones that
+            # don't would miss its state (variables, virtualenv), so they run one at a time
+            batch = []
+        else:
+            batch = plan_concurrent_commands(self.current_state.unfinished_steps)
+        ahead = [step for step in batch[1:] if step.get("id")] if batch and batch[0] is self.step else []
+        if ahead:
+            confirmed = await self.confirm_batch([self.step, *ahead])
+            if not confirmed:
+                return None
+            ahead = confirmed[1:]
+        elif not await self.confirm(self.step):
+            return None
+
+        if ahead:
+            log.info(f"Running {len(ahead) + 1} independent commands concurrently")
+
+        context = (deepcopy(self.current_state.steps), deepcopy(self.current_state.current_task))
+        live = not ahead
+        current = asyncio.create_task(self.execute(self.step, live=live, context=context))
+        for step in ahead:
+            self.pending[step["id"]] = asyncio.create_task(self.execute(step, live=live, context=context))
+        return current
+
+    async def run(self) -> AgentResponse:
+        if not self.step:
+            raise ValueError("No current step set (probably an Orchestrator bug)")
+
+        cmd = self.step["command"]["command"]
+        cmd_name = cmd[:30] + "..." if len(cmd) > 33 else cmd
+        step_id = self.step.get("id")
+        self.discard_stale_commands()
+
+        if step_id in self.pending:
+            task = self.pending.pop(step_id)
+        else:
+            task = await self.start_concurrent_commands()
+
+        if task is None:
             log.info(f"Skipping command execution of `{cmd}` (requested by user)")
             await self.send_message(f"Skipping command {cmd}")
             self.complete()
             self.next_state.action = f'Skip "{cmd_name}"'
             return AgentResponse.done(self)
 
-        started_at = datetime.now(timezone.utc)
-
-        log.info(f"Running command `{cmd}` with timeout {timeout}s")
-        status_code, stdout, stderr = await self.process_manager.run_command(cmd, timeout=timeout)
+        exec_log, live = await task
 
-        llm_response = await self.check_command_output(cmd, timeout, stdout, stderr, status_code)
+        if not exec_log.success and self.pending:
+            # The following commands may depend on this one after all; run them again when their steps come up
+            log.info(f"Command `{cmd}` failed, cancelling the {len(self.pending)} command(s) started ahead")
+            await self.stop()
 
-        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
+        if not live:
+            # The command was run concurrently with others; show its output now, in order
+            await self.send_message(f"Ran command {cmd}")
+            await self.output_handler(exec_log.stdout, exec_log.stderr)
 
         self.complete()
         self.next_state.action = f'Run "{cmd_name}"'
+        await self.state_manager.log_command_run(exec_log)
+
+        # FIXME: ErrorHandler isn't debugged with BugHunter - we should move all commands to run before testing and debug them with BugHunter
+        if True or exec_log.success:
+            return AgentResponse.done(self)
+
+        return AgentResponse.error(
+            self,
+            exec_log.analysis,
+            {
+                "cmd": cmd,
+                "timeout": exec_log.timeout,
+                "stdout": exec_log.stdout,
+                "stderr": exec_log.stderr,
+                "status_code": exec_log.status_code,
+            },
+        )
+
+    async def execute(
+        self,
+        step: dict,
+        live: bool = True,
+        context: Optional[tuple[list[dict], Optional[dict]]] = None,
+    ) -> tuple[ExecLog, bool]:
+        """
+        Run the command step and analyze its output.
+
+        :param step: Command step.
+        :param live: Whether to stream the command output and the analysis to the UI.
+        :param context: Task steps and current task to analyze the output against (default: the current ones).
+        :return: Tuple of (execution log, live).
+        """
+        options = step["command"]
+        cmd = options["command"]
+        timeout = options.get("timeout")
+        started_at = datetime.now(timezone.utc)
+
+        usage = None
+        cached = self.process_manager.get_cached_result(cmd)
+        if cached:
+            log.info(f"Using cached result of command `{cmd}` (inputs unchanged since {cached.cached_at})")
+            status_code, stdout, stderr = cached.status_code, cached.stdout, cached.stderr
+            if live:
+                await self.output_handler(stdout, stderr)
+        else:
+            log.info(f"Running command `{cmd}` with timeout {timeout}s")
+            sampling_interval = get_config().proc.resource_sampling_interval
+            monitor = ResourceMonitor(sampling_interval) if sampling_interval else None
+            # The cache was already checked above, so only store the result
+            status_code, stdout, stderr = await self.process_manager.run_command(
+                cmd, timeout=timeout, show_output=live, monitor=monitor
+            )
+            self.process_manager.store_cached_result(cmd, status_code, stdout, stderr)
+            usage = monitor.usage if monitor else None
+
+        task_steps, current_task = context or (None, None)
+        llm_response = await self.check_command_output(
+            cmd,
+            timeout,
+            stdout,
+            stderr,
+            status_code,
+            step=step,
+            stream_output=live,
+            task_steps=task_steps,
+            current_task=current_task,
+        )
+
+        duration = (datetime.now(timezone.utc) - started_at).total_seconds()
 
         exec_log = ExecLog(
             started_at=started_at,
@@ -119,45 +328,48 @@ class Executor(BaseAgent):
             stderr=stderr,
             analysis=llm_response.analysis,
             success=llm_response.success,
+            cached=cached is not None,
+            **(usage.model_dump() if usage else {}),
         )
-        await self.state_manager.log_command_run(exec_log)
-
-        # FIXME: ErrorHandler isn't debugged with BugHunter - we should move all commands to run before testing and debug them with BugHunter
-        if True or llm_response.success:
-            return AgentResponse.done(self)
-
-        return AgentResponse.error(
-            self,
-            llm_response.analysis,
-            {
-                "cmd": cmd,
-                "timeout": timeout,
-                "stdout": stdout,
-                "stderr": stderr,
-                "status_code": status_code,
-            },
-        )
+        return exec_log, live
 
     async def check_command_output(
-        self, cmd: str, timeout: Optional[int], stdout: str, stderr: str, status_code: int
+        self,
+        cmd: str,
+        timeout: Optional[int],
+        stdout: str,
+        stderr: str,
+        status_code: int,
+        *,
+        step: Optional[dict] = None,
+        stream_output: bool = True,
+        task_steps: Optional[list[dict]] = None,
+        current_task: Optional[dict] = None,
     ) -> CommandResult:
-        llm = self.get_llm(stream_output=True)
+        step = step or self.step
+        if task_steps is None:
+            task_steps, current_task = self.current_state.steps, self.current_state.current_task
+        llm = self.get_llm(stream_output=stream_output)
+        condenser = OutputCondenser(get_config().proc.max_prompt_output_tokens)
+        condensed_stdout = condenser.condense(stdout)
+        condensed_stderr = condenser.condense(stderr)
         convo = (
             AgentConvo(self)
             .template(
                 "ran_command",
-                task_steps=self.current_state.steps,
-                current_task=self.current_state.current_task,
+                task_steps=task_steps,
+                current_task=current_task,
                 # FIXME: can step ever happen *not* to be in current steps?
-                step_index=self.current_state.steps.index(self.step),
+                step_index=task_steps.index(step),
                 cmd=cmd,
                 timeout=timeout,
-                stdout=stdout,
-                stderr=stderr,
+                stdout=condensed_stdout.text,
+                stderr=condensed_stderr.text,
                 status_code=status_code,
             )
             .require_schema(CommandResult)
         )
+        convo.condensed_tokens_saved += condensed_stdout.saved_tokens + condensed_stderr.saved_tokens
         return await llm(convo, parser=JSONParser(spec=CommandResult), temperature=0)
 
     def complete(self):
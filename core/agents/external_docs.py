@@ -14,6 +14,9 @@ from core.telemetry import telemetry
 
 log = get_logger(__name__)
 
+# Maximum number of docsets to create the queries for concurrently
+MAX_CONCURRENT_DOC_QUERIES = 4
+
 
 class DocQueries(BaseModel):
     queries: list[str]
@@ -107,26 +110,50 @@ class ExternalDocumentation(BaseAgent):
         """Return queries we have to make to the docs API.
 
         Key is the docset_key and value is the list of queries for that docset.
+        Queries for the docsets are created concurrently (up to MAX_CONCURRENT_DOC_QUERIES at a time).
+        Docsets that fail are retried once, after the others are done.
 
         """
-        queries = {}
         await self.send_message("Getting relevant documentation for the following topics:")
-        for k, short_desc in docsets.items():
-            llm = self.get_llm(stream_output=True)
-            convo = (
-                AgentConvo(self)
-                .template(
-                    "create_docs_queries",
-                    short_description=short_desc,
-                    current_task=self.current_state.current_task,
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOC_QUERIES)
+
+        async def create_queries(docset_key: str, short_desc: str) -> DocQueries:
+            async with semaphore:
+                source = self.sub_source(f"docs-{docset_key}", short_desc) if len(docsets) > 1 else None
+                llm = self.get_llm(stream_output=True, source=source)
+                convo = (
+                    AgentConvo(self)
+                    .template(
+                        "create_docs_queries",
+                        short_description=short_desc,
+                        current_task=self.current_state.current_task,
+                    )
+                    .require_schema(DocQueries)
                 )
-                .require_schema(DocQueries)
+                return await llm(convo, parser=JSONParser(spec=DocQueries))
+
+        results = await asyncio.gather(
+            *[create_queries(k, desc) for k, desc in docsets.items()],
+            return_exceptions=True,
+        )
+        # Don't lose the other docsets if some of them failed: retry those (once)
+        keys = list(docsets)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        if failed:
+            log.warning(f"Creating queries for {len(failed)} docsets failed, retrying: {results[failed[0]]}")
+            retried = await asyncio.gather(
+                *[create_queries(keys[i], docsets[keys[i]]) for i in failed],
+                return_exceptions=True,
             )
-            llm_response: DocQueries = await llm(convo, parser=JSONParser(spec=DocQueries))
-            if llm_response.queries:
-                queries[k] = llm_response.queries
+            for i, result in zip(failed, retried):
+                if isinstance(result, BaseException):
+                    raise result
+                results[i] = result
 
-        return queries
+        return {k: llm_response.queries for k, llm_response in zip(docsets, results) if llm_response.queries}
 
     async def _fetch_snippets(self, queries: dict[str, list[str]]) -> list[tuple]:
         """Query the docs API and fetch the documentation snippets.
@@ -7,6 +7,7 @@ from core.agents.response import AgentResponse
 from core.config import GET_RELEVANT_FILES_AGENT_NAME, TROUBLESHOOTER_BUG_REPORT
 from core.llm.parser import JSONParser
 from core.log import get_logger
+from core.state.relevance_index import candidate_recall
 
 log = get_logger(__name__)
 
@@ -62,9 +63,34 @@ class RelevantFilesMixin:
     async def get_relevant_files(
         self, user_feedback: Optional[str] = None, solution_description: Optional[str] = None
     ) -> AgentResponse:
+        """
+        Select the files relevant for the current task.
+
+        The files are first ranked using the lexical relevance index (matching
+        the task description, user feedback and solution against the file
+        paths, descriptions and contents). The top ranked files, along with
+        the files they reference, are pre-selected and listed (by path and
+        size, not content) for the LLM, which only needs to confirm or adjust
+        the selection. If the LLM needs to read files, it can continue
+        iterating as before.
+
+        :param user_feedback: User feedback about the problem (optional).
+        :param solution_description: Description of the solution to implement (optional).
+        :return: Agent response (done).
+        """
         log.debug("Getting relevant files for the current task")
         done = False
-        relevant_files = set()
+        rounds = 0
+
+        current_task = self.current_state.current_task or {}
+        query = "\n".join(filter(None, [current_task.get("description"), user_feedback, solution_description]))
+        candidates = []
+        if query:
+            graph = self.state_manager.get_dependency_graph()
+            candidates = self.state_manager.get_relevance_index().candidates(query, graph=graph)
+        candidate_files = [file for file in self.current_state.files if file.path in candidates]
+        relevant_files = set(candidates)
+
         llm = self.get_llm(GET_RELEVANT_FILES_AGENT_NAME)
         convo = (
             AgentConvo(self)
@@ -73,12 +99,14 @@ class RelevantFilesMixin:
                 user_feedback=user_feedback,
                 solution_description=solution_description,
                 relevant_files=relevant_files,
+                candidate_files=candidate_files,
             )
             .require_schema(RelevantFiles)
         )
 
         while not done and len(convo.messages) < 13:
             llm_response: RelevantFiles = await llm(convo, parser=JSONParser(RelevantFiles), temperature=0)
+            rounds += 1
 
             # Check if there are files to add to the list
             if llm_response.add_files:
@@ -103,4 +131,11 @@ class RelevantFilesMixin:
         relevant_files = [path for path in relevant_files if path in existing_files]
         self.next_state.relevant_files = relevant_files
 
+        recall = candidate_recall(candidates, relevant_files)
+        if recall is not None:
+            log.debug(
+                f"Relevance index proposed {len(candidates)} files, LLM selected {len(relevant_files)} "
+                f"(recall {recall:.0%}, {rounds} rounds)"
+            )
+
         return AgentResponse.done(self)
@@ -5,6 +5,7 @@ from core.agents.base import BaseAgent
 from core.agents.bug_hunter import BugHunter
 from core.agents.code_monkey import CodeMonkey
 from core.agents.code_reviewer import CodeReviewer
+from core.agents.description_worker import DescriptionWorker
 from core.agents.developer import Developer
 from core.agents.error_handler import ErrorHandler
 from core.agents.executor import Executor
@@ -18,6 +19,7 @@ from core.agents.task_completer import TaskCompleter
 from core.agents.tech_lead import TechLead
 from core.agents.tech_writer import TechnicalWriter
 from core.agents.troubleshooter import Troubleshooter
+from core.config import get_config
 from core.db.models.project_state import IterationStatus, TaskStatus
 from core.log import get_logger
 from core.telemetry import telemetry
@@ -37,6 +39,7 @@ class Orchestrator(BaseAgent):
 
     agent_type = "orchestrator"
     display_name = "Orchestrator"
+    description_worker: Optional[DescriptionWorker] = None
 
     async def run(self) -> bool:
         """
@@ -51,6 +54,9 @@ class Orchestrator(BaseAgent):
         self.executor = Executor(self.state_manager, self.ui)
         self.process_manager = self.executor.process_manager
         # self.chat = Chat() TODO
+        if get_config().orchestrator.background_descriptions:
+            self.description_worker = DescriptionWorker(self.state_manager, self.ui)
+            self.state_manager.description_worker = self.description_worker
 
         await self.init_ui()
         await self.offline_changes_check()
@@ -58,20 +64,27 @@ class Orchestrator(BaseAgent):
         # TODO: consider refactoring this into two loop; the outer with one iteration per comitted step,
         # and the inner which runs the agents for the current step until they're done. This would simplify
         # handle_done() and let us do other per-step processing (eg. describing files) in between agent runs.
-        while True:
-            await self.update_stats()
-
-            agent = self.create_agent(response)
-            log.debug(f"Running agent {agent.__class__.__name__} (step {self.current_state.step_index})")
-            response = await agent.run()
-
-            if response.type == ResponseType.EXIT:
-                log.debug(f"Agent {agent.__class__.__name__} requested exit")
-                break
-
-            if response.type == ResponseType.DONE:
-                response = await self.handle_done(agent, response)
-                continue
+        try:
+            while True:
+                await self.update_stats()
+
+                agent = self.create_agent(response)
+                log.debug(f"Running agent {agent.__class__.__name__} (step {self.current_state.step_index})")
+                response = await agent.run()
+                await agent.discard_speculation()
+
+                if response.type == ResponseType.EXIT:
+                    log.debug(f"Agent {agent.__class__.__name__} requested exit")
+                    break
+
+                if response.type == ResponseType.DONE:
+                    response = await self.handle_done(agent, response)
+                    continue
+        finally:
+            await self.executor.stop()
+            if self.description_worker:
+                await self.description_worker.stop()
+                self.state_manager.description_worker = None
 
         # TODO: rollback changes to "next" so they aren't accidentally committed?
         return True
@@ -145,6 +158,8 @@ class Orchestrator(BaseAgent):
             f"{n_finished_iterations}/{n_iterations} iterations, "
             f"{n_finished_steps}/{n_steps} dev steps."
         )
+        if self.description_worker:
+            await self.description_worker.apply(self.next_state)
         await self.state_manager.commit()
 
         # If there are any new or modified files changed outside Pythagora,
@@ -153,9 +168,15 @@ class Orchestrator(BaseAgent):
         import_files_response = await self.import_files()
 
         # If any of the files are missing metadata/descriptions, those need to be filled-in
-        missing_descriptions = [file.path for file in self.current_state.files if not file.meta.get("description")]
-        if missing_descriptions:
-            log.debug(f"Some files are missing descriptions: {', '.join(missing_descriptions)}, requesting analysis")
+        undescribed_files = self.current_state.get_undescribed_files()
+        if undescribed_files:
+            if self.description_worker:
+                n_scheduled = await self.description_worker.schedule(undescribed_files)
+                log.debug(f"Some files are missing descriptions, {n_scheduled} scheduled for background analysis")
+                return import_files_response
+
+            missing_descriptions = ", ".join(file.path for file in undescribed_files)
+            log.debug(f"Some files are missing descriptions: {missing_descriptions}, requesting analysis")
             return AgentResponse.describe_files(self)
 
         return import_files_response
@@ -330,14 +351,9 @@ class Orchestrator(BaseAgent):
                 source,
             )
 
-        total_files = 0
-        total_lines = 0
-        for file in self.current_state.files:
-            total_files += 1
-            total_lines += len(file.content.content.splitlines())
-
-        telemetry.set("num_files", total_files)
-        telemetry.set("num_lines", total_lines)
+        file_stats = self.current_state.file_stats
+        telemetry.set("num_files", file_stats.num_files)
+        telemetry.set("num_lines", file_stats.num_lines)
 
         stats = telemetry.get_project_stats()
         await self.ui.send_project_stats(stats)
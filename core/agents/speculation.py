@@ -0,0 +1,108 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+from core.llm.request_log import LLMRequestLog
+from core.log import get_logger
+from core.telemetry import telemetry
+from core.ui.base import UserInput
+
+log = get_logger(__name__)
+
+# Speculation the current task is running (if any), so the LLM client can account its requests
+current_speculation: ContextVar[Optional["Speculation"]] = ContextVar("current_speculation", default=None)
+
+
+class Speculation:
+    """
+    Likely next LLM call, run in the background while waiting for the user.
+
+    When the agent asks a buttons-only question with a default answer, and
+    knows which LLM call it will make next if the user picks the default
+    (eg. "Do you want to execute the above task?" -> break down the task),
+    it can start that call speculatively, so the response is (partly) ready
+    by the time the user answers. If the user picks another answer, the
+    call is cancelled, or its response discarded.
+
+    The speculative call must not change the project state or interact with
+    the user: it's not streamed, and LLM errors aren't reported to the user
+    (the agent just makes the call again).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Awaitable[Any]]):
+        """
+        Create a new speculation.
+
+        :param name: Name of the call, used by the agent to pick up the result.
+        :param factory: Async function making the LLM call and returning its result.
+        """
+        self.name = name
+        self.factory = factory
+        self.expected: Optional[str] = None
+        # Tokens used by the completed speculative LLM requests
+        self.tokens = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self, expected: str):
+        """
+        Start the speculative call in the background.
+
+        :param expected: Answer (button) the call is speculating on.
+        """
+        self.expected = expected
+        self.task = asyncio.create_task(self._run())
+        telemetry.inc("num_speculations")
+        log.debug(f"Speculatively running {self.name} while waiting for the user")
+
+    async def _run(self) -> Any:
+        # The task runs in a copy of the current context, so this is only visible to the speculative call
+        current_speculation.set(self)
+        return await self.factory()
+
+    def record(self, request_log: LLMRequestLog):
+        """
+        Account an LLM request made by the speculative call.
+
+        :param request_log: Request log of the LLM request.
+        """
+        self.tokens += request_log.prompt_tokens + request_log.completion_tokens
+
+    def matches(self, answer: UserInput) -> bool:
+        """
+        Check whether the user answered as expected.
+
+        :param answer: User response to the question.
+        :return: True if the speculative result can be used.
+        """
+        return not answer.cancelled and answer.button == self.expected
+
+    async def result(self) -> Optional[Any]:
+        """
+        Wait for the speculative call to finish and return its result.
+
+        :return: Result of the call, or None if it failed.
+        """
+        try:
+            result = await self.task
+        except Exception as err:  # noqa
+            log.debug(f"Speculative {self.name} failed, will retry: {err}")
+            telemetry.inc("num_speculation_wasted_tokens", self.tokens)
+            return None
+
+        telemetry.inc("num_speculation_hits")
+        log.debug(f"Using the result of speculative {self.name}")
+        return result
+
+    async def discard(self):
+        """
+        Cancel the speculative call (if still running) and discard its result.
+        """
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        # Tokens of requests cancelled mid-flight aren't known, so aren't counted here
+        telemetry.inc("num_speculation_wasted_tokens", self.tokens)
+        log.debug(f"Discarded speculative {self.name} ({self.tokens} tokens)")
+
+
+__all__ = ["Speculation", "current_speculation"]
@@ -1,3 +1,4 @@
+import asyncio
 from uuid import uuid4
 
 from pydantic import BaseModel, Field
@@ -16,6 +17,9 @@ from core.ui.base import ProjectStage, success_source
 
 log = get_logger(__name__)
 
+# Maximum number of epics broken down concurrently
+MAX_CONCURRENT_EPIC_BREAKDOWNS = 4
+
 
 class Epic(BaseModel):
     description: str = Field(description="Description of an epic.")
@@ -80,14 +84,45 @@ class TechLead(BaseAgent):
         return AgentResponse.done(self)
 
     async def break_down_epics(self):
-        for epic in self.next_state.epics:
-            llm = self.get_llm(stream_output=True)
-            convo = AgentConvo(self).template(
-                "break_down_epic",
-                epic_description=epic["description"],
-            )
-            llm_response = await llm(convo, parser=JSONParser(EpicPlan))
-
+        """
+        Break down the epics into tasks.
+
+        The epics are independent at this point, so they're broken down
+        concurrently (up to MAX_CONCURRENT_EPIC_BREAKDOWNS at a time), each
+        streaming to the UI under its own source. The epic order is kept.
+        Epics that fail are retried once, after the others are done.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_EPIC_BREAKDOWNS)
+        epics = self.next_state.epics
+
+        async def break_down_epic(i: int, epic: dict) -> EpicPlan:
+            async with semaphore:
+                source = self.sub_source(f"epic-{i + 1}", f"epic {i + 1}/{len(epics)}") if len(epics) > 1 else None
+                llm = self.get_llm(stream_output=True, source=source)
+                convo = AgentConvo(self).template(
+                    "break_down_epic",
+                    epic_description=epic["description"],
+                )
+                return await llm(convo, parser=JSONParser(EpicPlan))
+
+        results = await asyncio.gather(
+            *[break_down_epic(i, epic) for i, epic in enumerate(epics)],
+            return_exceptions=True,
+        )
+        # Don't lose the other epics if some of them failed: retry those (once)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        if failed:
+            log.warning(f"Breaking down {len(failed)} of {len(epics)} epics failed, retrying: {results[failed[0]]}")
+            retried = await asyncio.gather(*[break_down_epic(i, epics[i]) for i in failed], return_exceptions=True)
+            for i, result in zip(failed, retried):
+                if isinstance(result, BaseException):
+                    raise result
+                results[i] = result
+
+        for epic, llm_response in zip(epics, results):
             epic["tasks"] = [
                 {
                     "id": uuid4().hex,
@@ -0,0 +1,389 @@
+"""
+Batch mode: create multiple projects without user interaction.
+
+The projects run in a single event loop, concurrently if the database
+allows it: running more than one project at a time requires PostgreSQL,
+with the default SQLite database the projects run one after another
+(see `get_batch_concurrency()`).
+
+Usage: python -m core.cli.batch jobs.json [--concurrency N] [--report report.json]
+"""
+
+import asyncio
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional
+from uuid import UUID
+
+from core.cli.helpers import load_config, parse_llm_endpoint, parse_llm_key
+from core.cli.main import llm_api_check, run_project
+from core.db.session import SessionManager
+from core.db.setup import run_migrations
+from core.llm.client_registry import client_registry
+from core.llm.rate_limiter import rate_limiter
+from core.log import get_logger, setup
+from core.state.state_manager import StateManager
+from core.ui.virtual import VirtualUI
+
+log = get_logger(__name__)
+
+# Default number of projects run concurrently (SQLite databases only allow one)
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass
+class BatchJob:
+    """
+    Project to create in a batch run.
+
+    Attributes:
+    * `name`: Project name.
+    * `inputs`: Scripted user inputs (see `VirtualUI`), eg. the project description.
+    """
+
+    name: str
+    inputs: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome, throughput and latency of a project in a batch run.
+
+    Times are in seconds. LLM usage is as recorded in the database, so
+    requests from the last (uncommitted) step of a failed run are missing.
+    """
+
+    name: str
+    project_id: Optional[UUID] = None
+    success: bool = False
+    error: Optional[str] = None
+    # Time spent waiting for a free slot, and running the project
+    queued: float = 0.0
+    duration: float = 0.0
+    steps: int = 0
+    llm_requests: int = 0
+    llm_errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_time: float = 0.0
+    max_llm_latency: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        """LLM tokens (prompt and completion) processed per second of the project run."""
+        return (self.prompt_tokens + self.completion_tokens) / self.duration if self.duration else 0.0
+
+    @property
+    def avg_llm_latency(self) -> float:
+        """Average duration of an LLM request."""
+        return self.llm_time / self.llm_requests if self.llm_requests else 0.0
+
+
+def load_batch_jobs(path: str) -> list[BatchJob]:
+    """
+    Load the projects to create from a JSON file.
+
+    The file contains a list of objects with the project `name` and the
+    scripted user `inputs`, in the same format as the virtual UI inputs
+    in the configuration, for example:
+
+        [{"name": "todo-app", "inputs": [{"text": "A simple todo app"}, {"button": "continue"}]}]
+
+    :param path: Path to the JSON file.
+    :return: List of batch jobs.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a list of projects in {path}")
+
+    jobs = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or not item.get("name"):
+            raise ValueError(f"Project #{i + 1} in {path} has no name")
+        jobs.append(BatchJob(name=item["name"], inputs=item.get("inputs", [])))
+    return jobs
+
+
+def get_batch_concurrency(db_url: str, concurrency: Optional[int] = None) -> int:
+    """
+    Get the number of projects that can run concurrently with the database.
+
+    Each project keeps its database transaction open while working on a step,
+    and SQLite only allows one writer at a time: once one project writes to
+    the database, the other projects' commits fail with "database is locked".
+    Running more than one project at a time requires eg. PostgreSQL.
+
+    :param db_url: Database URL.
+    :param concurrency: Requested number of concurrent projects (None for the default).
+    :return: Number of concurrent projects.
+    :raises ValueError: If more than one project is requested with a SQLite database.
+    """
+    is_sqlite = db_url.startswith("sqlite")
+    if concurrency is None:
+        return 1 if is_sqlite else DEFAULT_CONCURRENCY
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    if concurrency > 1 and is_sqlite:
+        raise ValueError(
+            "SQLite doesn't support concurrent writes, so batch projects can only run one at a time; "
+            "use --concurrency 1 or a PostgreSQL database (--database)"
+        )
+    return concurrency
+
+
+async def run_batch_project(db: SessionManager, job: BatchJob, timeout: Optional[float] = None) -> BatchResult:
+    """
+    Create and run a single project of the batch.
+
+    The project gets its own state manager (and database session), virtual
+    UI and project folder; the Orchestrator creates its own process manager.
+
+    :param db: Database session manager (its engine is shared).
+    :param job: Project to create.
+    :param timeout: Maximum time (in seconds) to run the project for (None for no limit).
+    :return: Project result, without the LLM usage.
+    """
+    result = BatchResult(name=job.name)
+    ui = VirtualUI(job.inputs, quiet=True)
+    sm = StateManager(db.fork(), ui)
+
+    t0 = monotonic()
+    try:
+        await sm.create_project(job.name)
+        result.project_id = sm.project.id
+        result.success = await asyncio.wait_for(run_project(sm, ui), timeout)
+    except asyncio.TimeoutError:
+        log.warning(f"Batch project {job.name} timed out after {timeout}s")
+        result.error = "timeout"
+        await sm.rollback()
+    except Exception as err:  # noqa
+        log.error(f"Error running batch project {job.name}: {err}", exc_info=True)
+        result.error = str(err)
+        await sm.rollback()
+    finally:
+        result.duration = monotonic() - t0
+        if sm.current_state is not None:
+            result.steps = sm.current_state.step_index
+        if sm.session_manager.session is not None:
+            await sm.session_manager.close()
+
+    if not result.success and result.error is None:
+        result.error = "failed"
+    return result
+
+
+async def run_batch(
+    db: SessionManager,
+    jobs: list[BatchJob],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = None,
+) -> list[BatchResult]:
+    """
+    Run the projects in a single event loop, up to `concurrency` at a time.
+
+    The projects share the database engine, the LLM client connection pools
+    and the LLM rate limiter. Running more than one project at a time
+    requires a database with concurrent writers, ie. PostgreSQL, not SQLite
+    (see `get_batch_concurrency()`).
+
+    :param db: Database session manager.
+    :param jobs: Projects to create.
+    :param concurrency: Maximum number of projects running at the same time.
+    :param timeout: Maximum time (in seconds) to run each project for (None for no limit).
+    :return: Results, in the same order as the jobs.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    t0 = monotonic()
+
+    async def run_job(job: BatchJob) -> BatchResult:
+        async with semaphore:
+            queued = monotonic() - t0
+            log.info(f"Starting batch project {job.name}")
+            result = await run_batch_project(db, job, timeout)
+            result.queued = queued
+            log.info(f"Batch project {job.name} finished in {result.duration:.1f}s (success={result.success})")
+            return result
+
+    results = await asyncio.gather(*[run_job(job) for job in jobs])
+
+    sm = StateManager(db.fork())
+    for result in results:
+        if result.project_id is None:
+            continue
+        usage = await sm.get_llm_usage(result.project_id)
+        result.llm_requests = usage.requests
+        result.llm_errors = usage.errors or 0
+        result.prompt_tokens = usage.prompt_tokens or 0
+        result.completion_tokens = usage.completion_tokens or 0
+        result.llm_time = usage.total_duration or 0.0
+        result.max_llm_latency = usage.max_duration or 0.0
+
+    return results
+
+
+def show_batch_report(results: list[BatchResult], elapsed: float):
+    """
+    Print the per-project throughput and latency of the batch run.
+
+    :param results: Project results.
+    :param elapsed: Wall-clock duration of the whole batch run (in seconds).
+    """
+    n_success = sum(1 for result in results if result.success)
+    print(f"Batch run: {n_success}/{len(results)} projects succeeded in {elapsed:.1f}s")
+    print(
+        f"{'status':>8} {'queued':>8} {'time':>9} {'steps':>6} {'requests':>8} {'errors':>6} "
+        f"{'tokens':>9} {'tok/s':>7} {'avg lat':>8} {'max lat':>8}  project"
+    )
+    for result in results:
+        status = "ok" if result.success else (result.error or "failed")[:8]
+        print(
+            f"{status:>8} {result.queued:>7.1f}s {result.duration:>8.1f}s {result.steps:>6} "
+            f"{result.llm_requests:>8} {result.llm_errors:>6} {result.prompt_tokens + result.completion_tokens:>9} "
+            f"{result.tokens_per_second:>7.1f} {result.avg_llm_latency:>7.1f}s {result.max_llm_latency:>7.1f}s  "
+            f"{result.name}"
+        )
+
+    total_tokens = sum(result.prompt_tokens + result.completion_tokens for result in results)
+    if elapsed:
+        print(
+            f"Total: {total_tokens} tokens, {total_tokens / elapsed:.1f} tokens/s, {len(results) / elapsed:.3f} projects/s"
+        )
+
+
+def parse_batch_arguments() -> Namespace:
+    """
+    Parse the batch mode command-line arguments.
+
+    :return: Parsed arguments.
+    """
+    parser = ArgumentParser(
+        description=(
+            "Create multiple projects without user interaction; running them concurrently "
+            "requires a PostgreSQL database (with SQLite, they run one after another)"
+        )
+    )
+    parser.add_argument("jobs", help="Path to the JSON file with the projects to create")
+    parser.add_argument("--config", help="Path to the configuration file", default="config.json")
+    parser.add_argument("--level", help="Log level (debug,info,warning,error,critical)", required=False)
+    parser.add_argument("--database", help="Database URL", required=False)
+    parser.add_argument(
+        "--concurrency",
+        help=(
+            f"Number of projects to run at the same time (default: {DEFAULT_CONCURRENCY}); "
+            "more than 1 requires PostgreSQL, with SQLite this must be 1 (the default there)"
+        ),
+        type=int,
+        required=False,
+    )
+    parser.add_argument(
+        "--max-llm-requests",
+        help="Maximum number of concurrent LLM requests per provider, across all projects (default: unlimited)",
+        type=int,
+        required=False,
+    )
+    parser.add_argument("--timeout", help="Maximum time (in seconds) to run each project for", type=float)
+    parser.add_argument(
+        "--llm-endpoint",
+        help="Use specific API endpoint for the given provider",
+        type=parse_llm_endpoint,
+        action="append",
+        required=False,
+    )
+    parser.add_argument(
+        "--llm-key",
+        help="Use specific LLM key for the given provider",
+        type=parse_llm_key,
+        action="append",
+        required=False,
+    )
+    parser.add_argument("--no-check", help="Disable initial LLM API check", action="store_true")
+    parser.add_argument("--report", help="Also save the report to this file, in JSON format", required=False)
+    # Used by load_config(), but not applicable in batch mode
+    parser.set_defaults(local_ipc_port=None, local_ipc_host=None)
+    return parser.parse_args()
+
+
+async def async_batch_main(db: SessionManager, jobs: list[BatchJob], args: Namespace) -> bool:
+    """
+    Batch mode coroutine.
+
+    :param db: Database session manager.
+    :param jobs: Projects to create.
+    :param args: Command-line arguments.
+    :return: True if all the projects were created successfully, False otherwise.
+    """
+    if args.max_llm_requests:
+        rate_limiter.configure(max_concurrent=args.max_llm_requests)
+
+    # The API check (and the database migrations) are only done once for all the projects
+    if not args.no_check and not await llm_api_check(VirtualUI([])):
+        print("Batch run cannot start because the LLM API is not reachable.", file=sys.stderr)
+        return False
+
+    t0 = monotonic()
+    results = await run_batch(db, jobs, concurrency=args.concurrency, timeout=args.timeout)
+    elapsed = monotonic() - t0
+    show_batch_report(results, elapsed)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "elapsed": elapsed,
+                    "projects": [
+                        {
+                            **{k: v for k, v in vars(result).items() if k != "project_id"},
+                            "project_id": str(result.project_id) if result.project_id else None,
+                            "tokens_per_second": result.tokens_per_second,
+                            "avg_llm_latency": result.avg_llm_latency,
+                        }
+                        for result in results
+                    ],
+                },
+                f,
+                indent=2,
+            )
+
+    log.debug(f"LLM client pool stats: {client_registry.stats()}")
+    await client_registry.close()
+    return all(result.success for result in results)
+
+
+def run_batch_cli() -> int:
+    args = parse_batch_arguments()
+    config = load_config(args)
+    if not config:
+        return -1
+
+    setup(config.log, force=True)
+    try:
+        args.concurrency = get_batch_concurrency(config.db.url, args.concurrency)
+    except ValueError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return -1
+
+    try:
+        jobs = load_batch_jobs(args.jobs)
+    except (OSError, ValueError) as err:
+        print(f"Error loading batch projects from {args.jobs}: {err}", file=sys.stderr)
+        return -1
+
+    run_migrations(config.db)
+    db = SessionManager(config.db)
+    success = run(async_batch_main(db, jobs, args))
+    return 0 if success else -1
+
+
+__all__ = ["BatchJob", "BatchResult", "get_batch_concurrency", "load_batch_jobs", "run_batch", "run_batch_cli"]
+
+
+if __name__ == "__main__":
+    sys.exit(run_batch_cli())
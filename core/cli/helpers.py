@@ -13,6 +13,8 @@ from core.config.version import get_version
 from core.db.session import SessionManager
 from core.db.setup import run_migrations
 from core.log import setup
+from core.state.dependency_graph import DependencyGraph
+from core.state.relevance_index import RelevanceIndex, candidate_recall
 from core.state.state_manager import StateManager
 from core.ui.base import UIBase
 from core.ui.console import PlainConsoleUI
@@ -96,6 +98,8 @@ def parse_arguments() -> Namespace:
         --email: User's email address, if provided
         --extension-version: Version of the VSCode extension, if used
         --no-check: Disable initial LLM API check
+        --exec-report: Show resource usage of the commands run (in all projects, or the one given with --project)
+        --relevance-report: Show how well the relevance index predicts the relevant files selected by the LLM
     :return: Parsed arguments object.
     """
     version = get_version()
@@ -136,6 +140,16 @@ def parse_arguments() -> Namespace:
     parser.add_argument("--email", help="User's email address", required=False)
     parser.add_argument("--extension-version", help="Version of the VSCode extension", required=False)
     parser.add_argument("--no-check", help="Disable initial LLM API check", action="store_true")
+    parser.add_argument(
+        "--exec-report",
+        help="Show resource usage of the commands run (in all projects, or the one given with --project)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--relevance-report",
+        help="Show how well the relevance index predicts the relevant files selected by the LLM",
+        action="store_true",
+    )
     return parser.parse_args()
 
 
@@ -241,6 +255,88 @@ async def list_projects(db: SessionManager):
             print(f"  - {branch.name} ({branch.id}) - last step: {last_step}")
 
 
+def format_size(size: Optional[int]) -> str:
+    """
+    Format the size in bytes for display.
+
+    :param size: Size in bytes (or None if unknown).
+    :return: Human-readable size, or "-" if unknown.
+    """
+    if size is None:
+        return "-"
+    value = float(size)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if value < 1024 or unit == "GB":
+            break
+        value /= 1024
+    return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+
+
+async def show_exec_report(db: SessionManager, project_id: Optional[UUID] = None):
+    """
+    Print the resource usage of the commands run, by command.
+
+    :param db: Database session manager.
+    :param project_id: Only include the commands run in this project (default: all projects).
+    """
+    sm = StateManager(db)
+    rows = await sm.get_command_usage(project_id)
+
+    print(f"Command resource usage ({sum(row.runs for row in rows)} runs of {len(rows)} commands):")
+    print(
+        f"{'runs':>6} {'cached':>6} {'total':>9} {'max':>8} {'peak RSS':>10} {'CPU':>8} {'read':>10} {'written':>10}  command"
+    )
+    for row in rows:
+        cpu_time = f"{row.cpu_time:.1f}s" if row.cpu_time is not None else "-"
+        print(
+            f"{row.runs:>6} {row.cached or 0:>6} {row.total_duration:>8.1f}s {row.max_duration:>7.1f}s "
+            f"{format_size(row.peak_rss):>10} {cpu_time:>8} {format_size(row.read_bytes):>10} "
+            f"{format_size(row.write_bytes):>10}  {row.cmd}"
+        )
+
+
+async def show_relevance_report(db: SessionManager, project_id: Optional[UUID] = None):
+    """
+    Print the recall of the relevance index against the recorded LLM selections of relevant files.
+
+    For each recorded selection, the relevance index is built from the project
+    files at that step, and queried with the task description. Recall is the
+    fraction of the files selected by the LLM that were proposed by the index,
+    and precision the fraction of the proposed files that the LLM selected.
+
+    :param db: Database session manager.
+    :param project_id: Only include the selections in this project (default: all projects).
+    """
+    sm = StateManager(db)
+    states = await sm.get_relevant_files_selections(project_id)
+
+    recalls = []
+    precisions = []
+    print(f"Relevance index recall on {len(states)} recorded selections:")
+    print(f"{'step':>6} {'files':>6} {'selected':>8} {'proposed':>8} {'recall':>7} {'precision':>9}  task")
+    for state in states:
+        index = RelevanceIndex()
+        index.sync(state.files)
+        graph = DependencyGraph()
+        graph.sync(state.files)
+        candidates = index.candidates(state.current_task.get("description", ""), graph=graph)
+        recall = candidate_recall(candidates, state.relevant_files)
+        precision = candidate_recall(state.relevant_files, candidates)
+        recalls.append(recall)
+        if precision is not None:
+            precisions.append(precision)
+
+        precision_txt = f"{precision:.0%}" if precision is not None else "-"
+        print(
+            f"{state.step_index:>6} {len(state.files):>6} {len(state.relevant_files):>8} {len(candidates):>8} "
+            f"{recall:>7.0%} {precision_txt:>9}  {state.current_task.get('description', '')[:60]}"
+        )
+
+    if recalls:
+        mean_precision = f"{sum(precisions) / len(precisions):.0%}" if precisions else "-"
+        print(f"Mean recall: {sum(recalls) / len(recalls):.0%}, mean precision: {mean_precision}")
+
+
 async def load_project(
     sm: StateManager,
     project_id: Optional[UUID] = None,
@@ -4,11 +4,21 @@ from argparse import Namespace
 from asyncio import run
 
 from core.agents.orchestrator import Orchestrator
-from core.cli.helpers import delete_project, init, list_projects, list_projects_json, load_project, show_config
+from core.cli.helpers import (
+    delete_project,
+    init,
+    list_projects,
+    list_projects_json,
+    load_project,
+    show_config,
+    show_exec_report,
+    show_relevance_report,
+)
 from core.config import LLMProvider, get_config
 from core.db.session import SessionManager
 from core.db.v0importer import LegacyDatabaseImporter
 from core.llm.base import APIError, BaseLLMClient
+from core.llm.client_registry import client_registry
 from core.log import get_logger
 from core.state.state_manager import StateManager
 from core.telemetry import telemetry
@@ -201,6 +211,12 @@ async def async_main(
     elif args.list_json:
         await list_projects_json(db)
         return True
+    elif args.exec_report:
+        await show_exec_report(db, args.project)
+        return True
+    elif args.relevance_report:
+        await show_relevance_report(db, args.project)
+        return True
     if args.show_config:
         show_config()
         return True
@@ -227,6 +243,9 @@ async def async_main(
     await telemetry.send()
     await ui.stop()
 
+    log.debug(f"LLM client pool stats: {client_registry.stats()}")
+    await client_registry.close()
+
     return success
 
 
@@ -2,7 +2,7 @@ from enum import Enum
 from os.path import abspath, dirname, isdir, join
 from typing import Any, Literal, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing_extensions import Annotated
 
 ROOT_DIR = abspath(join(dirname(__file__), "..", ".."))
@@ -109,6 +109,36 @@ class ProviderConfig(_StrictModel):
     )
 
 
+class HedgeConfig(_StrictModel):
+    """
+    Hedging policy for LLM requests.
+
+    If the primary request is stalled (no first token within the timeout,
+    or streaming throughput dropping below the threshold), a backup request
+    is fired using another agent configuration. The first request to finish
+    wins and the other one is cancelled.
+    """
+
+    agent: str = Field(
+        description="Name of the agent configuration (from the `agent` section) to use for the backup request",
+    )
+    first_token_timeout: float = Field(
+        default=10.0,
+        description="Time (in seconds) to wait for the first token before firing the backup request",
+        gt=0.0,
+    )
+    min_throughput: Optional[float] = Field(
+        None,
+        description="Minimum streaming throughput (in characters per second) before firing the backup request",
+        ge=0.0,
+    )
+    throughput_window: float = Field(
+        default=5.0,
+        description="Time window (in seconds) over which the streaming throughput is measured",
+        gt=0.0,
+    )
+
+
 class AgentLLMConfig(_StrictModel):
     """
     Configuration for the various LLMs used by Pythagora.
@@ -125,6 +155,10 @@ class AgentLLMConfig(_StrictModel):
         ge=0.0,
         le=1.0,
     )
+    hedge: Optional[HedgeConfig] = Field(
+        None,
+        description="Optional hedging policy (backup request if the primary one is stalled)",
+    )
 
 
 class LLMConfig(_StrictModel):
@@ -261,6 +295,10 @@ class LocalIPCConfig(_StrictModel):
     type: Literal[UIAdapter.IPC_CLIENT] = UIAdapter.IPC_CLIENT
     host: str = "localhost"
     port: int = 8125
+    compress_modified_files: bool = Field(
+        False,
+        description="Send zlib-compressed (base64-encoded) pages of modified file diffs",
+    )
 
 
 class VirtualUIConfig(_StrictModel):
@@ -307,6 +345,62 @@ class FileSystemConfig(_StrictModel):
     )
 
 
+class ProcessConfig(_StrictModel):
+    """
+    Configuration for running commands in the project.
+    """
+
+    max_output_size: int = Field(
+        1024 * 1024,
+        description="How much (in characters) of each command's stdout and stderr to keep in memory",
+        ge=1024,
+    )
+    spill_output: bool = Field(
+        True,
+        description=(
+            "Save the full output of background processes that outgrows max_output_size to compressed "
+            "log files in the project's .gpt-pilot/logs directory"
+        ),
+    )
+    max_prompt_output_tokens: int = Field(
+        2000,
+        description="Condense command output and logs sent to the LLM to about this many tokens",
+        ge=100,
+    )
+    cache_commands: bool = Field(
+        False,
+        description="Skip re-running setup commands (eg. npm install) whose inputs (manifests, lockfiles) haven't changed",
+    )
+    persistent_shell: bool = Field(
+        False,
+        description="Run commands in a persistent shell session, keeping shell state (variables, virtualenv) between them",
+    )
+    resource_sampling_interval: Optional[float] = Field(
+        0.5,
+        description="How often (in seconds) to sample resource usage (memory, CPU, I/O) of running commands; null to disable",
+        gt=0,
+    )
+    template_dependency_cache: bool = Field(
+        True,
+        description="Cache dependencies installed by project templates in the workspace and reuse them for new projects",
+    )
+
+
+class OrchestratorConfig(_StrictModel):
+    """
+    Configuration for the agent workflow run by the Orchestrator.
+    """
+
+    background_descriptions: bool = Field(
+        True,
+        description="Describe new and changed files in the background while waiting for the user, instead of as a blocking step",
+    )
+    speculative_prefetch: bool = Field(
+        True,
+        description="Start the likely next LLM call while waiting for the user to confirm (eg. a task), and use it if confirmed",
+    )
+
+
 class Config(_StrictModel):
     """
     Pythagora Core configuration
@@ -361,6 +455,15 @@ class Config(_StrictModel):
     db: DBConfig = DBConfig()
     ui: UIConfig = PlainUIConfig()
     fs: FileSystemConfig = FileSystemConfig()
+    proc: ProcessConfig = ProcessConfig()
+    orchestrator: OrchestratorConfig = OrchestratorConfig()
+
+    @model_validator(mode="after")
+    def validate_hedge_agents(self) -> "Config":
+        for name, agent_config in self.agent.items():
+            if agent_config.hedge and agent_config.hedge.agent not in self.agent:
+                raise ValueError(f"Unknown hedge agent '{agent_config.hedge.agent}' for agent '{name}'")
+        return self
 
     def llm_for_agent(self, agent_name: str = "default") -> LLMConfig:
         """
@@ -375,6 +478,21 @@ class Config(_StrictModel):
         provider_config = self.llm[agent_config.provider]
         return LLMConfig.from_provider_and_agent_configs(provider_config, agent_config)
 
+    def hedge_for_agent(self, agent_name: str = "default") -> Optional[tuple[HedgeConfig, LLMConfig]]:
+        """
+        Fetch the hedging policy and the backup LLM configuration for a given agent.
+
+        Uses the same fallback to the 'default' agent as `llm_for_agent()`.
+
+        :return: Tuple of (hedging policy, backup LLM configuration), or None if hedging is not configured.
+        """
+
+        agent_name = agent_name if agent_name in self.agent else "default"
+        hedge = self.agent[agent_name].hedge
+        if hedge is None:
+            return None
+        return hedge, self.llm_for_agent(hedge.agent)
+
     def all_llms(self) -> list[LLMConfig]:
         """
         Get configuration for all defined LLMs.
@@ -8,6 +8,7 @@ from .branch import Branch
 from .exec_log import ExecLog
 from .file import File
 from .file_content import FileContent
+from .file_description import FileDescription
 from .llm_request import LLMRequest
 from .project import Project
 from .project_state import ProjectState
@@ -21,6 +22,7 @@ __all__ = [
     "ExecLog",
     "File",
     "FileContent",
+    "FileDescription",
     "LLMRequest",
     "Project",
     "ProjectState",
@@ -2,7 +2,8 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, inspect
+from sqlalchemy import BigInteger, ForeignKey, Row, case, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -33,6 +34,13 @@ class ExecLog(Base):
     stderr: Mapped[str] = mapped_column()
     analysis: Mapped[str] = mapped_column()
     success: Mapped[bool] = mapped_column()
+    cached: Mapped[bool] = mapped_column(default=False, server_default="0")
+    peak_rss: Mapped[Optional[int]] = mapped_column(BigInteger)
+    cpu_user: Mapped[Optional[float]] = mapped_column()
+    cpu_system: Mapped[Optional[float]] = mapped_column()
+    max_children: Mapped[Optional[int]] = mapped_column()
+    read_bytes: Mapped[Optional[int]] = mapped_column(BigInteger)
+    write_bytes: Mapped[Optional[int]] = mapped_column(BigInteger)
 
     # Relationships
     branch: Mapped["Branch"] = relationship(back_populates="exec_logs", lazy="raise")
@@ -67,6 +75,48 @@ class ExecLog(Base):
             stderr=exec_log.stderr,
             analysis=exec_log.analysis,
             success=exec_log.success,
+            cached=exec_log.cached,
+            peak_rss=exec_log.peak_rss,
+            cpu_user=exec_log.cpu_user,
+            cpu_system=exec_log.cpu_system,
+            max_children=exec_log.max_children,
+            read_bytes=exec_log.read_bytes,
+            write_bytes=exec_log.write_bytes,
         )
         session.add(obj)
         return obj
+
+    @staticmethod
+    async def get_usage_summary(session: AsyncSession, project_id: Optional[UUID] = None) -> list[Row]:
+        """
+        Summarize the command runs and their resource usage, by command.
+
+        Each row has the `cmd`, number of `runs` and `cached` runs, `total_duration`,
+        `max_duration`, `peak_rss`, `cpu_time` (user + system), `read_bytes` and
+        `write_bytes` attributes. Resource usage is None for commands that were
+        run without resource sampling.
+
+        :param session: The SQLAlchemy session.
+        :param project_id: Only include the commands run in this project (default: all projects).
+        :return: Rows ordered by the total duration, longest first.
+        """
+        from core.db.models import Branch
+
+        total_duration = func.sum(ExecLog.duration).label("total_duration")
+        query = select(
+            ExecLog.cmd,
+            func.count(ExecLog.id).label("runs"),
+            func.sum(case((ExecLog.cached, 1), else_=0)).label("cached"),
+            total_duration,
+            func.max(ExecLog.duration).label("max_duration"),
+            func.max(ExecLog.peak_rss).label("peak_rss"),
+            func.sum(ExecLog.cpu_user + ExecLog.cpu_system).label("cpu_time"),
+            func.sum(ExecLog.read_bytes).label("read_bytes"),
+            func.sum(ExecLog.write_bytes).label("write_bytes"),
+        )
+        if project_id is not None:
+            query = query.join(Branch, ExecLog.branch).where(Branch.project_id == project_id)
+        query = query.group_by(ExecLog.cmd).order_by(total_duration.desc())
+
+        result = await session.execute(query)
+        return result.all()
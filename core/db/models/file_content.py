@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import delete, distinct, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,6 +18,9 @@ class FileContent(Base):
 
     # Attributes
     content: Mapped[str] = mapped_column()
+    # Computed when the content is stored (None for content stored before these were added)
+    num_lines: Mapped[Optional[int]] = mapped_column()
+    num_bytes: Mapped[Optional[int]] = mapped_column()
 
     # Relationships
     files: Mapped[list["File"]] = relationship(back_populates="content", lazy="raise")
@@ -42,10 +45,25 @@ class FileContent(Base):
             return fc
 
         fc = cls(id=hash, content=content)
+        fc.count()
         session.add(fc)
 
         return fc
 
+    def count(self) -> tuple[int, int]:
+        """
+        Get the number of lines and bytes (UTF-8 encoded) in the content.
+
+        The counts are computed once and stored with the content, so this is
+        cheap to call repeatedly.
+
+        :return: Tuple of (number of lines, number of bytes).
+        """
+        if self.num_lines is None or self.num_bytes is None:
+            self.num_lines = len(self.content.splitlines())
+            self.num_bytes = len(self.content.encode("utf-8"))
+        return self.num_lines, self.num_bytes
+
     @classmethod
     async def delete_orphans(cls, session: AsyncSession):
         """
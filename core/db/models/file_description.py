@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import ForeignKey, UniqueConstraint, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from core.db.models import Base
+
+
+class FileDescription(Base):
+    """
+    Cached LLM description of a file content.
+
+    Descriptions only depend on the file content (and the model and prompt
+    used to describe it), so they're keyed by the content hash and shared
+    across project states and projects.
+    """
+
+    __tablename__ = "file_descriptions"
+    __table_args__ = (UniqueConstraint("content_id", "describer"),)
+
+    # ID and parent FKs
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    content_id: Mapped[str] = mapped_column(ForeignKey("file_contents.id", ondelete="CASCADE"))
+
+    # Attributes
+    describer: Mapped[str] = mapped_column()
+    description: Mapped[str] = mapped_column()
+    references: Mapped[list[str]] = mapped_column(default=list)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    @classmethod
+    async def get_many(
+        cls, session: AsyncSession, content_ids: Iterable[str], describer: str
+    ) -> dict[str, "FileDescription"]:
+        """
+        Get the cached descriptions of the file contents.
+
+        :param session: The database session.
+        :param content_ids: IDs (hashes) of the file contents.
+        :param describer: Describer (model and prompt version) the descriptions were made with.
+        :return: Cached descriptions, by content ID (contents without a description are omitted).
+        """
+        content_ids = list(set(content_ids))
+        if not content_ids:
+            return {}
+        result = await session.execute(
+            select(FileDescription).where(
+                FileDescription.content_id.in_(content_ids),
+                FileDescription.describer == describer,
+            )
+        )
+        return {fd.content_id: fd for fd in result.scalars().all()}
+
+    @classmethod
+    async def store(
+        cls,
+        session: AsyncSession,
+        content_id: str,
+        describer: str,
+        description: str,
+        references: list[str],
+    ) -> "FileDescription":
+        """
+        Store the file content description in the database.
+
+        If the content is already described by the same describer, returns
+        the existing description instead.
+
+        :param session: The database session.
+        :param content_id: ID (hash) of the file content.
+        :param describer: Describer (model and prompt version) the description was made with.
+        :param description: The file description.
+        :param references: Files referenced by the file.
+        :return: The file description object.
+        """
+        existing = await cls.get_many(session, [content_id], describer)
+        if content_id in existing:
+            return existing[content_id]
+
+        fd = cls(content_id=content_id, describer=describer, description=description, references=references)
+        session.add(fd)
+        return fd
@@ -2,12 +2,13 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, inspect
+from sqlalchemy import ForeignKey, Row, case, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from core.db.models import Base
-from core.llm.request_log import LLMRequestLog
+from core.llm.request_log import LLMRequestLog, LLMRequestStatus
 
 if TYPE_CHECKING:
     from core.agents.base import BaseAgent
@@ -36,6 +37,12 @@ class LLMRequest(Base):
     duration: Mapped[float] = mapped_column()
     status: Mapped[str] = mapped_column()
     error: Mapped[Optional[str]] = mapped_column()
+    # Hedged requests: which request won ("primary" or "backup"), the backup model,
+    # and the (estimated) tokens spent on the losing request
+    hedge_winner: Mapped[Optional[str]] = mapped_column()
+    hedge_model: Mapped[Optional[str]] = mapped_column()
+    wasted_prompt_tokens: Mapped[int] = mapped_column(default=0, server_default="0")
+    wasted_completion_tokens: Mapped[int] = mapped_column(default=0, server_default="0")
 
     # Relationships
     branch: Mapped["Branch"] = relationship(back_populates="llm_requests", lazy="raise")
@@ -76,6 +83,40 @@ class LLMRequest(Base):
             duration=request_log.duration,
             status=request_log.status,
             error=request_log.error,
+            hedge_winner=request_log.hedge_winner if request_log.hedged else None,
+            hedge_model=request_log.hedge_model if request_log.hedged else None,
+            wasted_prompt_tokens=request_log.wasted_prompt_tokens,
+            wasted_completion_tokens=request_log.wasted_completion_tokens,
         )
         session.add(obj)
         return obj
+
+    @staticmethod
+    async def get_usage_summary(session: AsyncSession, project_id: UUID) -> Row:
+        """
+        Summarize the LLM requests made in the project.
+
+        The row has the number of `requests` and `errors`, `prompt_tokens`,
+        `completion_tokens`, `total_duration` and `max_duration` attributes.
+        Sums are None if there were no requests.
+
+        :param session: The SQLAlchemy session.
+        :param project_id: Project ID.
+        :return: Summary row.
+        """
+        from core.db.models import Branch
+
+        query = (
+            select(
+                func.count(LLMRequest.id).label("requests"),
+                func.sum(case((LLMRequest.status != LLMRequestStatus.SUCCESS, 1), else_=0)).label("errors"),
+                func.sum(LLMRequest.prompt_tokens).label("prompt_tokens"),
+                func.sum(LLMRequest.completion_tokens).label("completion_tokens"),
+                func.sum(LLMRequest.duration).label("total_duration"),
+                func.max(LLMRequest.duration).label("max_duration"),
+            )
+            .join(Branch, LLMRequest.branch)
+            .where(Branch.project_id == project_id)
+        )
+        result = await session.execute(query)
+        return result.one()
@@ -1,9 +1,10 @@
 from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import ForeignKey, UniqueConstraint, delete, inspect
+from sqlalchemy import ForeignKey, UniqueConstraint, delete, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.orm.attributes import flag_modified
@@ -46,6 +47,38 @@ class IterationStatus:
     DONE = "done"
 
 
+@dataclass
+class FileStats:
+    """
+    Aggregate statistics of the files in a project state.
+
+    Kept in memory only (not stored in the database), and updated as files
+    are saved to or removed from the state, so it's computed from all the
+    files at most once per loaded state.
+    """
+
+    num_files: int = 0
+    num_lines: int = 0
+    num_bytes: int = 0
+    # Paths of the files that may be missing a description (new or changed files)
+    maybe_undescribed: set[str] = field(default_factory=set)
+
+    def add(self, content: "FileContent", sign: int = 1):
+        """
+        Add (or subtract) a file to the stats.
+
+        :param content: Content of the file.
+        :param sign: 1 to add the file, -1 to subtract it.
+        """
+        num_lines, num_bytes = content.count()
+        self.num_files += sign
+        self.num_lines += sign * num_lines
+        self.num_bytes += sign * num_bytes
+
+    def copy(self) -> "FileStats":
+        return FileStats(self.num_files, self.num_lines, self.num_bytes, set(self.maybe_undescribed))
+
+
 class ProjectState(Base):
     __tablename__ = "project_states"
     __table_args__ = (
@@ -213,6 +246,41 @@ class ProjectState(Base):
             step_index=1,
         )
 
+    @staticmethod
+    async def get_relevant_files_selections(
+        session: AsyncSession, project_id: Optional[UUID] = None
+    ) -> list["ProjectState"]:
+        """
+        Get the project states recording a selection of relevant files for a task.
+
+        The selection is carried over to the following states (until the task
+        is done), so only the first state with each selection is returned.
+
+        :param session: The SQLAlchemy session.
+        :param project_id: Only include the states of this project (default: all projects).
+        :return: List of project states, with their files loaded.
+        """
+        from core.db.models import Branch
+
+        query = select(ProjectState)
+        if project_id is not None:
+            query = query.join(Branch, ProjectState.branch).where(Branch.project_id == project_id)
+        query = query.order_by(ProjectState.branch_id, ProjectState.step_index)
+
+        result = await session.execute(query)
+        states = []
+        seen = set()
+        for state in result.scalars().all():
+            # JSON null and SQL NULL are both possible here, so filter in Python
+            if not state.relevant_files or not state.current_task:
+                continue
+            task = state.current_task
+            key = (state.branch_id, task.get("id") or task.get("description"), tuple(sorted(state.relevant_files)))
+            if key not in seen:
+                seen.add(key)
+                states.append(state)
+        return states
+
     async def create_next_state(self) -> "ProjectState":
         """
         Create the next project state for the branch.
@@ -251,9 +319,16 @@ class ProjectState(Base):
         # NOTE: we only need the await here because of the tests, in live, the
         # load_project() and commit() methods on StateManager make sure that
         # the the files are eagerly loaded.
+        files_by_path = {}
         for file in await self.awaitable_attrs.files:
             clone = file.clone()
             new_state.files.append(clone)
+            files_by_path[clone.path] = clone
+        new_state._files_by_path = files_by_path
+
+        stats = self.__dict__.get("_file_stats")
+        if stats is not None:
+            new_state._file_stats = stats.copy()
 
         return new_state
 
@@ -376,14 +451,23 @@ class ProjectState(Base):
         if "next_state" in self.__dict__:
             raise ValueError("Current state is read-only (already has a next state).")
 
+        stats = self.__dict__.get("_file_stats")
         file = self.get_file_by_path(path)
         if file:
             original_content = file.content.content
+            if stats is not None:
+                stats.add(file.content, -1)
             file.content = content
         else:
             original_content = ""
             file = File(path=path, content=content)
             self.files.append(file)
+            files_by_path = self.__dict__.get("_files_by_path")
+            if files_by_path is not None:
+                files_by_path[path] = file
+        if stats is not None:
+            stats.add(content)
+            stats.maybe_undescribed.add(path)
 
         if path not in self.modified_files and not external:
             self.modified_files[path] = original_content
@@ -394,6 +478,82 @@ class ProjectState(Base):
 
         return file
 
+    def remove_file(self, path: str) -> Optional["File"]:
+        """
+        Remove a file from the project state.
+
+        :param path: The file path.
+        :return: The removed file object, or None if not found.
+        """
+        if "next_state" in self.__dict__:
+            raise ValueError("Current state is read-only (already has a next state).")
+
+        file = self.get_file_by_path(path)
+        if file is None:
+            return None
+
+        self.files.remove(file)
+        self.__dict__.get("_files_by_path", {}).pop(path, None)
+        stats = self.__dict__.get("_file_stats")
+        if stats is not None:
+            stats.add(file.content, -1)
+            stats.maybe_undescribed.discard(path)
+        return file
+
+    @property
+    def file_stats(self) -> FileStats:
+        """
+        Aggregate statistics (number of files, lines, bytes) of the files in the project state.
+
+        Computed from the per-file counts on first use, then updated as files
+        are saved or removed, so this is cheap to call repeatedly.
+        """
+        stats = self.__dict__.get("_file_stats")
+        if stats is None:
+            stats = FileStats()
+            for file in self.files:
+                stats.add(file.content)
+                if not (file.meta or {}).get("description"):
+                    stats.maybe_undescribed.add(file.path)
+            self._file_stats = stats
+        return stats
+
+    @property
+    def _file_index(self) -> dict[str, "File"]:
+        """
+        Files in the project state, by path.
+
+        Built on first use, then updated as files are saved or removed.
+        """
+        files_by_path = self.__dict__.get("_files_by_path")
+        if files_by_path is None:
+            files_by_path = {file.path: file for file in self.files}
+            self._files_by_path = files_by_path
+        return files_by_path
+
+    def get_undescribed_files(self) -> list["File"]:
+        """
+        Get the files missing a description.
+
+        Only new and changed files (and those found missing a description
+        before) are checked, not all the files in the state.
+
+        :return: List of files without a description.
+        """
+        stats = self.file_stats
+        if not stats.maybe_undescribed:
+            return []
+
+        files_by_path = self._file_index
+        undescribed = [
+            file
+            for path in sorted(stats.maybe_undescribed)
+            if (file := files_by_path.get(path)) is not None and not (file.meta or {}).get("description")
+        ]
+        # Forget the files that have been described (or removed) in the meantime
+        stats.maybe_undescribed = {file.path for file in undescribed}
+        return undescribed
+
     async def delete_after(self):
         """
         Delete all states in the branch after this one.
@@ -1,5 +1,7 @@
+from typing import Optional
+
 from sqlalchemy import event
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from core.config import DBConfig
 from core.log import get_logger
@@ -18,21 +20,36 @@ class SessionManager:
     ...     # Do something with the session
     """
 
-    def __init__(self, config: DBConfig):
+    def __init__(self, config: DBConfig, engine: Optional[AsyncEngine] = None):
         """
         Initialize the session manager with the given configuration.
 
         :param config: Database configuration.
+        :param engine: Database engine to use, shared with another session manager (optional).
         """
         self.config = config
-        self.engine = create_async_engine(
-            self.config.url, echo=config.debug_sql, echo_pool="debug" if config.debug_sql else None
-        )
-        self.SessionClass = async_sessionmaker(self.engine, expire_on_commit=False)
         self.session = None
         self.recursion_depth = 0
 
-        event.listen(self.engine.sync_engine, "connect", self._on_connect)
+        if engine is not None:
+            self.engine = engine
+        else:
+            self.engine = create_async_engine(
+                self.config.url, echo=config.debug_sql, echo_pool="debug" if config.debug_sql else None
+            )
+            event.listen(self.engine.sync_engine, "connect", self._on_connect)
+        self.SessionClass = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def fork(self) -> "SessionManager":
+        """
+        Create a new session manager sharing the database engine (and its connection pool).
+
+        Each session manager holds a single session, so concurrently running
+        projects each need their own.
+
+        :return: New session manager.
+        """
+        return SessionManager(self.config, engine=self.engine)
 
     def _on_connect(self, dbapi_connection, _):
         """Connection event handler"""
@@ -3,7 +3,7 @@ import zoneinfo
 from typing import Optional
 
 from anthropic import AsyncAnthropic, RateLimitError
-from httpx import Timeout
+from httpx import AsyncClient, Timeout
 
 from core.config import LLMProvider
 from core.llm.convo import Convo
@@ -21,8 +21,8 @@ MAX_TOKENS_SONNET = 8192
 class AnthropicClient(BaseLLMClient):
     provider = LLMProvider.ANTHROPIC
 
-    def _init_client(self):
-        self.client = AsyncAnthropic(
+    def _create_client(self, http_client: AsyncClient) -> AsyncAnthropic:
+        return AsyncAnthropic(
             api_key=self.config.api_key,
             base_url=self.config.base_url,
             timeout=Timeout(
@@ -30,8 +30,8 @@ class AnthropicClient(BaseLLMClient):
                 connect=self.config.connect_timeout,
                 read=self.config.read_timeout,
             ),
+            http_client=http_client,
         )
-        self.stream_handler = self.stream_handler
 
     def _adapt_messages(self, convo: Convo) -> list[dict[str, str]]:
         """
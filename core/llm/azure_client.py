@@ -1,4 +1,4 @@
-from httpx import Timeout
+from httpx import AsyncClient, Timeout
 from openai import AsyncAzureOpenAI
 
 from core.config import LLMProvider
@@ -12,11 +12,11 @@ class AzureClient(OpenAIClient):
     provider = LLMProvider.AZURE
     stream_options = None
 
-    def _init_client(self):
+    def _create_client(self, http_client: AsyncClient) -> AsyncAzureOpenAI:
         azure_deployment = self.config.extra.get("azure_deployment")
         api_version = self.config.extra.get("api_version")
 
-        self.client = AsyncAzureOpenAI(
+        return AsyncAzureOpenAI(
             api_key=self.config.api_key,
             azure_endpoint=self.config.base_url,
             azure_deployment=azure_deployment,
@@ -26,4 +26,5 @@ class AzureClient(OpenAIClient):
                 connect=self.config.connect_timeout,
                 read=self.config.read_timeout,
             ),
+            http_client=http_client,
         )
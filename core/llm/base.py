@@ -1,7 +1,7 @@
-import asyncio
 import datetime
 import json
 from enum import Enum
+from functools import partial
 from time import time
 from typing import Any, Callable, Optional, Tuple, AsyncGenerator
 
@@ -11,6 +11,9 @@ from openai import OpenAIError, RateLimitError
 from core.config import LLMConfig, LLMProvider
 from core.log import get_logger
 from core.agents.convo import Convo  # Change this line
+from core.llm.client_registry import client_registry
+from core.llm.parser import StreamingJSONParser, StreamingParseError
+from core.llm.rate_limiter import rate_limiter
 from core.llm.request_log import LLMRequestLog, LLMRequestStatus
 from core.errors import APIError
 
@@ -55,6 +58,18 @@ class BaseLLMClient:
         self._init_client()
 
     def _init_client(self):
+        self.client = client_registry.get(self.config, self._create_client)
+
+    def _create_client(self, http_client: httpx.AsyncClient) -> Any:
+        """
+        Create the provider SDK client using the shared HTTP client.
+
+        Implemented in subclasses. Called by the client registry only
+        if there's no existing client for this configuration.
+
+        :param http_client: Pooled HTTP client to use.
+        :return: Provider SDK client.
+        """
         raise NotImplementedError()
 
     async def _make_request(
@@ -68,6 +83,22 @@ class BaseLLMClient:
         """
         raise NotImplementedError()
 
+    async def _feed_parser(self, parser: StreamingJSONParser, stream_handler: Optional[Callable], chunk: Optional[str]):
+        """
+        Stream the response chunk to the original handler and the streaming parser.
+
+        If the parser detects the response is invalid, the (partial) stream is
+        terminated and the parsing error propagates to abort the request.
+        """
+        if stream_handler:
+            await stream_handler(chunk)
+        try:
+            await parser.feed(chunk)
+        except StreamingParseError:
+            if stream_handler and chunk is not None:
+                await stream_handler(None)
+            raise
+
     async def __call__(
         self,
         convo: Convo,
@@ -79,6 +110,10 @@ class BaseLLMClient:
     ) -> Tuple[Any, LLMRequestLog]:
         """
         Invoke the LLM with the given conversation.
+
+        If the parser is a `StreamingJSONParser`, the response is validated
+        while it's being streamed, and the request is aborted (and retried)
+        as soon as the response is known to be invalid.
         """
         import anthropic
         import groq
@@ -93,6 +128,7 @@ class BaseLLMClient:
             model=self.config.model,
             temperature=temperature,
             prompts=convo.prompt_log,
+            condensed_tokens_saved=convo.condensed_tokens_saved,
         )
 
         prompt_length_kb = len(json.dumps(convo.messages).encode("utf-8")) / 1024
@@ -109,6 +145,9 @@ class BaseLLMClient:
         if not supports_streaming:
             self.stream_output = None  # Disable streaming for models that do not support it
 
+        streaming_parser = parser if isinstance(parser, StreamingJSONParser) else None
+        original_stream_handler = self.stream_handler
+
         remaining_retries = max_retries
         while True:
             if remaining_retries == 0:
@@ -135,20 +174,34 @@ class BaseLLMClient:
             request_log.error = None
             response = None
 
+            if streaming_parser:
+                streaming_parser.reset()
+                self.stream_handler = partial(self._feed_parser, streaming_parser, original_stream_handler)
+
             try:
-                # Only pass 'temperature' if the model supports it
-                if supports_temperature:
-                    response, prompt_tokens, completion_tokens = await self._make_request(
-                        convo,
-                        temperature=temperature,
-                        json_mode=json_mode,
-                    )
-                else:
-                    response, prompt_tokens, completion_tokens = await self._make_request(
-                        convo,
-                        temperature=None,  # Do not set temperature
-                        json_mode=json_mode,
-                    )
+                async with rate_limiter.slot(self.provider):
+                    # Only pass 'temperature' if the model supports it
+                    if supports_temperature:
+                        response, prompt_tokens, completion_tokens = await self._make_request(
+                            convo,
+                            temperature=temperature,
+                            json_mode=json_mode,
+                        )
+                    else:
+                        response, prompt_tokens, completion_tokens = await self._make_request(
+                            convo,
+                            temperature=None,  # Do not set temperature
+                            json_mode=json_mode,
+                        )
+            except StreamingParseError as err:
+                partial_response = streaming_parser.text
+                request_log.response = partial_response
+                request_log.error = f"Error parsing response: {err}"
+                request_log.status = LLMRequestStatus.ERROR
+                log.debug(f"Aborted invalid streamed LLM response: {err}, asking LLM to retry")
+                convo.assistant(partial_response or "(empty response)")
+                convo.user(f"Error parsing response: {err}. Please output your response EXACTLY as requested.")
+                continue
             except Exception as err:
                 # Handle all exceptions in a generic way
                 log.warning(f"API error: {err}", exc_info=True)
@@ -161,11 +214,14 @@ class BaseLLMClient:
                         message = f"We've hit {self.config.provider.value} rate limit. Sleeping for {wait_time.seconds} seconds..."
                         if self.error_handler:
                             await self.error_handler(LLMError.RATE_LIMITED, message)
-                        await asyncio.sleep(wait_time.seconds)
+                        # Other requests to this provider (eg. from other projects) wait as well
+                        rate_limiter.backoff(self.provider, wait_time.seconds)
                         continue
                 
                 # For other errors, raise an APIError
                 raise APIError(str(err)) from err
+            finally:
+                self.stream_handler = original_stream_handler
 
             request_log.response = response
 
@@ -174,6 +230,9 @@ class BaseLLMClient:
             if parser:
                 try:
                     response = parser(response)
+                    if getattr(parser, "repaired", False):
+                        request_log.json_repaired = True
+                        log.debug("Invalid JSON in LLM response repaired locally, no need to ask the LLM to retry")
                     break
                 except ValueError as err:
                     request_log.error = f"Error parsing response: {err}"
@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass, field
+from time import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+from core.config import LLMConfig, LLMProvider
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection pool limits for the HTTP client shared by all SDK clients with the same key
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60.0  # seconds
+
+
+@dataclass
+class _RegistryEntry:
+    client: Any
+    http_client: httpx.AsyncClient
+    provider: LLMProvider
+    base_url: Optional[str]
+    loop: Optional[asyncio.AbstractEventLoop]
+    created_at: float = field(default_factory=time)
+    # Number of times the client was handed out (not the number of requests made with it)
+    handouts: int = 0
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of provider SDK clients.
+
+    Creating an SDK client (`AsyncOpenAI`, `AsyncAnthropic`, ...) also creates
+    a new HTTP connection pool, so every new client pays for the TCP and TLS
+    handshakes again. The registry keeps one SDK client per unique provider
+    configuration (provider, base URL, API key, timeouts and extra options)
+    and hands out the same instance to all LLM clients using it.
+
+    This class is a singleton, use the `client_registry` global variable to access it:
+
+    >>> from core.llm.client_registry import client_registry
+    >>> client = client_registry.get(config, lambda http_client: AsyncOpenAI(http_client=http_client))
+
+    On shutdown, close all the clients (and their connection pools) with:
+
+    >>> await client_registry.close()
+    """
+
+    def __init__(self):
+        self.entries: dict[tuple, _RegistryEntry] = {}
+        # Pending closes of clients replaced because they were created in another event loop
+        self.closing: set[asyncio.Future] = set()
+
+    @staticmethod
+    def _key(config: LLMConfig) -> tuple:
+        """
+        Compute the registry key for a given LLM configuration.
+
+        Model and temperature are per-request parameters, so they're not part
+        of the key. The API key is hashed so it's not kept around in plaintext
+        as part of the key.
+
+        :param config: LLM configuration.
+        :return: Registry key.
+        """
+        api_key_hash = hashlib.sha256(config.api_key.encode("utf-8")).hexdigest() if config.api_key else None
+        extra = json.dumps(config.extra, sort_keys=True, default=str) if config.extra else None
+        return (
+            config.provider,
+            config.base_url,
+            api_key_hash,
+            config.connect_timeout,
+            config.read_timeout,
+            extra,
+        )
+
+    @staticmethod
+    def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def create_http_client(config: LLMConfig) -> httpx.AsyncClient:
+        """
+        Create a pooled HTTP client for the given LLM configuration.
+
+        HTTP/2 is used if the optional `h2` package is installed.
+
+        :param config: LLM configuration.
+        :return: HTTP client to pass to the provider SDK.
+        """
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                max(config.connect_timeout, config.read_timeout),
+                connect=config.connect_timeout,
+                read=config.read_timeout,
+            ),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+        )
+
+    def get(self, config: LLMConfig, factory: Callable[[httpx.AsyncClient], Any]) -> Any:
+        """
+        Get (or create) the SDK client for the given LLM configuration.
+
+        The factory is only called if there's no usable client for this
+        configuration yet. It receives the pooled HTTP client and should
+        return the provider SDK client using it.
+
+        HTTP connections are bound to the event loop they were created in,
+        so a client created in another event loop is replaced.
+
+        :param config: LLM configuration.
+        :param factory: Callable creating the SDK client.
+        :return: The (shared) SDK client.
+        """
+        key = self._key(config)
+        loop = self._current_loop()
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.loop is not loop:
+            log.debug(f"Replacing {config.provider.value} client created in a different event loop")
+            self._schedule_close(entry, loop)
+            entry = None
+
+        if entry is None:
+            http_client = self.create_http_client(config)
+            entry = _RegistryEntry(
+                client=factory(http_client),
+                http_client=http_client,
+                provider=config.provider,
+                base_url=config.base_url,
+                loop=loop,
+            )
+            self.entries[key] = entry
+            log.debug(
+                f"Created shared {config.provider.value} client "
+                f"(base_url={config.base_url}, http2={HTTP2_AVAILABLE}), {len(self.entries)} client(s) in registry"
+            )
+
+        entry.handouts += 1
+        return entry.client
+
+    @staticmethod
+    async def _close_entry(entry: _RegistryEntry):
+        try:
+            await entry.http_client.aclose()
+        except Exception as err:  # noqa
+            log.debug(f"Error closing replaced {entry.provider.value} client: {err}")
+
+    def _schedule_close(self, entry: _RegistryEntry, loop: Optional[asyncio.AbstractEventLoop]):
+        """
+        Close the connection pool of a client replaced because it was created in another event loop.
+
+        If that event loop is still running (in another thread), the pool is
+        closed there. Otherwise, the close is scheduled in the current loop
+        (if any); connections bound to a closed loop may not shut down cleanly,
+        but the pool is released either way.
+
+        :param entry: Registry entry being replaced.
+        :param loop: Current event loop.
+        """
+        if entry.loop is not None and entry.loop.is_running() and not entry.loop.is_closed():
+            future = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_entry(entry), entry.loop))
+        elif loop is not None:
+            future = loop.create_task(self._close_entry(entry))
+        else:
+            return
+        self.closing.add(future)
+        future.add_done_callback(self.closing.discard)
+
+    @staticmethod
+    def _pool_stats(http_client: httpx.AsyncClient) -> dict[str, int]:
+        """
+        Get connection statistics for the HTTP client pool.
+
+        This relies on httpx/httpcore internals, so if they're not
+        available, zeroes are returned.
+        """
+        try:
+            connections = http_client._transport._pool.connections
+        except AttributeError:
+            return {"connections": 0, "idle_connections": 0, "http2_connections": 0}
+
+        return {
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            "http2_connections": sum(1 for conn in connections if "HTTP/2" in repr(conn)),
+        }
+
+    def stats(self) -> list[dict[str, Any]]:
+        """
+        Return the statistics for all the clients in the registry.
+
+        Each item contains the provider, base URL, number of times the
+        client was handed out, its age in seconds, and the connection pool
+        statistics (number of total, idle and HTTP/2 connections).
+
+        :return: List of per-client statistics.
+        """
+        now = time()
+        return [
+            {
+                "provider": entry.provider.value,
+                "base_url": entry.base_url,
+                "handouts": entry.handouts,
+                "age": now - entry.created_at,
+                **self._pool_stats(entry.http_client),
+            }
+            for entry in self.entries.values()
+        ]
+
+    async def close(self):
+        """
+        Close all the clients and their connection pools.
+
+        Clients created in another event loop can't be closed cleanly
+        from this one, so they're just dropped. Pending closes of replaced
+        clients are awaited.
+        """
+        loop = self._current_loop()
+        entries = list(self.entries.values())
+        self.entries = {}
+
+        if self.closing:
+            await asyncio.gather(*self.closing, return_exceptions=True)
+
+        for entry in entries:
+            if entry.loop is not None and entry.loop is not loop:
+                continue
+            try:
+                await entry.http_client.aclose()
+            except Exception as err:  # noqa
+                log.warning(f"Error closing {entry.provider.value} client: {err}", exc_info=True)
+
+        if entries:
+            log.debug(f"Closed {len(entries)} shared LLM client(s)")
+
+
+client_registry = ClientRegistry()
+
+
+__all__ = ["ClientRegistry", "client_registry"]
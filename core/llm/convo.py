@@ -7,13 +7,16 @@ class Convo:
     A conversation between a user and a Large Language Model (LLM) assistant.
 
     Holds messages and an optional metadata log (list of dicts with
-    prompt information).
+    prompt information). Agents that condense command output or logs
+    before adding them to the conversation record the (estimated)
+    number of tokens saved in `condensed_tokens_saved`.
     """
 
     ROLES = ["system", "user", "assistant", "function"]
 
     messages: list[dict[str, str]]
     prompt_log: list[dict[str, Any]]
+    condensed_tokens_saved: int
 
     def __init__(self, content: Optional[str] = None):
         """
@@ -23,6 +26,7 @@ class Convo:
         """
         self.messages = []
         self.prompt_log = []
+        self.condensed_tokens_saved = 0
 
         if content is not None:
             self.system(content)
@@ -128,6 +132,7 @@ class Convo:
         child = Convo()
         child.messages = deepcopy(self.messages)
         child.prompt_log = deepcopy(self.prompt_log)
+        child.condensed_tokens_saved = self.condensed_tokens_saved
         return child
 
     def after(self, parent: "Convo") -> "Convo":
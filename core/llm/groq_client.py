@@ -3,7 +3,7 @@ from typing import Optional
 
 import tiktoken
 from groq import AsyncGroq, RateLimitError
-from httpx import Timeout
+from httpx import AsyncClient, Timeout
 
 from core.config import LLMProvider
 from core.llm.base import BaseLLMClient
@@ -17,8 +17,8 @@ tokenizer = tiktoken.get_encoding("cl100k_base")
 class GroqClient(BaseLLMClient):
     provider = LLMProvider.GROQ
 
-    def _init_client(self):
-        self.client = AsyncGroq(
+    def _create_client(self, http_client: AsyncClient) -> AsyncGroq:
+        return AsyncGroq(
             api_key=self.config.api_key,
             base_url=self.config.base_url,
             timeout=Timeout(
@@ -26,6 +26,7 @@ class GroqClient(BaseLLMClient):
                 connect=self.config.connect_timeout,
                 read=self.config.read_timeout,
             ),
+            http_client=http_client,
         )
 
     async def _make_request(
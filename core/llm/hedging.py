@@ -0,0 +1,264 @@
+import asyncio
+import inspect
+from collections import deque
+from functools import partial
+from time import time
+from typing import Any, Callable, Optional
+
+from core.config import HedgeConfig, LLMConfig
+from core.errors import APIError
+from core.llm.base import BaseLLMClient, LLMError
+from core.llm.convo import Convo
+from core.llm.parser import StreamingJSONParser
+from core.llm.request_log import LLMRequestLog
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# How often to check whether the primary request is stalled
+HEDGE_POLL_INTERVAL = 0.05  # seconds
+
+# Rough estimate used for the tokens streamed by a cancelled request
+CHARS_PER_TOKEN = 4
+
+
+class _Racer:
+    """
+    A single request in a hedged race, along with its streaming progress.
+    """
+
+    def __init__(self, name: str, config: LLMConfig):
+        self.name = name
+        self.config = config
+        client_class = BaseLLMClient.for_provider(config.provider)
+        self.client = client_class(config)
+        self.reset()
+
+    def reset(self):
+        self.task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.n_chars = 0
+        self.samples: deque[tuple[float, int]] = deque()
+        self.stream_done = False
+        # Whether the chunks are forwarded to the UI as they arrive
+        self.live = False
+        self.streamed_live = False
+        self.buffer: list[Optional[str]] = []
+        # Original item callback of the streaming parser, and items surfaced while the racer wasn't live
+        self.on_item: Optional[Callable] = None
+        self.item_buffer: list[tuple[str, Any]] = []
+
+    def start(self, convo: Convo, kwargs: dict, on_item: Callable):
+        """
+        Start the request.
+
+        :param convo: Conversation to send.
+        :param kwargs: Arguments for the LLM client call.
+        :param on_item: Item callback for the racer's streaming parser (used if the original parser has one).
+        """
+        parser = kwargs.get("parser")
+        if isinstance(parser, StreamingJSONParser):
+            # The streaming parser keeps the state of the stream, so each racer needs its own
+            self.on_item = parser.on_item
+            kwargs = {**kwargs, "parser": parser.fork(on_item=on_item if parser.on_item else None)}
+        self.started_at = time()
+        self.task = asyncio.create_task(self.client(convo, **kwargs))
+
+    def record_chunk(self, chunk: Optional[str]):
+        now = time()
+        if chunk is None:
+            self.stream_done = True
+            return
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.n_chars += len(chunk)
+        self.samples.append((now, self.n_chars))
+
+    def throughput(self, window: float) -> Optional[float]:
+        """
+        Streaming throughput (characters per second) over the last `window` seconds.
+
+        :return: Throughput, or None if the stream hasn't been running long enough.
+        """
+        now = time()
+        if self.first_token_at is None or now - self.first_token_at < window:
+            return None
+
+        while len(self.samples) > 1 and self.samples[1][0] <= now - window:
+            self.samples.popleft()
+        return (self.n_chars - self.samples[0][1]) / window
+
+
+class HedgedLLMClient:
+    """
+    LLM client that hedges a slow primary request with a backup one.
+
+    The primary request is started right away and streamed to the UI as usual.
+    If it doesn't produce the first token within `first_token_timeout`, or its
+    streaming throughput drops below `min_throughput`, a backup request is
+    started using a different model/provider. Whichever request finishes first
+    wins, and the other one is cancelled.
+
+    The request log of the winning request records the result of the race and
+    the (estimated) tokens wasted on the cancelled request.
+
+    The client is a drop-in replacement for `BaseLLMClient` instances, see
+    `BaseLLMClient.__call__()` for the supported arguments.
+    """
+
+    def __init__(
+        self,
+        primary_config: LLMConfig,
+        backup_config: LLMConfig,
+        policy: HedgeConfig,
+        *,
+        stream_handler: Optional[Callable] = None,
+        error_handler: Optional[Callable] = None,
+    ):
+        self.policy = policy
+        self.stream_handler = stream_handler
+        self.error_handler = error_handler
+        self.primary = _Racer("primary", primary_config)
+        self.backup = _Racer("backup", backup_config)
+        # The racers report chunks back to us, we decide what goes to the UI
+        for racer in (self.primary, self.backup):
+            racer.client.stream_handler = partial(self._on_chunk, racer)
+
+    async def _on_chunk(self, racer: _Racer, chunk: Optional[str]):
+        racer.record_chunk(chunk)
+        if racer.live:
+            racer.streamed_live = True
+            if self.stream_handler:
+                await self.stream_handler(chunk)
+        else:
+            racer.buffer.append(chunk)
+
+    @staticmethod
+    async def _on_item(racer: _Racer, field_name: str, item: Any):
+        # Like the chunks, items only go to the original callback from the live racer
+        if not racer.live:
+            racer.item_buffer.append((field_name, item))
+            return
+        result = racer.on_item(field_name, item)
+        if inspect.isawaitable(result):
+            await result
+
+    def _is_stalled(self, racer: _Racer) -> bool:
+        if racer.stream_done:
+            return False
+
+        if racer.first_token_at is None:
+            return time() - racer.started_at >= self.policy.first_token_timeout
+
+        if self.policy.min_throughput is None:
+            return False
+
+        throughput = racer.throughput(self.policy.throughput_window)
+        return throughput is not None and throughput < self.policy.min_throughput
+
+    async def _flush(self, racer: _Racer):
+        """
+        Send the buffered chunks (and parsed items) of the winning request to the UI.
+        """
+        racer.live = True
+        item_buffer, racer.item_buffer = racer.item_buffer, []
+        for field_name, item in item_buffer:
+            await self._on_item(racer, field_name, item)
+
+        if not self.stream_handler:
+            return
+
+        if racer is self.backup and self.primary.streamed_live and not self.primary.stream_done:
+            # Terminate the partial stream from the cancelled primary request
+            await self.stream_handler(None)
+
+        for chunk in racer.buffer:
+            await self.stream_handler(chunk)
+        racer.buffer = []
+
+    async def _race(self, convo: Convo, kwargs: dict) -> tuple[Any, LLMRequestLog]:
+        primary, backup = self.primary, self.backup
+        primary.reset()
+        backup.reset()
+
+        primary.live = True
+        primary.start(convo, kwargs, partial(self._on_item, primary))
+        racers = {primary.task: primary}
+        pending = {primary.task}
+        hedged = False
+        winner = None
+        last_error = None
+
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if hedged else HEDGE_POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if task.exception() is None:
+                    winner = racers[task]
+                    break
+                last_error = task.exception()
+                log.warning(f"Hedged {racers[task].name} request failed: {last_error}")
+
+            if winner is None and not hedged and pending and self._is_stalled(primary):
+                log.info(
+                    f"Primary request to {primary.config.model} is stalled, "
+                    f"firing backup request to {backup.config.provider.value} {backup.config.model}"
+                )
+                hedged = True
+                primary.live = False
+                backup.start(convo, kwargs, partial(self._on_item, backup))
+                racers[backup.task] = backup
+                pending.add(backup.task)
+
+        if winner is None:
+            raise last_error
+
+        losers = [racer for racer in racers.values() if racer is not winner]
+        for loser in losers:
+            loser.task.cancel()
+        await asyncio.gather(*[loser.task for loser in losers], return_exceptions=True)
+
+        await self._flush(winner)
+        response, request_log = winner.task.result()
+
+        if hedged:
+            request_log.hedged = True
+            request_log.hedge_winner = winner.name
+            request_log.hedge_model = backup.config.model
+            for loser in losers:
+                if loser.task.cancelled():
+                    request_log.wasted_prompt_tokens += request_log.prompt_tokens
+                    request_log.wasted_completion_tokens += loser.n_chars // CHARS_PER_TOKEN
+            log.info(
+                f"Hedged request won by {winner.name} ({winner.config.model}) after {time() - primary.started_at:.2f}s, "
+                f"~{request_log.wasted_prompt_tokens + request_log.wasted_completion_tokens} tokens wasted"
+            )
+
+        return response, request_log
+
+    async def __call__(self, convo: Convo, **kwargs) -> tuple[Any, LLMRequestLog]:
+        """
+        Invoke the LLM with the given conversation, hedging if needed.
+
+        If both the primary and the backup requests fail, the user is asked
+        whether to retry (if the error handler is set).
+        """
+        while True:
+            try:
+                return await self._race(convo, kwargs)
+            except APIError as err:
+                if self.error_handler:
+                    should_retry = await self.error_handler(
+                        LLMError.GENERIC_API_ERROR,
+                        message=f"Error connecting to the LLM: {err.message}",
+                    )
+                    if should_retry:
+                        continue
+                raise
+
+
+__all__ = ["HedgedLLMClient"]
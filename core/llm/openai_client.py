@@ -3,7 +3,7 @@ import re
 from typing import Optional
 
 import tiktoken
-from httpx import Timeout
+from httpx import AsyncClient, Timeout
 from openai import AsyncOpenAI, OpenAIError, RateLimitError
 
 from core.config import LLMProvider
@@ -18,8 +18,8 @@ tokenizer = tiktoken.get_encoding("cl100k_base")
 class OpenAIClient(BaseLLMClient):
     provider = LLMProvider.OPENAI
 
-    def _init_client(self):
-        self.client = AsyncOpenAI(
+    def _create_client(self, http_client: AsyncClient) -> AsyncOpenAI:
+        return AsyncOpenAI(
             api_key=self.config.api_key,
             base_url=self.config.base_url,
             timeout=Timeout(
@@ -27,6 +27,7 @@ class OpenAIClient(BaseLLMClient):
                 connect=self.config.connect_timeout,
                 read=self.config.read_timeout,
             ),
+            http_client=http_client,
         )
 
     async def _make_request(
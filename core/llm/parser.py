@@ -1,9 +1,14 @@
+import inspect
 import json
 import re
 from enum import Enum
-from typing import Optional, Union
+from typing import Annotated, Any, Callable, Optional, Union, get_args, get_origin
 
-from pydantic import BaseModel, ValidationError, create_model
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 
 class MultiCodeBlockParser:
@@ -82,11 +87,179 @@ class OptionalCodeBlockParser:
         return text
 
 
+def _extract_json_text(text: str) -> str:
+    """
+    Extract the part of the text that's supposed to be JSON.
+
+    Takes the contents of the first Markdown code block (even if the
+    closing fence is missing), and skips any text before the first
+    opening bracket.
+    """
+    fence = text.find("```")
+    if fence != -1:
+        start = text.find("\n", fence)
+        if start != -1:
+            end = text.find("```", start)
+            text = text[start + 1 : end if end != -1 else len(text)]
+
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    return text[min(starts) :] if starts else text
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Try to fix common syntax problems in JSON produced by an LLM.
+
+    This is deterministic, local, and doesn't change the content of the
+    values. It handles:
+
+    * text or Markdown code fences (possibly unterminated) around the JSON
+    * `//` and `/* */` comments
+    * trailing commas in objects and arrays
+    * single-quoted strings
+    * unescaped newlines and tabs in strings
+    * truncated responses that end right after a complete value: the open
+      objects/arrays are closed; if part of a value (or key) would have to
+      be dropped, the response isn't repaired, so that the LLM is asked to
+      retry instead of work being lost silently
+
+    Example usage:
+
+    >>> repair_json("Here you go: {'a': [1, 2,], // comment\n 'b': [3, 'four',")
+    '{"a": [1, 2], \n "b": [3, "four"]}'
+
+    :param text: Text that failed to parse as JSON.
+    :return: Repaired JSON text, or None if there's nothing to salvage.
+    """
+    text = _extract_json_text(text)
+
+    out: list[str] = []
+    stack: list[str] = []
+    # Whether the next string in the current object is a key
+    expect_key: list[bool] = []
+    # Output length and open brackets after the last complete value, for truncated responses
+    safe: Optional[tuple[int, tuple[str, ...]]] = None
+
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+
+        if c == '"' or c == "'":
+            # Copy the string, normalizing the quotes and escaping control characters
+            quote = c
+            chars = ['"']
+            i += 1
+            while i < n and text[i] != quote:
+                ch = text[i]
+                if ch == "\\" and i + 1 < n:
+                    nxt = text[i + 1]
+                    chars.append(nxt if nxt == "'" else ch + nxt)
+                    i += 2
+                    continue
+                if ch == '"':
+                    chars.append('\\"')
+                elif ch == "\n":
+                    chars.append("\\n")
+                elif ch == "\t":
+                    chars.append("\\t")
+                elif ch != "\r":
+                    chars.append(ch)
+                i += 1
+            if i >= n:
+                # Truncated inside a string, can't be repaired without losing (part of) it
+                return None
+            chars.append('"')
+            i += 1
+            out.append("".join(chars))
+            if not stack:
+                # A string on its own is a complete JSON value
+                return out[-1]
+            if stack[-1] == "{" and expect_key[-1]:
+                expect_key[-1] = False
+            else:
+                safe = (len(out), tuple(stack))
+            continue
+
+        if c == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = end if end != -1 else n
+            continue
+        if c == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = end + 2 if end != -1 else n
+            continue
+
+        if c == "{" or c == "[":
+            stack.append(c)
+            expect_key.append(c == "{")
+            out.append(c)
+        elif c == "}" or c == "]":
+            if not stack or stack[-1] != ("{" if c == "}" else "["):
+                return None
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            stack.pop()
+            expect_key.pop()
+            out.append(c)
+            if not stack:
+                # Ignore anything after the root value
+                break
+            safe = (len(out), tuple(stack))
+        elif c == ",":
+            if stack:
+                safe = (len(out), tuple(stack))
+                expect_key[-1] = stack[-1] == "{"
+            out.append(c)
+        elif stack or not c.isspace():
+            out.append(c)
+        i += 1
+
+    if stack:
+        if safe is None:
+            return None
+        length, open_brackets = safe
+        if any(not (token.isspace() or token == ",") for token in out[length:]):
+            # Truncated in the middle of a value or member
+            return None
+        out = out[:length]
+        while out and (out[-1].isspace() or out[-1] == ","):
+            out.pop()
+        out.extend("}" if bracket == "{" else "]" for bracket in reversed(open_brackets))
+
+    return "".join(out) if out else None
+
+
+# Models extended with the `original_response` field, by spec class
+_extended_models: dict[type[BaseModel], type[BaseModel]] = {}
+
+
+def get_extended_model(spec: type[BaseModel]) -> type[BaseModel]:
+    """
+    Get the model that includes the spec fields and the original response text.
+
+    Creating a model is expensive, so it's only done once per spec class.
+
+    :param spec: Pydantic model class.
+    :return: Extended model class.
+    """
+    extended_model = _extended_models.get(spec)
+    if extended_model is None:
+        extended_model = create_model(
+            f"Extended{spec.__name__}",
+            original_response=(str, ...),
+            **{field_name: (field.annotation, field.default) for field_name, field in spec.model_fields.items()},
+        )
+        _extended_models[spec] = extended_model
+    return extended_model
+
+
 class JSONParser:
     def __init__(self, spec: Optional[BaseModel] = None, strict: bool = True):
         self.spec = spec
         self.strict = strict or (spec is not None)
         self.original_response = None
+        self.repaired = False
 
     @property
     def schema(self):
@@ -102,25 +275,40 @@ class JSONParser:
             error_txt.append(f"- `{loc}`: {etype} ({msg})")
         return "\n".join(error_txt)
 
+    @staticmethod
+    def _load_json(text: str) -> Any:
+        if text.startswith("```"):
+            text = CodeBlockParser()(text)
+
+        try:
+            return json.loads(text.strip())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON is not valid: {e}") from e
+
+    @staticmethod
+    def _load_repaired_json(text: str) -> Any:
+        repaired = repair_json(text)
+        if repaired is None:
+            raise ValueError("JSON can't be repaired")
+        return json.loads(repaired)
+
     def __call__(self, text: str) -> Union[BaseModel, dict, None]:
         self.original_response = text.strip()  # Store the original text
-        text = self.original_response
-        if text.startswith("```"):
+        # Whether the response had to be repaired locally to be parsed
+        self.repaired = False
+        try:
+            data = self._load_json(self.original_response)
+        except ValueError as err:
             try:
-                text = CodeBlockParser()(text)
+                data = self._load_repaired_json(self.original_response)
             except ValueError:
                 if self.strict:
-                    raise
+                    raise err
                 else:
                     return None
+            log.debug(f"Repaired invalid JSON in LLM response ({err})")
+            self.repaired = True
 
-        try:
-            data = json.loads(text.strip())
-        except json.JSONDecodeError as e:
-            if self.strict:
-                raise ValueError(f"JSON is not valid: {e}") from e
-            else:
-                return None
         if self.spec is None:
             return data
 
@@ -132,19 +320,367 @@ class JSONParser:
         except Exception as err:
             raise ValueError(f"Error parsing JSON: {err}") from err
 
-        # Create a new model that includes the original model fields and the original text
-        ExtendedModel = create_model(
-            f"Extended{self.spec.__name__}",
-            original_response=(str, ...),
-            **{field_name: (field.annotation, field.default) for field_name, field in self.spec.__fields__.items()},
+        # Instantiate the extended model (already validated field values are passed as-is)
+        ExtendedModel = get_extended_model(self.spec)
+        extended_model = ExtendedModel(
+            original_response=self.original_response,
+            **{field_name: getattr(model, field_name) for field_name in self.spec.model_fields},
         )
 
-        # Instantiate the extended model
-        extended_model = ExtendedModel(original_response=self.original_response, **model.dict())
-
         return extended_model
 
 
+# Field validators for streaming parsers (see `_get_streaming_adapters()`), by spec class
+_streaming_adapters: dict[type[BaseModel], tuple[bool, dict, dict]] = {}
+
+
+def _get_streaming_adapters(spec: Optional[type[BaseModel]]) -> tuple[bool, dict, dict]:
+    """
+    Build the validators used by `StreamingJSONParser` for the spec.
+
+    :param spec: Pydantic model class (if any).
+    :return: Tuple of (whether extra fields are forbidden, top-level field adapters, list item adapters).
+    """
+    if spec is None:
+        return False, {}, {}
+    if spec in _streaming_adapters:
+        return _streaming_adapters[spec]
+
+    forbid_extra = False
+    field_adapters: dict[str, Optional[TypeAdapter]] = {}
+    item_adapters: dict[str, TypeAdapter] = {}
+
+    decorators = spec.__pydantic_decorators__
+    # If the model can reshape the input arbitrarily, only validate the complete response
+    if not any(dec.info.mode in ("before", "wrap") for dec in decorators.model_validators.values()):
+        skip_fields = set()
+        for dec in decorators.field_validators.values():
+            if dec.info.mode in ("before", "wrap", "plain"):
+                skip_fields.update(dec.info.fields)
+
+        forbid_extra = spec.model_config.get("extra") == "forbid"
+        for name, field in spec.model_fields.items():
+            key = field.alias or name
+            if name in skip_fields:
+                field_adapters[key] = None
+                continue
+
+            annotation = Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+            field_adapters[key] = TypeAdapter(annotation)
+            if get_origin(field.annotation) is list and get_args(field.annotation):
+                item_adapters[key] = TypeAdapter(get_args(field.annotation)[0])
+
+    _streaming_adapters[spec] = (forbid_extra, field_adapters, item_adapters)
+    return _streaming_adapters[spec]
+
+
+class StreamingParseError(ValueError):
+    """
+    The streamed response is already known to be invalid before it's complete.
+    """
+
+
+class _StreamingSyntaxError(StreamingParseError):
+    """
+    The streamed response is not valid JSON (as far as the streaming parser can tell).
+    """
+
+
+class StreamingJSONParser(JSONParser):
+    """
+    JSON parser that also validates the response while it's being streamed.
+
+    The LLM client feeds the streamed chunks to the parser (see `feed()`).
+    The parser tracks the JSON structure and, as soon as a top-level field
+    of the response object is complete, checks that it's valid JSON and
+    that it validates against the corresponding field in the spec. If it
+    doesn't, `StreamingParseError` is raised so that the LLM client can abort
+    the stream and retry without waiting for the rest of the response.
+
+    Elements of top-level list fields (eg. `TaskSteps.steps`) are validated
+    one by one as they're completed, collected in `items`, and passed to the
+    optional `on_item(field_name, item)` callback (which can be async).
+
+    Any text before the JSON object (eg. Markdown fence) is ignored, the same
+    way `JSONParser` ignores it: brackets in the text before a code fence are
+    not treated as the JSON. The response is only aborted if it can't be
+    fixed by `repair_json()` either; if the scanner doesn't understand a
+    repairable problem (eg. comments), the response is validated only once
+    it's complete. Fields with "before"/"wrap"/"plain" validators are only
+    validated after the response is complete, as is the complete response
+    (see `JSONParser`).
+
+    Example usage:
+
+    >>> parser = StreamingJSONParser(TaskSteps, on_item=lambda field, step: print(step))
+    >>> response = await llm(convo, parser=parser)
+    """
+
+    def __init__(
+        self,
+        spec: Optional[BaseModel] = None,
+        strict: bool = True,
+        on_item: Optional[Callable[[str, Any], Any]] = None,
+    ):
+        super().__init__(spec, strict)
+        self.on_item = on_item
+        # Validators for top-level fields and items of top-level lists, by field name (alias)
+        self.forbid_extra, self.field_adapters, self.item_adapters = _get_streaming_adapters(spec)
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the parser state, to be used before streaming a new response.
+        """
+        self.text = ""
+        self.original_response = None
+        self.items: dict[str, list] = {key: [] for key in self.item_adapters}
+        self._pos = 0
+        self._stack: list[str] = []
+        # Quote character of the string being scanned (if any)
+        self._quote: Optional[str] = None
+        self._escape = False
+        self._fenced = False
+        self._root_start: Optional[int] = None
+        # Whether the root was found after some text, outside a code fence, so it may not be the actual JSON
+        self._tentative = False
+        self._root_done = False
+        self._member_start: Optional[int] = None
+        self._list_field: Optional[str] = None
+        self._element_start: Optional[int] = None
+        self._new_items: list[tuple[str, Any]] = []
+
+    def fork(self, on_item: Optional[Callable[[str, Any], Any]] = None) -> "StreamingJSONParser":
+        """
+        Create a new parser with the same spec, but its own streaming state.
+
+        Used when the same response is requested more than once at the same
+        time (eg. hedged requests), as each stream needs its own parser.
+
+        :param on_item: Item callback for the new parser (default: the callback of this parser).
+        :return: New parser.
+        """
+        return StreamingJSONParser(self.spec, self.strict, on_item=on_item or self.on_item)
+
+    async def feed(self, chunk: Optional[str]):
+        """
+        Feed a chunk of the streamed response to the parser.
+
+        :param chunk: Response chunk, or None at the end of the stream.
+        :raises StreamingParseError: If the response is already known to be invalid.
+        """
+        if not chunk:
+            return
+
+        self.text += chunk
+        if not self._root_done:
+            self._scan()
+
+        new_items, self._new_items = self._new_items, []
+        if self.on_item:
+            for field_name, item in new_items:
+                result = self.on_item(field_name, item)
+                if inspect.isawaitable(result):
+                    await result
+
+    def _scan(self):
+        text = self.text
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+
+            if not self._stack:
+                # Skip everything before the JSON root, or before the first code fence (see `_extract_json_text()`)
+                if c == "`" and not self._fenced:
+                    if "```".startswith(text[i : i + 3]) and (i + 3 > n or text.find("\n", i) == -1):
+                        # Wait for the rest of the (possible) fence line
+                        break
+                    if text.startswith("```", i):
+                        self._fenced = True
+                        if self._root_start is not None:
+                            # The JSON before the fence was just part of the text
+                            self._restart()
+                        i = text.find("\n", i) + 1
+                        continue
+                elif (c == "{" or c == "[") and self._root_start is None:
+                    self._stack.append(c)
+                    self._root_start = i
+                    self._member_start = i + 1
+                    # Brackets in the text before the actual JSON (eg. in a code fence later on) aren't errors
+                    self._tentative = not self._fenced and bool(text[:i].strip())
+                i += 1
+                continue
+
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == self._quote:
+                    self._quote = None
+                i += 1
+                continue
+
+            try:
+                i = self._scan_char(text, i)
+            except StreamingParseError as err:
+                i = self._recover(err, i)
+            if i is None:
+                break
+
+        self._pos = i if i is not None else n
+
+    def _scan_char(self, text: str, i: int) -> Optional[int]:
+        """
+        Scan a character of the JSON root (outside of strings).
+
+        :return: Position of the next character, or None if the root is complete.
+        """
+        c = text[i]
+        depth = len(self._stack)
+        in_root_object = self._stack[0] == "{"
+
+        if c == '"' or c == "'":
+            # Single-quoted strings are repaired later (see `repair_json()`)
+            self._quote = c
+        elif c == "{" or c == "[":
+            if c == "[" and depth == 1 and in_root_object:
+                key = self._member_key(text[self._member_start : i])
+                if key in self.item_adapters:
+                    self._list_field = key
+                    self._element_start = i + 1
+            self._stack.append(c)
+        elif c == "}" or c == "]":
+            expected = "{" if c == "}" else "["
+            if self._stack[-1] != expected:
+                raise _StreamingSyntaxError(f"JSON is not valid: unexpected '{c}' at position {i}")
+            if c == "]" and depth == 2 and self._list_field:
+                self._complete_element(text[self._element_start : i])
+                self._list_field = None
+            self._stack.pop()
+            if not self._stack:
+                if in_root_object:
+                    self._complete_member(text[self._member_start : i])
+                if self._tentative:
+                    # A code fence may still follow, keep looking for it
+                    return i + 1
+                self._root_done = True
+                return None
+        elif c == ",":
+            if depth == 1 and in_root_object:
+                self._complete_member(text[self._member_start : i])
+                self._member_start = i + 1
+            elif depth == 2 and self._list_field:
+                self._complete_element(text[self._element_start : i])
+                self._element_start = i + 1
+        return i + 1
+
+    def _recover(self, err: StreamingParseError, i: int) -> Optional[int]:
+        """
+        Decide whether an error in the streamed response is final.
+
+        :param err: The error.
+        :param i: Position of the character at which the error was detected.
+        :return: Position to continue scanning from, or None to stop validating the response.
+        :raises StreamingParseError: If the response can't be parsed once complete either.
+        """
+        if self._tentative:
+            # Brackets in the text before the JSON, look for the JSON (or a code fence) after them
+            root_start = self._root_start
+            self._restart()
+            return root_start + 1
+        if not isinstance(err, _StreamingSyntaxError):
+            raise err
+
+        repaired = repair_json(self.text[: i + 1])
+        if repaired is not None:
+            try:
+                json.loads(repaired)
+            except json.JSONDecodeError:
+                pass
+            else:
+                # The scanner doesn't understand everything `repair_json()` can fix (eg. comments), so
+                # leave the validation for when the response is complete
+                log.debug(f"Stopped validating streamed response that can be repaired ({err})")
+                self._root_done = True
+                return None
+        raise err
+
+    def _restart(self):
+        """
+        Forget the JSON root found so far (and the items in it), and look for it again.
+        """
+        self.items = {key: [] for key in self.item_adapters}
+        self._stack = []
+        self._quote = None
+        self._escape = False
+        self._root_start = None
+        self._tentative = False
+        self._member_start = None
+        self._list_field = None
+        self._element_start = None
+        self._new_items = []
+
+    @staticmethod
+    def _member_key(text: str) -> Optional[str]:
+        match = re.match(r"""^\s*("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')\s*:\s*$""", text)
+        return json.loads(repair_json(match.group(1))) if match else None
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as err:
+            # Don't abort on problems that will be repaired once the response is complete
+            repaired = repair_json(text)
+            if repaired is not None:
+                try:
+                    return json.loads(repaired)
+                except json.JSONDecodeError:
+                    pass
+            raise _StreamingSyntaxError(f"JSON is not valid: {err}") from err
+
+    def _validate(self, adapter: TypeAdapter, value: Any, loc: tuple) -> Any:
+        try:
+            return adapter.validate_python(value)
+        except ValidationError as err:
+            errors = [{**error, "loc": loc + tuple(error["loc"])} for error in err.errors()]
+            raise StreamingParseError(f"Invalid JSON format:\n{self.errors_to_markdown(errors)}") from err
+
+    def _complete_member(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+
+        member = self._loads("{" + text + "}")
+
+        if self.spec is None:
+            return
+
+        for key, value in member.items():
+            if key not in self.field_adapters:
+                if self.forbid_extra:
+                    error = {"loc": (key,), "type": "extra_forbidden", "msg": "Extra inputs are not permitted"}
+                    raise StreamingParseError(f"Invalid JSON format:\n{self.errors_to_markdown([error])}")
+                continue
+            adapter = self.field_adapters[key]
+            if adapter is not None and key not in self.item_adapters:
+                # List items have already been validated one by one
+                self._validate(adapter, value, (key,))
+
+    def _complete_element(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+
+        value = self._loads(text)
+        field_name = self._list_field
+        item = self._validate(self.item_adapters[field_name], value, (field_name, len(self.items[field_name])))
+        self.items[field_name].append(item)
+        self._new_items.append((field_name, item))
+
+
 class EnumParser:
     def __init__(self, spec: Enum, ignore_case: bool = True):
         self.spec = spec
@@ -0,0 +1,88 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import AsyncIterator, Optional
+
+from core.config import LLMProvider
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+
+class RateLimiter:
+    """
+    Process-wide limiter of the LLM requests, shared by all LLM clients.
+
+    When a provider rate-limits a request, all requests to that provider are
+    held back until the limit resets, instead of every client (eg. in each
+    of the projects in a batch run) running into the limit on its own.
+    Optionally, the number of concurrent requests per provider is limited
+    as well (unlimited by default).
+
+    This class is a singleton, use the `rate_limiter` global variable to access it:
+
+    >>> from core.llm.rate_limiter import rate_limiter
+    >>> async with rate_limiter.slot(LLMProvider.OPENAI):
+    ...     # Make the request
+    """
+
+    def __init__(self):
+        self.max_concurrent: Optional[int] = None
+        self.semaphores: dict[LLMProvider, asyncio.Semaphore] = {}
+        # Provider -> time (monotonic) when the requests can resume
+        self.resume_at: dict[LLMProvider, float] = {}
+
+    def configure(self, max_concurrent: Optional[int] = None):
+        """
+        Configure the limiter.
+
+        Should be called before any requests are made.
+
+        :param max_concurrent: Maximum number of concurrent requests per provider (None for unlimited).
+        """
+        self.max_concurrent = max_concurrent
+        self.semaphores = {}
+
+    async def _wait(self, provider: LLMProvider):
+        while True:
+            delay = self.resume_at.get(provider, 0) - monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def slot(self, provider: LLMProvider) -> AsyncIterator[None]:
+        """
+        Wait until a request to the provider can be made.
+
+        :param provider: LLM provider.
+        """
+        if self.max_concurrent is None:
+            await self._wait(provider)
+            yield
+            return
+
+        semaphore = self.semaphores.get(provider)
+        if semaphore is None:
+            semaphore = self.semaphores[provider] = asyncio.Semaphore(self.max_concurrent)
+        async with semaphore:
+            await self._wait(provider)
+            yield
+
+    def backoff(self, provider: LLMProvider, seconds: float):
+        """
+        Hold back the requests to the provider after it rate-limited a request.
+
+        :param provider: LLM provider.
+        :param seconds: How long to wait before making the next request.
+        """
+        resume_at = monotonic() + seconds
+        if resume_at > self.resume_at.get(provider, 0):
+            log.debug(f"Holding back {provider.value} requests for {seconds}s")
+            self.resume_at[provider] = resume_at
+
+
+rate_limiter = RateLimiter()
+
+
+__all__ = ["RateLimiter", "rate_limiter"]
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -25,6 +25,17 @@ class LLMRequestLog(BaseModel):
     duration: float = 0.0
     status: LLMRequestStatus = LLMRequestStatus.SUCCESS
     error: str = ""
+    # Hedged requests: which request won ("primary" or "backup"), and the
+    # (estimated) tokens spent on the losing request that got cancelled
+    hedged: bool = False
+    hedge_winner: Optional[str] = None
+    hedge_model: Optional[str] = None
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+    # Whether the response was invalid JSON that was repaired locally instead of asking the LLM to retry
+    json_repaired: bool = False
+    # Prompt tokens saved by condensing command output or logs in the conversation (estimate)
+    condensed_tokens_saved: int = 0
 
 
 __all__ = ["LLMRequestLog", "LLMRequestStatus"]
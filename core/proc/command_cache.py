@@ -0,0 +1,192 @@
+import json
+import re
+from hashlib import sha1
+from os import makedirs, replace
+from os.path import dirname, exists, join
+from posixpath import normpath
+from time import time
+from typing import Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from core.disk.vfs import VirtualFileSystem
+from core.log import get_logger
+from core.proc.planner import split_command
+
+log = get_logger(__name__)
+
+# Maximum number of cached command results
+MAX_CACHE_ENTRIES = 100
+# How much (in characters) of the command output to keep in the cache
+CACHED_OUTPUT_SIZE = 64 * 1024
+
+NODE_MANIFESTS = ["package.json", "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml"]
+
+
+class CacheRule(BaseModel):
+    """
+    Which commands can be cached, and what their result depends on.
+    """
+
+    pattern: str = Field(description="Regular expression matching the command (after any leading 'cd <dir> &&')")
+    inputs: list[str] = Field(description="Files (relative to the command directory) the result depends on")
+    outputs: list[str] = Field([], description="Paths the command creates; if any is missing, the cache is bypassed")
+
+
+# Idempotent setup commands whose result only depends on the manifests/lockfiles.
+# Python installs (pip, poetry) aren't cached: they install into whichever interpreter
+# or virtualenv is active, which isn't visible in the project files, so a deleted or
+# recreated virtualenv would still get a cache hit and the install would be skipped.
+DEFAULT_CACHE_RULES = [
+    CacheRule(
+        pattern=r"^(npm (install|i|ci)|yarn( install)?|pnpm (install|i))$",
+        inputs=NODE_MANIFESTS,
+        outputs=["node_modules"],
+    ),
+    CacheRule(
+        pattern=r"^npx prisma generate$", inputs=["prisma/schema.prisma", *NODE_MANIFESTS], outputs=["node_modules"]
+    ),
+]
+
+
+class CachedCommandResult(BaseModel):
+    status_code: int
+    stdout: str
+    stderr: str
+    cached_at: float = Field(default_factory=time)
+
+
+class CommandCache:
+    """
+    Cache of command results, keyed by the content of the command inputs.
+
+    Setup commands like `npm install` or `npx prisma generate` are idempotent: if the manifests/lockfiles they read haven't changed,
+    running them again produces the same result. The cache key is made of
+    the command, its working directory, the environment overrides and the
+    hashes (as computed by the project VFS) of the input files listed in
+    the matching `CacheRule`, so any change to those files invalidates the
+    cached result.
+
+    Only successful runs are cached. The cache is stored as a JSON file
+    (usually in the project's `.gpt-pilot` directory), so it survives restarts.
+    """
+
+    def __init__(
+        self,
+        vfs: VirtualFileSystem,
+        path: str,
+        *,
+        rules: Optional[list[CacheRule]] = None,
+    ):
+        """
+        Create a new command cache.
+
+        :param vfs: Project file system, used to hash the input files.
+        :param path: Path to the JSON file the cache is stored in.
+        :param rules: Rules for which commands to cache (default: DEFAULT_CACHE_RULES).
+        """
+        self.vfs = vfs
+        self.path = path
+        self.rules = DEFAULT_CACHE_RULES if rules is None else rules
+        self.entries: dict[str, CachedCommandResult] = self._load()
+
+    def _load(self) -> dict[str, CachedCommandResult]:
+        if not exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {key: CachedCommandResult.model_validate(value) for key, value in data.items()}
+        except (OSError, ValueError, ValidationError) as err:
+            log.warning(f"Ignoring invalid command cache {self.path}: {err}")
+            return {}
+
+    def _save(self):
+        makedirs(dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({key: entry.model_dump() for key, entry in self.entries.items()}, f)
+        replace(tmp_path, self.path)
+
+    def _hash_file(self, path: str) -> Optional[str]:
+        try:
+            return self.vfs.hash(path)
+        except (ValueError, OSError, UnicodeDecodeError):
+            return None
+
+    def key(self, cmd: str, cwd: str = ".", env: Optional[dict[str, str]] = None) -> Optional[str]:
+        """
+        Compute the cache key for the command.
+
+        :param cmd: Command to run.
+        :param cwd: Working directory (relative to the project root).
+        :param env: Environment variable overrides for the command.
+        :return: Cache key, or None if the command can't be cached.
+        """
+        parts = split_command(cmd)
+        if parts is None:
+            return None
+        cmd_dir, command = parts
+        base_dir = normpath(join(cwd, cmd_dir))
+        if base_dir.startswith(".."):
+            return None
+
+        for rule in self.rules:
+            match = re.match(rule.pattern, command)
+            if match is None:
+                continue
+
+            for output in rule.outputs:
+                if not exists(self.vfs.get_full_path(join(base_dir, output))):
+                    log.debug(f"Not using command cache for `{cmd}`: {output} is missing")
+                    return None
+
+            inputs = {}
+            for path in rule.inputs:
+                path = normpath(join(base_dir, path.format(**match.groupdict())))
+                inputs[path] = self._hash_file(path)
+
+            data = {"cmd": cmd, "cwd": cwd, "env": env or {}, "inputs": inputs}
+            return sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+        return None
+
+    def get(self, key: Optional[str]) -> Optional[CachedCommandResult]:
+        """
+        Get the cached result.
+
+        :param key: Cache key, as returned by `key()`.
+        :return: Cached result, or None if not cached.
+        """
+        if key is None:
+            return None
+        return self.entries.get(key)
+
+    def put(self, key: Optional[str], status_code: Optional[int], stdout: str, stderr: str):
+        """
+        Store the command result in the cache (only if the command succeeded).
+
+        :param key: Cache key, as returned by `key()`.
+        :param status_code: Command exit code.
+        :param stdout: Command standard output.
+        :param stderr: Command standard error.
+        """
+        if key is None or status_code != 0:
+            return
+
+        self.entries.pop(key, None)
+        self.entries[key] = CachedCommandResult(
+            status_code=status_code,
+            stdout=stdout[-CACHED_OUTPUT_SIZE:],
+            stderr=stderr[-CACHED_OUTPUT_SIZE:],
+        )
+        while len(self.entries) > MAX_CACHE_ENTRIES:
+            del self.entries[next(iter(self.entries))]
+
+        try:
+            self._save()
+        except OSError as err:
+            log.warning(f"Error saving command cache {self.path}: {err}")
+
+
+__all__ = ["CommandCache", "CacheRule", "CachedCommandResult", "DEFAULT_CACHE_RULES"]
@@ -0,0 +1,204 @@
+import re
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+# Default size (in tokens) of the condensed output
+DEFAULT_MAX_TOKENS = 2000
+# Rough estimate used when no tokenizer is given; deterministic and tokenizer-independent
+CHARS_PER_TOKEN = 4
+# Lines longer than this are cut in the middle
+MAX_LINE_LENGTH = 500
+
+# ANSI escape sequences: colors, cursor movement, OSC (terminal title, hyperlinks), ...
+ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+# Numbers, hex strings (hashes, addresses) and the like, which vary between otherwise identical lines
+VARIABLE_PARTS_RE = re.compile(r"0x[0-9a-fA-F]+|\b[0-9a-fA-F]{7,}\b|\d+(?:\.\d+)?")
+# Lines that likely point to the cause of the problem
+ERROR_SIGNATURE_RE = re.compile(
+    r"\b(?:error|errors|exception|traceback|fatal|panic|failed|failure|cannot|undefined|denied|refused|"
+    r"not found|unhandled|segmentation fault)\b|ERR!|^\s*at .+:\d+",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in the text.
+
+    :param text: Text to estimate.
+    :return: Estimated number of tokens.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class CondensedOutput(BaseModel):
+    text: str
+    original_tokens: int
+    condensed_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.condensed_tokens
+
+
+class OutputCondenser:
+    """
+    Condense command output (or logs) before sending it to the LLM.
+
+    Commands such as `npm install` can print hundreds of KB of progress
+    bars, repeated warnings and the like, which cost tokens but carry
+    little information. The condenser:
+
+    * strips ANSI escape sequences and overwritten progress lines;
+    * collapses runs of repeated and near-duplicate lines (differing only
+      in numbers, hashes, etc.) into one line with a count;
+    * if the output is still larger than `max_tokens`, keeps the head and
+      the tail of the output, plus windows around lines that look like
+      errors, and marks the omitted parts.
+
+    The result only depends on the input, so identical output always
+    produces identical prompts. The token budget is measured with
+    `count_tokens`, which defaults to an estimate; pass the model's
+    tokenizer for precise budgeting.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        *,
+        head_lines: int = 30,
+        tail_lines: int = 60,
+        context_lines: int = 3,
+        max_error_windows: int = 10,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Create a new output condenser.
+
+        :param max_tokens: Maximum size of the condensed output, in tokens.
+        :param head_lines: Number of lines to keep from the start of the output.
+        :param tail_lines: Number of lines to keep from the end of the output.
+        :param context_lines: Number of lines to keep before and after each error line.
+        :param max_error_windows: Maximum number of error lines to keep context for.
+        :param count_tokens: Function returning the number of tokens in a text (default: estimate).
+        """
+        self.max_tokens = max_tokens
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.context_lines = context_lines
+        self.max_error_windows = max_error_windows
+        self.count_tokens = count_tokens or estimate_tokens
+
+    @staticmethod
+    def clean(text: str) -> list[str]:
+        """
+        Strip ANSI escape sequences, overwritten progress output and trailing whitespace.
+
+        :param text: Output to clean.
+        :return: List of cleaned lines.
+        """
+        lines = []
+        for line in ANSI_ESCAPE_RE.sub("", text).split("\n"):
+            # Progress bars rewrite the line with carriage returns; only the last version is visible
+            line = line.rstrip("\r").rsplit("\r", 1)[-1].rstrip()
+            if len(line) > MAX_LINE_LENGTH:
+                cut = len(line) - MAX_LINE_LENGTH
+                half = MAX_LINE_LENGTH // 2
+                line = f"{line[:half]} [... {cut} characters ...] {line[-half:]}"
+            lines.append(line)
+
+        while lines and not lines[-1]:
+            lines.pop()
+        return lines
+
+    @staticmethod
+    def collapse(lines: list[str]) -> list[str]:
+        """
+        Collapse runs of repeated and near-duplicate lines.
+
+        Lines are near-duplicates if they only differ in numbers, hex strings
+        and the like. A run is replaced by its first and last line, with
+        the number of lines in between.
+
+        :param lines: Lines to collapse.
+        :return: Collapsed lines.
+        """
+        result = []
+        i = 0
+        while i < len(lines):
+            key = VARIABLE_PARTS_RE.sub("#", lines[i])
+            j = i + 1
+            while j < len(lines) and VARIABLE_PARTS_RE.sub("#", lines[j]) == key:
+                j += 1
+
+            count = j - i
+            if count == 1:
+                result.append(lines[i])
+            elif all(line == lines[i] for line in lines[i + 1 : j]):
+                result.append(f"{lines[i]} [repeated {count} times]")
+            elif count == 2:
+                result.extend(lines[i:j])
+            else:
+                result.append(lines[i])
+                result.append(f"[... {count - 2} similar lines ...]")
+                result.append(lines[j - 1])
+            i = j
+        return result
+
+    def _select(self, lines: list[str], head: int, tail: int, context: int, max_errors: int) -> str:
+        keep = set(range(min(head, len(lines))))
+        keep.update(range(max(len(lines) - tail, 0), len(lines)))
+
+        n_errors = 0
+        for i, line in enumerate(lines):
+            if n_errors >= max_errors:
+                break
+            if ERROR_SIGNATURE_RE.search(line):
+                n_errors += 1
+                keep.update(range(max(i - context, 0), min(i + context + 1, len(lines))))
+
+        parts = []
+        last = -1
+        for i in sorted(keep):
+            if i > last + 1:
+                parts.append(f"[... {i - last - 1} lines omitted ...]")
+            parts.append(lines[i])
+            last = i
+        if last < len(lines) - 1:
+            parts.append(f"[... {len(lines) - last - 1} lines omitted ...]")
+        return "\n".join(parts)
+
+    def condense(self, text: Optional[str]) -> CondensedOutput:
+        """
+        Condense the output to fit the token budget.
+
+        :param text: Output to condense.
+        :return: Condensed output, with the token counts before and after.
+        """
+        text = text or ""
+        original_tokens = self.count_tokens(text) if text else 0
+
+        lines = self.collapse(self.clean(text))
+        condensed = "\n".join(lines)
+
+        head, tail = self.head_lines, self.tail_lines
+        context, max_errors = self.context_lines, self.max_error_windows
+        while self.count_tokens(condensed) > self.max_tokens:
+            if not (head or tail or max_errors):
+                # Even the smallest selection is too big (very long lines); keep the end
+                condensed = condensed[-self.max_tokens * CHARS_PER_TOKEN :]
+                break
+            condensed = self._select(lines, head, tail, context, max_errors)
+            head, tail, max_errors = head // 2, tail // 2, max_errors // 2
+            if not max_errors:
+                context = 0
+
+        return CondensedOutput(
+            text=condensed,
+            original_tokens=original_tokens,
+            condensed_tokens=self.count_tokens(condensed) if condensed else 0,
+        )
+
+
+__all__ = ["OutputCondenser", "CondensedOutput", "estimate_tokens"]
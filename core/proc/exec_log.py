@@ -16,6 +16,13 @@ class ExecLog(BaseModel):
     stderr: str = Field(description="The command standard error")
     analysis: str = Field(description="The result analysis as performed by the LLM")
     success: bool = Field(description="Whether the command was successful")
+    cached: bool = Field(False, description="Whether the command result was taken from the command cache")
+    peak_rss: Optional[int] = Field(None, description="Peak resident memory of the command process tree, in bytes")
+    cpu_user: Optional[float] = Field(None, description="User CPU time of the command process tree, in seconds")
+    cpu_system: Optional[float] = Field(None, description="System CPU time of the command process tree, in seconds")
+    max_children: Optional[int] = Field(None, description="Maximum number of child processes running at once")
+    read_bytes: Optional[int] = Field(None, description="Bytes read from storage by the command process tree")
+    write_bytes: Optional[int] = Field(None, description="Bytes written to storage by the command process tree")
 
 
 __all__ = ["ExecLog"]
@@ -0,0 +1,363 @@
+import asyncio
+import codecs
+import re
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate
+from os import listdir, makedirs, remove
+from os.path import dirname, getmtime, join
+from typing import IO, Iterator, Optional, Union
+
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# How much to read from the process output pipe at once
+READ_CHUNK_SIZE = 64 * 1024
+# How much output (in characters) to keep in memory, per stream
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+# Compression level for the spilled output; favour speed, logs compress well anyway
+SPILL_COMPRESSION_LEVEL = 1
+
+# Spilled output is compressed and written in a single background thread, so the
+# event loop never waits for the disk, and the writes to each file stay in order
+_spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="output-spill")
+
+
+class OutputBuffer:
+    """
+    Bounded buffer of process output, indexed by line.
+
+    Output is stored as a ring of lines. When the total size exceeds
+    `max_size` characters, the oldest lines are dropped. Every line keeps
+    its offset in the overall output stream, so readers can keep track of
+    their position (see `read()`) even as old output is dropped.
+
+    The last line may be incomplete (not terminated by a newline) and is
+    extended as more output arrives.
+
+    If `spill_path` is set, once the output outgrows the buffer, the full
+    output is also written to a gzip-compressed file, so that `since()` and
+    `grep()` can still access the output that was dropped from memory. Output
+    that fits in the buffer is never written to disk. The file is written in
+    a background thread; `since()` and `grep()` read it synchronously.
+    """
+
+    def __init__(self, max_size: int = OUTPUT_BUFFER_SIZE, spill_path: Optional[str] = None):
+        """
+        Create a new output buffer.
+
+        :param max_size: Maximum number of characters to keep.
+        :param spill_path: Path to the (gzip) file to save the full output to, if any.
+        """
+        self.max_size = max_size
+        self.spill_path = spill_path
+        self.spill_file: Optional[IO[bytes]] = None
+        self.compressor = None
+        # Last write to the spill file, if any (the writes are done in order)
+        self._spill_write: Optional[Future] = None
+        self._spill_closed = False
+        # (offset, line) pairs; all lines except possibly the last one end with a newline
+        self.lines: deque[tuple[int, str]] = deque()
+        self.size = 0
+        # Total number of characters ever written; also the offset of the next character
+        self.total = 0
+        # Offset up to which the output has been consumed by `drain()`
+        self.drained = 0
+        self.updated = asyncio.Event()
+
+    @property
+    def start(self) -> int:
+        """Offset of the oldest character still in the buffer."""
+        return self.lines[0][0] if self.lines else self.total
+
+    def write(self, text: str):
+        """
+        Append text to the buffer, dropping the oldest lines if needed.
+
+        :param text: Text to append.
+        """
+        if not text:
+            return
+
+        if self.compressor is not None and not self._spill_closed:
+            self._spill(text)
+
+        if self.lines and not self.lines[-1][1].endswith("\n") and len(self.lines[-1][1]) < READ_CHUNK_SIZE:
+            # Continue the incomplete last line (very long lines are stored in several parts)
+            offset, last = self.lines.pop()
+            self.size -= len(last)
+            text = last + text
+        else:
+            offset = self.total
+
+        lines = text.splitlines(keepends=True)
+        lengths = list(map(len, lines))
+        self.lines.extend(zip(accumulate(lengths, initial=offset), lines))
+        self.size += len(text)
+        self.total = offset + len(text)
+        if self.size > self.max_size and self.spill_path and self.compressor is None:
+            # Nothing has been dropped yet, so the buffer still has all the output
+            self.compressor = zlib.compressobj(SPILL_COMPRESSION_LEVEL, wbits=31)
+            self._spill(self.getvalue())
+        while self.size > self.max_size and len(self.lines) > 1:
+            _, line = self.lines.popleft()
+            self.size -= len(line)
+
+        self.updated.set()
+
+    def read(self, offset: int) -> tuple[str, int]:
+        """
+        Read the output starting at the given offset.
+
+        If some of the output after the offset was already dropped, the
+        result starts with the oldest output still in the buffer.
+
+        :param offset: Offset to start reading from.
+        :return: Tuple of (output, offset to continue reading from).
+        """
+        if offset >= self.total:
+            return "", self.total
+
+        # Walk backwards from the end, so reading recent output doesn't scan the whole buffer
+        parts = []
+        for line_offset, line in reversed(self.lines):
+            if line_offset + len(line) <= offset:
+                break
+            parts.append(line[offset - line_offset :] if line_offset < offset else line)
+
+        parts.reverse()
+        return "".join(parts), self.total
+
+    def since(self, offset: int) -> tuple[str, int]:
+        """
+        Read the output starting at the given offset.
+
+        Unlike `read()`, this also returns the output that was already
+        dropped from memory, if it was spilled to disk.
+
+        :param offset: Offset to start reading from.
+        :return: Tuple of (output, offset to continue reading from).
+        """
+        if offset >= self.start or self.compressor is None:
+            return self.read(offset)
+
+        parts = []
+        for line_offset, line in self._spilled_lines():
+            if line_offset + len(line) > offset:
+                parts.append(line[offset - line_offset :] if line_offset < offset else line)
+        return "".join(parts), self.total
+
+    def tail(self, n: int) -> str:
+        """
+        Return the last `n` lines of the output (as far as they're kept in memory).
+
+        :param n: Number of lines to return.
+        :return: The last lines of the output.
+        """
+        if n <= 0:
+            return ""
+        start = max(len(self.lines) - n, 0)
+        return "".join(self.lines[i][1] for i in range(start, len(self.lines)))
+
+    def grep(self, pattern: Union[str, re.Pattern], max_matches: Optional[int] = None) -> list[tuple[int, str]]:
+        """
+        Find the output lines matching the regular expression.
+
+        Searches the full output if it was spilled to disk, otherwise only
+        the output still kept in memory.
+
+        :param pattern: Regular expression to search for.
+        :param max_matches: Maximum number of matches to return (default: all).
+        :return: List of (offset, line) tuples of the matching lines.
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern)
+
+        if self.compressor is not None and self.start > 0:
+            lines = self._spilled_lines()
+        else:
+            lines = iter(self.lines)
+
+        matches = []
+        for offset, line in lines:
+            if pattern.search(line):
+                matches.append((offset, line))
+                if max_matches is not None and len(matches) >= max_matches:
+                    break
+        return matches
+
+    def _spill(self, text: str, final: bool = False):
+        self._spill_write = _spill_executor.submit(self._write_spill, text.encode("utf-8"), final)
+
+    def _write_spill(self, data: bytes, final: bool):
+        # Runs in the spill thread, like all the other spill file operations
+        if self.spill_file is None:
+            makedirs(dirname(self.spill_path) or ".", exist_ok=True)
+            self.spill_file = open(self.spill_path, "wb")
+        self.spill_file.write(self.compressor.compress(data))
+        if final:
+            self.spill_file.write(self.compressor.flush())
+            self.spill_file.close()
+
+    def _flush_spill(self):
+        # Runs in the spill thread: make everything written so far readable
+        if not self.spill_file.closed:
+            self.spill_file.write(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+            self.spill_file.flush()
+
+    def _spilled_lines(self) -> Iterator[tuple[int, str]]:
+        """
+        Read the spilled output line by line, without loading it all into memory.
+
+        :return: Iterator over (offset, line) tuples.
+        """
+        # Wait for the output written so far to reach the file (this blocks, but only for the pending writes)
+        self._spill_write = _spill_executor.submit(self._flush_spill)
+        self._spill_write.result()
+
+        decompressor = zlib.decompressobj(wbits=31)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        offset = 0
+        partial = ""
+        with open(self.spill_path, "rb") as f:
+            while True:
+                data = f.read(READ_CHUNK_SIZE)
+                text = partial + decoder.decode(decompressor.decompress(data), final=not data)
+                lines = text.splitlines(keepends=True)
+                partial = lines.pop() if data and lines and not lines[-1].endswith("\n") else ""
+                for line in lines:
+                    yield offset, line
+                    offset += len(line)
+                if not data:
+                    break
+
+    def close(self):
+        """
+        Finish writing the spilled output, if any.
+
+        The spilled output can still be read (via `since()` and `grep()`) afterwards.
+        """
+        if self.compressor is not None and not self._spill_closed:
+            self._spill_closed = True
+            self._spill("", final=True)
+
+    def discard(self):
+        """
+        Delete the spilled output, if any.
+
+        Only the output kept in memory is available afterwards.
+        """
+        if self.compressor is None:
+            self.spill_path = None
+            return
+        self.close()
+        _spill_executor.submit(self._remove_spill, self.spill_path)
+        self.compressor = None
+        self.spill_path = None
+
+    @staticmethod
+    def _remove_spill(path: str):
+        try:
+            remove(path)
+        except OSError as err:
+            log.debug(f"Error removing process output log {path}: {err}")
+
+    def drain(self) -> str:
+        """
+        Return the output that hasn't been drained yet.
+
+        :return: New output since the last call.
+        """
+        text, self.drained = self.read(self.drained)
+        self.updated.clear()
+        return text
+
+    def getvalue(self) -> str:
+        """Return all the output still in the buffer."""
+        return "".join(line for _, line in self.lines)
+
+
+async def read_stream(stream: asyncio.StreamReader, buffer: OutputBuffer):
+    """
+    Read the stream until EOF, writing the decoded output to the buffer.
+
+    The output is read in large chunks and decoded incrementally, so
+    multi-byte UTF-8 characters split across chunks are decoded correctly.
+    Invalid UTF-8 sequences are replaced.
+
+    :param stream: Process output stream to read.
+    :param buffer: Buffer to write the output to.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        while True:
+            data = await stream.read(READ_CHUNK_SIZE)
+            if not data:
+                break
+            buffer.write(decoder.decode(data))
+    except (ConnectionError, ValueError) as err:
+        log.debug(f"Error reading process output: {err}")
+    finally:
+        buffer.write(decoder.decode(b"", final=True))
+        buffer.close()
+        buffer.updated.set()
+
+
+def prune_spill_files(log_dir: str, keep: int):
+    """
+    Delete all but the most recent spilled output files in the directory.
+
+    This does blocking file system calls, so it should be run in an executor.
+
+    :param log_dir: Directory with the spilled output files.
+    :param keep: Number of most recently modified files to keep.
+    """
+    try:
+        paths = [join(log_dir, name) for name in listdir(log_dir) if name.endswith(".log.gz")]
+    except OSError:
+        return
+
+    if len(paths) <= keep:
+        return
+
+    def mtime(path: str) -> float:
+        try:
+            return getmtime(path)
+        except OSError:
+            return 0.0
+
+    for path in sorted(paths, key=mtime)[: len(paths) - keep]:
+        try:
+            remove(path)
+        except OSError as err:
+            log.debug(f"Error removing process output log {path}: {err}")
+
+
+def pending_output(*buffers: OutputBuffer) -> bool:
+    """Whether any of the buffers has output that hasn't been drained yet."""
+    return any(buffer.drained < buffer.total for buffer in buffers)
+
+
+async def wait_for_output(*buffers: OutputBuffer, timeout: Optional[float] = None) -> bool:
+    """
+    Wait until there's new output in any of the buffers.
+
+    :param buffers: Buffers to wait for.
+    :param timeout: Maximum time to wait, in seconds (None to wait indefinitely).
+    :return: True if there's new output, False if the wait timed out.
+    """
+    if pending_output(*buffers):
+        return True
+
+    waiters = [asyncio.ensure_future(buffer.updated.wait()) for buffer in buffers]
+    try:
+        done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+    return bool(done)
+
+
+__all__ = ["OutputBuffer", "read_stream", "prune_spill_files", "pending_output", "wait_for_output"]
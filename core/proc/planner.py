@@ -0,0 +1,95 @@
+import re
+import shlex
+from posixpath import normpath
+from typing import Optional
+
+# Leading "cd <dir> &&" (or "cd <dir>;") that changes the working directory of the command
+CD_PREFIX_RE = re.compile(r"^\s*cd\s+(?P<dir>\"[^\"]+\"|'[^']+'|[^\s;&|]+)\s*(?:&&|;)\s*(?P<rest>.*)$", re.DOTALL)
+# Shell constructs that may change the directory or affect files outside of it
+UNSAFE_RE = re.compile(r"\bcd\b|\bpushd\b|\.\.|(?:^|\s)[~/]|\$")
+
+
+def split_command(cmd: str) -> Optional[tuple[str, str]]:
+    """
+    Split the command into the directory it works in and the command itself.
+
+    Only the common `cd <dir> && <command>` form is recognized. Commands
+    without it work in the project root (".").
+
+    :param cmd: Shell command.
+    :return: Tuple of (normalized working directory, command), or None if
+        the directory can't be determined.
+    """
+    cwd = "."
+    match = CD_PREFIX_RE.match(cmd)
+    if match:
+        try:
+            cwd = shlex.split(match.group("dir"))[0]
+        except ValueError:
+            return None
+        if cwd.startswith(("/", "~", "$")):
+            return None
+        cmd = match.group("rest")
+
+    cwd = normpath(cwd.replace("\\", "/"))
+    if cwd == ".." or cwd.startswith("../") or UNSAFE_RE.search(cmd):
+        return None
+    return cwd, cmd.strip()
+
+
+def command_cwd(cmd: str) -> Optional[str]:
+    """
+    Determine the directory (relative to the project root) the command works in.
+
+    See `split_command()` for details.
+
+    :param cmd: Shell command.
+    :return: Normalized working directory, or None if it can't be determined.
+    """
+    parts = split_command(cmd)
+    return parts[0] if parts else None
+
+
+def commands_independent(cmd1: str, cmd2: str) -> bool:
+    """
+    Check whether the two commands can safely run at the same time.
+
+    Commands are considered independent if they work in separate
+    subdirectories of the project, neither of which contains the other
+    (for example `cd api && npm install` and `cd ui && npm install`).
+    Anything else, including commands running in the project root, is
+    considered dependent.
+
+    :param cmd1: First command.
+    :param cmd2: Second command.
+    :return: True if the commands are independent.
+    """
+    cwd1 = command_cwd(cmd1)
+    cwd2 = command_cwd(cmd2)
+    if cwd1 is None or cwd2 is None or "." in (cwd1, cwd2):
+        return False
+    return not (cwd1 == cwd2 or cwd1.startswith(cwd2 + "/") or cwd2.startswith(cwd1 + "/"))
+
+
+def plan_concurrent_commands(steps: list[dict]) -> list[dict]:
+    """
+    Find the command steps that can run concurrently with the first step.
+
+    Looks at the consecutive `command` steps at the start of the list and
+    returns the longest run of them that are all independent of each other.
+
+    :param steps: Unfinished steps, starting with the current (command) step.
+    :return: Command steps to run concurrently (including the first step).
+    """
+    batch = []
+    for step in steps:
+        if step.get("type") != "command":
+            break
+        cmd = step["command"]["command"]
+        if not all(commands_independent(cmd, other["command"]["command"]) for other in batch):
+            break
+        batch.append(step)
+    return batch
+
+
+__all__ = ["split_command", "command_cwd", "commands_independent", "plan_concurrent_commands"]
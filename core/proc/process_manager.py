@@ -1,24 +1,39 @@
 import asyncio
+import re
 import signal
 import sys
-import time
 from copy import deepcopy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import partial
 from os import environ
 from os.path import abspath, join
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 from uuid import UUID, uuid4
 
 import psutil
 
 from core.log import get_logger
+from core.proc.command_cache import CachedCommandResult, CommandCache
+from core.proc.output_buffer import (
+    OUTPUT_BUFFER_SIZE,
+    OutputBuffer,
+    prune_spill_files,
+    read_stream,
+    wait_for_output,
+)
+from core.proc.resource_monitor import ResourceMonitor
+from core.proc.shell_session import ShellSession
 
 log = get_logger(__name__)
 
 NONBLOCK_READ_TIMEOUT = 0.01
-BUSY_WAIT_INTERVAL = 0.1
-WATCHER_IDLE_INTERVAL = 1.0
+# How long to wait for the rest of the output after the process exits
+OUTPUT_EOF_TIMEOUT = 1.0
+# How long to wait for the processes to exit after sending them a signal
+TERMINATE_TIMEOUT = 1.0
 MAX_COMMAND_TIMEOUT = 180
+# How many output log files of background processes to keep in the log directory
+MAX_PROCESS_LOGS = 100
 
 
 @dataclass
@@ -27,9 +42,20 @@ class LocalProcess:
     cmd: str
     cwd: str
     env: dict[str, str]
-    stdout: str
-    stderr: str
     _process: asyncio.subprocess.Process
+    _stdout_buffer: OutputBuffer = field(default_factory=OutputBuffer)
+    _stderr_buffer: OutputBuffer = field(default_factory=OutputBuffer)
+    _readers: list[asyncio.Task] = field(default_factory=list)
+    _waiter: Optional[asyncio.Task] = None
+
+    def __post_init__(self):
+        # Read the output continuously in the background, so the pipes never fill up
+        self._readers = [
+            asyncio.create_task(read_stream(self._process.stdout, self._stdout_buffer)),
+            asyncio.create_task(read_stream(self._process.stderr, self._stderr_buffer)),
+        ]
+        # Completes when the process exits, so nobody needs to poll for it
+        self._waiter = asyncio.create_task(self._process.wait())
 
     def __hash__(self) -> int:
         return hash(self.id)
@@ -41,7 +67,24 @@ class LocalProcess:
         cwd: str = ".",
         env: dict[str, str],
         bg: bool = False,
+        max_output_size: int = OUTPUT_BUFFER_SIZE,
+        log_dir: Optional[str] = None,
     ) -> "LocalProcess":
+        """
+        Start a new process.
+
+        Only the last `max_output_size` characters of each output stream are
+        kept in memory. If `log_dir` is set and the output doesn't fit, the
+        full output is also saved to compressed log files in that directory.
+
+        :param cmd: Command to run (in a shell).
+        :param cwd: Working directory.
+        :param env: Environment variables.
+        :param bg: Whether to start the process in the background (in a new session).
+        :param max_output_size: How much of each output stream to keep in memory.
+        :param log_dir: Directory to save the full output to, if any.
+        :return: The started process.
+        """
         log.debug(f"Starting process: {cmd} (cwd={cwd})")
         _process = await asyncio.create_subprocess_shell(
             cmd,
@@ -55,64 +98,122 @@ class LocalProcess:
         if bg:
             _process.stdin.close()
 
+        process_id = uuid4()
         return LocalProcess(
-            id=uuid4(),
+            id=process_id,
             cmd=cmd,
             cwd=cwd,
             env=env,
-            stdout="",
-            stderr="",
             _process=_process,
+            _stdout_buffer=OutputBuffer(
+                max_output_size,
+                spill_path=join(log_dir, f"{process_id}.stdout.log.gz") if log_dir else None,
+            ),
+            _stderr_buffer=OutputBuffer(
+                max_output_size,
+                spill_path=join(log_dir, f"{process_id}.stderr.log.gz") if log_dir else None,
+            ),
         )
 
     async def wait(self, timeout: Optional[float] = None) -> int:
-        try:
-            future = self._process.wait()
-            if timeout:
-                future = asyncio.wait_for(future, timeout)
-            retcode = await future
-        except asyncio.TimeoutError:
+        """
+        Wait for the process to exit, terminating it if it takes too long.
+
+        :param timeout: Maximum time to wait, in seconds (None to wait indefinitely).
+        :return: Process exit code.
+        """
+        done, _ = await asyncio.wait([self._waiter], timeout=timeout)
+        if not done:
             log.debug(f"Process {self.cmd} still running after {timeout}s, terminating")
             await self.terminate()
             # FIXME: this may still hang if we don't manage to kill the process.
-            retcode = await self._process.wait()
+            await self._waiter
 
-        return retcode
+        return self._waiter.result()
 
-    @staticmethod
-    async def _nonblock_read(reader: asyncio.StreamReader, timeout: float) -> str:
+    async def wait_for_output_eof(self, timeout: float = OUTPUT_EOF_TIMEOUT):
         """
-        Reads data from a stream reader without blocking (for long).
+        Wait until all the process output has been read.
 
-        This wraps the read in a (short) timeout to avoid blocking the event loop for too long.
+        The output pipes may be kept open by (background) child processes even
+        after the process itself exits, so we only wait for a limited time.
 
-        :param reader: Async stream reader to read from.
-        :param timeout: Timeout for the read operation (should not be too long).
-        :return: Data read from the stream reader, or empty string.
+        :param timeout: Maximum time to wait, in seconds.
         """
-        buffer = ""
-        while True:
-            try:
-                data = await asyncio.wait_for(reader.read(1), timeout)
-                if not data:
-                    return buffer
-                buffer += data.decode("utf-8", errors="ignore")
-            except asyncio.TimeoutError:
-                return buffer
+        await asyncio.wait(self._readers, timeout=timeout)
 
     async def read_output(self, timeout: float = NONBLOCK_READ_TIMEOUT) -> tuple[str, str]:
-        new_stdout = await self._nonblock_read(self._process.stdout, timeout)
-        new_stderr = await self._nonblock_read(self._process.stderr, timeout)
-        self.stdout += new_stdout
-        self.stderr += new_stderr
-        return (new_stdout, new_stderr)
-
-    async def _terminate_process_tree(self, signal: int):
-        # This is a recursive function that terminates the entire process tree
-        # of the current process. It first terminates all child processes, then
-        # terminates itself.
-        shell_process = psutil.Process(self._process.pid)
-        processes = shell_process.children(recursive=True)
+        """
+        Get the new process output since the last call.
+
+        The output is read in the background, so this doesn't touch the pipes.
+        If there's no new output yet, wait for up to `timeout` seconds for it.
+
+        :param timeout: Maximum time to wait for new output, in seconds.
+        :return: Tuple of (new stdout, new stderr).
+        """
+        if timeout:
+            await wait_for_output(self._stdout_buffer, self._stderr_buffer, timeout=timeout)
+
+        return (self._stdout_buffer.drain(), self._stderr_buffer.drain())
+
+    @property
+    def stdout(self) -> str:
+        """Process standard output (as much of it as is kept in memory)."""
+        return self._stdout_buffer.getvalue()
+
+    @property
+    def stderr(self) -> str:
+        """Process standard error (as much of it as is kept in memory)."""
+        return self._stderr_buffer.getvalue()
+
+    def _output(self, stderr: bool) -> OutputBuffer:
+        return self._stderr_buffer if stderr else self._stdout_buffer
+
+    def tail(self, n: int = 100, *, stderr: bool = False) -> str:
+        """
+        Get the last lines of the process output.
+
+        :param n: Number of lines.
+        :param stderr: Whether to read standard error instead of standard output.
+        :return: The last `n` lines of the output.
+        """
+        return self._output(stderr).tail(n)
+
+    def grep(self, pattern: Union[str, re.Pattern], *, stderr: bool = False) -> list[tuple[int, str]]:
+        """
+        Find the lines of the process output matching the regular expression.
+
+        This searches the full output if it's saved to the log file.
+
+        :param pattern: Regular expression to search for.
+        :param stderr: Whether to search standard error instead of standard output.
+        :return: List of (offset, line) tuples of the matching lines.
+        """
+        return self._output(stderr).grep(pattern)
+
+    def since(self, offset: int, *, stderr: bool = False) -> tuple[str, int]:
+        """
+        Get the process output starting at the given offset.
+
+        Use the returned offset to get only the new output next time.
+
+        :param offset: Offset in the output (0 for the beginning).
+        :param stderr: Whether to read standard error instead of standard output.
+        :return: Tuple of (output, offset to continue reading from).
+        """
+        return self._output(stderr).since(offset)
+
+    @staticmethod
+    def _terminate_process_tree(pid: int, signal: int):
+        # Terminate the entire process tree of the process: first all the
+        # child processes, then the process itself. This blocks while waiting
+        # for the processes to exit, so it should be run in an executor.
+        try:
+            shell_process = psutil.Process(pid)
+            processes = shell_process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
         processes.append(shell_process)
         for proc in processes:
             try:
@@ -120,21 +221,32 @@ class LocalProcess:
             except psutil.NoSuchProcess:
                 pass
 
-        psutil.wait_procs(processes, timeout=1)
+        psutil.wait_procs(processes, timeout=TERMINATE_TIMEOUT)
 
     async def terminate(self, kill: bool = True):
+        """
+        Terminate the process and all its child processes.
+
+        :param kill: Whether to kill (SIGKILL) the processes instead of asking
+            them to terminate (SIGTERM). Windows only supports the latter.
+        """
         if kill and sys.platform != "win32":
-            await self._terminate_process_tree(signal.SIGKILL)
+            sig = signal.SIGKILL
         else:
             # Windows doesn't have SIGKILL
-            await self._terminate_process_tree(signal.SIGTERM)
+            sig = signal.SIGTERM
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self._terminate_process_tree, self._process.pid, sig))
 
     @property
     def is_running(self) -> bool:
-        try:
-            return psutil.Process(self._process.pid).is_running()
-        except psutil.NoSuchProcess:
-            return False
+        return not self._waiter.done()
+
+    @property
+    def returncode(self) -> Optional[int]:
+        """Process exit code, or None if the process is still running."""
+        return self._waiter.result() if self._waiter.done() else None
 
     @property
     def pid(self) -> int:
@@ -149,20 +261,47 @@ class ProcessManager:
         env: Optional[dict[str, str]] = None,
         output_handler: Optional[Callable] = None,
         exit_handler: Optional[Callable] = None,
+        max_output_size: int = OUTPUT_BUFFER_SIZE,
+        log_dir: Optional[str] = None,
+        command_cache: Optional[CommandCache] = None,
+        persistent_shell: bool = False,
     ):
+        """
+        Create a new process manager.
+
+        :param root_dir: Directory the commands are run in (relative to).
+        :param env: Environment variables (default: the current environment).
+        :param output_handler: Async callback called with new (stdout, stderr) output.
+        :param exit_handler: Async callback called with the process when a background process exits.
+        :param max_output_size: How much of each process output stream to keep in memory.
+        :param log_dir: Directory to save the full output of background processes to, if any
+            (only the most recent MAX_PROCESS_LOGS log files are kept).
+        :param command_cache: Cache of command results, used by `run_command(..., cache=True)`.
+        :param persistent_shell: Whether to run commands in a persistent shell session (if supported).
+        """
         if env is None:
             env = deepcopy(environ)
         self.processes: dict[UUID, LocalProcess] = {}
         self.default_env = env
         self.root_dir = root_dir
+        self.max_output_size = max_output_size
+        self.log_dir = log_dir
+        self.command_cache = command_cache
+        self.shell: Optional[ShellSession] = None
+        if persistent_shell:
+            if ShellSession.available():
+                self.shell = ShellSession(root_dir, env, max_output_size=max_output_size)
+            else:
+                log.warning("Persistent shell sessions are not supported on this system, running commands one-shot")
         self.watcher_should_run = True
-        self.watcher_task = asyncio.create_task(self.watcher())
+        # Background tasks forwarding the output and exit of each background process
+        self.watchers: dict[UUID, asyncio.Task] = {}
         self.output_handler = output_handler
         self.exit_handler = exit_handler
 
     async def stop_watcher(self):
         """
-        Stop the process watcher.
+        Stop watching the background processes.
 
         This should only be done when the ProcessManager is no longer needed.
         """
@@ -170,38 +309,55 @@ class ProcessManager:
             raise ValueError("Process watcher is not running")
 
         self.watcher_should_run = False
-        await self.watcher_task
+        for task in self.watchers.values():
+            task.cancel()
+        await asyncio.gather(*self.watchers.values(), return_exceptions=True)
+        self.watchers = {}
+        if self.shell:
+            await self.shell.close()
+
+    async def _forward_output(self, process: LocalProcess, show_output: bool = True):
+        out, err = await process.read_output(0)
+        if show_output and self.output_handler and (out or err):
+            await self.output_handler(out, err)
 
-    async def watcher(self):
+    async def watch(self, process: LocalProcess, *, show_output: bool = True):
         """
-        Watch over the processes and manage their output and lifecycle.
+        Forward the process output to the output handler until the process exits.
+
+        This only wakes up when there's new output or the process exits,
+        so idle processes cost nothing.
 
-        This is a separate coroutine running independently of the caller
-        coroutine.
+        :param process: Process to watch.
+        :param show_output: Whether to send the output to the output handler.
         """
-        # IDs of processes whos output has been fully read after they finished
-        complete_processes = set()
-
-        while self.watcher_should_run:
-            procs = [p for p in self.processes.values() if p.id not in complete_processes]
-            if len(procs) == 0:
-                await asyncio.sleep(WATCHER_IDLE_INTERVAL)
-                continue
-
-            for process in procs:
-                out, err = await process.read_output()
-                if self.output_handler and (out or err):
-                    await self.output_handler(out, err)
-
-                if not process.is_running:
-                    # We're not removing the complete process from the self.processes
-                    # list to give time to the rest of the system to read its outputs
-                    complete_processes.add(process.id)
-                    if self.exit_handler:
-                        await self.exit_handler(process)
-
-            # Sleep a bit to avoid busy-waiting
-            await asyncio.sleep(BUSY_WAIT_INTERVAL)
+        output = None
+        try:
+            while process.is_running:
+                if output is None:
+                    output = asyncio.create_task(wait_for_output(process._stdout_buffer, process._stderr_buffer))
+                done, _ = await asyncio.wait([output, process._waiter], return_when=asyncio.FIRST_COMPLETED)
+                if output in done:
+                    output = None
+                    await self._forward_output(process, show_output)
+        finally:
+            if output is not None:
+                output.cancel()
+
+        await process.wait_for_output_eof()
+        await self._forward_output(process, show_output)
+
+    async def _watch_background_process(self, process: LocalProcess):
+        try:
+            await self.watch(process)
+            # We're not removing the complete process from the self.processes
+            # list to give time to the rest of the system to read its outputs
+            if self.exit_handler:
+                await self.exit_handler(process)
+        except Exception as err:  # noqa
+            log.error(f"Error watching process {process.cmd}: {err}", exc_info=True)
+        finally:
+            self.watchers.pop(process.id, None)
 
     async def start_process(
         self,
@@ -213,11 +369,72 @@ class ProcessManager:
     ) -> LocalProcess:
         env = {**self.default_env, **(env or {})}
         abs_cwd = abspath(join(self.root_dir, cwd))
-        process = await LocalProcess.start(cmd, cwd=abs_cwd, env=env, bg=bg)
+        # The output of foreground processes is returned when they finish, so only
+        # the output of background processes (read with `since()`/`grep()`) is saved
+        log_dir = self.log_dir if bg else None
+        if log_dir:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, prune_spill_files, log_dir, MAX_PROCESS_LOGS)
+        process = await LocalProcess.start(
+            cmd,
+            cwd=abs_cwd,
+            env=env,
+            bg=bg,
+            max_output_size=self.max_output_size,
+            log_dir=log_dir,
+        )
         if bg:
             self.processes[process.id] = process
+            if self.watcher_should_run:
+                self.watchers[process.id] = asyncio.create_task(self._watch_background_process(process))
         return process
 
+    def get_cached_result(
+        self,
+        cmd: str,
+        *,
+        cwd: str = ".",
+        env: Optional[dict[str, str]] = None,
+    ) -> Optional[CachedCommandResult]:
+        """
+        Get the cached result of the command, if any.
+
+        :param cmd: Command to run.
+        :param cwd: Working directory.
+        :param env: Environment variables.
+        :return: Cached result, or None if the command result isn't cached (or there's no cache).
+        """
+        if self.command_cache is None:
+            return None
+        return self.command_cache.get(self.command_cache.key(cmd, cwd, env))
+
+    def store_cached_result(
+        self,
+        cmd: str,
+        status_code: Optional[int],
+        stdout: str,
+        stderr: str,
+        *,
+        cwd: str = ".",
+        env: Optional[dict[str, str]] = None,
+    ):
+        """
+        Store the result of the command in the command cache (if set).
+
+        Call this after the command has run: it may have created its outputs
+        or updated its inputs (eg. npm install writing package-lock.json).
+
+        :param cmd: Command that was run.
+        :param status_code: Command exit code (only successful results are stored).
+        :param stdout: Command standard output.
+        :param stderr: Command standard error.
+        :param cwd: Working directory.
+        :param env: Environment variables.
+        """
+        if self.command_cache is None:
+            return
+        self.command_cache.put(self.command_cache.key(cmd, cwd, env), status_code, stdout, stderr)
+
     async def run_command(
         self,
         cmd: str,
@@ -225,6 +442,9 @@ class ProcessManager:
         cwd: str = ".",
         env: Optional[dict[str, str]] = None,
         timeout: float = MAX_COMMAND_TIMEOUT,
+        show_output: bool = True,
+        cache: bool = False,
+        monitor: Optional[ResourceMonitor] = None,
     ) -> tuple[Optional[int], str, str]:
         """
         Run command and wait for it to finish.
@@ -232,37 +452,117 @@ class ProcessManager:
         Status code is an integer representing the process exit code, or
         None if the process timed out and was terminated.
 
+        If the caller is cancelled, the process is terminated.
+
+        If `cache` is set and the command result is in the command cache
+        (the command was already run successfully, and its inputs haven't
+        changed since), the command isn't run again and the cached result
+        is returned instead.
+
+        If the persistent shell session is enabled, the command runs in it,
+        unless the session is already busy running another command or the
+        command needs custom environment variables. In those cases the command
+        runs in a new shell, as usual, without the session state (a busy
+        session is logged as a warning, as the result may depend on timing).
+
         :param cmd: Command to run.
         :param cwd: Working directory.
         :param env: Environment variables.
         :param timeout: Timeout in seconds.
+        :param show_output: Whether to send the output to the output handler as it arrives.
+        :param cache: Whether to use the command cache (if set).
+        :param monitor: Resource monitor to sample the command resource usage with, if any.
         :return: Tuple of (status code, stdout, stderr).
         """
+        use_cache = cache and self.command_cache is not None
+        if use_cache:
+            cached = self.command_cache.get(self.command_cache.key(cmd, cwd, env))
+            if cached is not None:
+                log.debug(f"Using cached result of {cmd}")
+                if show_output and self.output_handler and (cached.stdout or cached.stderr):
+                    await self.output_handler(cached.stdout, cached.stderr)
+                return (cached.status_code, cached.stdout, cached.stderr)
+
         timeout = min(timeout, MAX_COMMAND_TIMEOUT)
+        if self.shell and not self.shell.busy and not env:
+            status_code, stdout, stderr = await self._run_in_shell(
+                cmd, cwd=cwd, timeout=timeout, show_output=show_output, monitor=monitor
+            )
+        else:
+            if self.shell and self.shell.busy:
+                log.warning(
+                    f"Shell session is busy, running {cmd} in a new shell (without the session's variables, "
+                    "virtualenv or working directory)"
+                )
+            status_code, stdout, stderr = await self._run_once(
+                cmd, cwd=cwd, env=env, timeout=timeout, show_output=show_output, monitor=monitor
+            )
+
+        if use_cache:
+            self.store_cached_result(cmd, status_code, stdout, stderr, cwd=cwd, env=env)
+
+        return (status_code, stdout, stderr)
+
+    async def _run_in_shell(
+        self,
+        cmd: str,
+        *,
+        cwd: str,
+        timeout: float,
+        show_output: bool,
+        monitor: Optional[ResourceMonitor],
+    ) -> tuple[Optional[int], str, str]:
+        try:
+            return await self.shell.run(
+                cmd,
+                cwd=cwd,
+                timeout=timeout,
+                output_handler=self.output_handler if show_output else None,
+                monitor=monitor,
+            )
+        except OSError as err:
+            log.warning(f"Error running {cmd} in the shell session, running commands one-shot: {err}")
+            self.shell = None
+            return await self._run_once(
+                cmd, cwd=cwd, env=None, timeout=timeout, show_output=show_output, monitor=monitor
+            )
+
+    async def _run_once(
+        self,
+        cmd: str,
+        *,
+        cwd: str,
+        env: Optional[dict[str, str]],
+        timeout: float,
+        show_output: bool,
+        monitor: Optional[ResourceMonitor],
+    ) -> tuple[Optional[int], str, str]:
         terminated = False
         process = await self.start_process(cmd, cwd=cwd, env=env, bg=False)
+        if monitor:
+            monitor.start(process.pid)
 
-        t0 = time.time()
-        while process.is_running and (time.time() - t0) < timeout:
-            out, err = await process.read_output(BUSY_WAIT_INTERVAL)
-            if self.output_handler and (out or err):
-                await self.output_handler(out, err)
-
-        if process.is_running:
+        watcher = asyncio.create_task(self.watch(process, show_output=show_output))
+        try:
+            done, _ = await asyncio.wait([watcher], timeout=timeout)
+        except asyncio.CancelledError:
+            log.debug(f"Running {cmd} was cancelled, terminating")
+            watcher.cancel()
+            await process.terminate()
+            raise
+        finally:
+            if monitor:
+                await monitor.stop()
+        if not done:
             log.debug(f"Process {cmd} still running after {timeout}s, terminating")
             await process.terminate()
             terminated = True
-        else:
-            await process.wait()
-
-        out, err = await process.read_output()
-        if self.output_handler and (out or err):
-            await self.output_handler(out, err)
+        await watcher
 
         if terminated:
             status_code = None
         else:
-            status_code = process._process.returncode or 0
+            status_code = process.returncode or 0
 
         return (status_code, process.stdout, process.stderr)
 
@@ -276,5 +576,8 @@ class ProcessManager:
         process = self.processes[process_id]
         await process.terminate(kill=False)
         del self.processes[process_id]
+        # Nobody can read the process output through the process manager any more
+        process._stdout_buffer.discard()
+        process._stderr_buffer.discard()
 
         return (process.stdout, process.stderr)
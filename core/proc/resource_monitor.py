@@ -0,0 +1,173 @@
+import asyncio
+from typing import Optional
+
+import psutil
+from pydantic import BaseModel
+
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# How often (in seconds) to sample the resource usage of a running command
+SAMPLE_INTERVAL = 0.5
+
+
+class ResourceUsage(BaseModel):
+    """
+    Resource usage of a command, including all its child processes.
+
+    Fields are None if the process tree couldn't be sampled at all (eg. the
+    command exited before the first sample), or the platform doesn't support
+    I/O counters.
+    """
+
+    peak_rss: Optional[int] = None
+    cpu_user: Optional[float] = None
+    cpu_system: Optional[float] = None
+    max_children: Optional[int] = None
+    read_bytes: Optional[int] = None
+    write_bytes: Optional[int] = None
+
+
+class ResourceMonitor:
+    """
+    Sample the resource usage of a process tree in the background.
+
+    Every `interval` seconds, the monitor walks the process tree and records
+    the total resident memory (keeping the peak), the CPU time and the I/O
+    byte counts of each process, and the number of child processes.
+
+    CPU time of each running process includes the CPU time of its children
+    that already exited (and were waited for), so short-lived processes
+    that start and exit between two samples are accounted for as part of
+    their parent. I/O counters don't include the children, so I/O is summed
+    over all processes seen during the run, using the last sample of each
+    one. Activity after the last sample isn't accounted for. The sampling
+    itself runs in a thread, so it doesn't block the event loop.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """
+        Create a new resource monitor.
+
+        :param interval: Sampling interval in seconds.
+        """
+        self.interval = interval
+        self.pid: Optional[int] = None
+        self.include_root = True
+        self.exclude: set[int] = set()
+        self.usage = ResourceUsage()
+        # CPU times of the root's exited children when sampling started, if the root isn't included
+        self._root_baseline: tuple[float, float] = (0.0, 0.0)
+        # Last I/O counters, by (pid, process creation time)
+        self._io: dict[tuple[int, float], tuple[int, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, pid: int, *, include_root: bool = True, exclude: Optional[set[int]] = None):
+        """
+        Start sampling the process tree.
+
+        If the root process isn't included, the CPU time of its children
+        that exit during the sampling (eg. background jobs of a shell) is
+        still included.
+
+        :param pid: PID of the root process.
+        :param include_root: Whether to include the root process itself (or only its children).
+        :param exclude: PIDs of root's children to exclude, along with their descendants.
+        """
+        self.pid = pid
+        self.include_root = include_root
+        self.exclude = exclude or set()
+        if not include_root:
+            try:
+                cpu = psutil.Process(pid).cpu_times()
+                self._root_baseline = (cpu.children_user, cpu.children_system)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> ResourceUsage:
+        """
+        Stop sampling.
+
+        :return: Resource usage of the process tree.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        return self.usage
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.sample)
+            except Exception as err:  # noqa
+                log.debug(f"Error sampling resource usage of process {self.pid}: {err}")
+            await asyncio.sleep(self.interval)
+
+    def _processes(self) -> tuple[Optional[psutil.Process], list[psutil.Process]]:
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] if self.include_root else []
+            for child in root.children():
+                if child.pid not in self.exclude:
+                    processes.append(child)
+                    processes.extend(child.children(recursive=True))
+        except psutil.NoSuchProcess:
+            return None, []
+        return root, processes
+
+    def sample(self):
+        """
+        Take a sample of the process tree resource usage.
+
+        This is a blocking call; it's run in a thread while the monitor is running.
+        """
+        root, processes = self._processes()
+        rss = 0
+        cpu_user = 0.0
+        cpu_system = 0.0
+        sampled = 0
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    key = (proc.pid, proc.create_time())
+                    rss += proc.memory_info().rss
+                    cpu = proc.cpu_times()
+                    # Exited children are included in the times of the (running) parent that waited for them
+                    cpu_user += cpu.user + cpu.children_user
+                    cpu_system += cpu.system + cpu.children_system
+                    if hasattr(proc, "io_counters"):
+                        io = proc.io_counters()
+                        self._io[key] = (io.read_bytes, io.write_bytes)
+                sampled += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        if root is not None and not self.include_root:
+            try:
+                cpu = root.cpu_times()
+                cpu_user += max(cpu.children_user - self._root_baseline[0], 0.0)
+                cpu_system += max(cpu.children_system - self._root_baseline[1], 0.0)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+
+        if not sampled:
+            return
+
+        prev = self.usage
+        children = len(processes) - 1 if self.include_root else len(processes)
+        self.usage = ResourceUsage(
+            peak_rss=max(prev.peak_rss or 0, rss),
+            # Times can appear to go back if a process exited but wasn't waited for yet
+            cpu_user=max(prev.cpu_user or 0.0, cpu_user),
+            cpu_system=max(prev.cpu_system or 0.0, cpu_system),
+            max_children=max(prev.max_children or 0, children),
+            read_bytes=sum(read for read, _ in self._io.values()) if self._io else None,
+            write_bytes=sum(write for _, write in self._io.values()) if self._io else None,
+        )
+
+
+__all__ = ["ResourceMonitor", "ResourceUsage", "SAMPLE_INTERVAL"]
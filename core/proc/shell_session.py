@@ -0,0 +1,349 @@
+import asyncio
+import codecs
+import os
+import shlex
+import shutil
+import signal
+import sys
+from os.path import abspath, join
+from typing import Callable, Optional
+from uuid import uuid4
+
+import psutil
+
+from core.log import get_logger
+from core.proc.output_buffer import OUTPUT_BUFFER_SIZE, READ_CHUNK_SIZE, OutputBuffer, wait_for_output
+from core.proc.resource_monitor import ResourceMonitor
+
+log = get_logger(__name__)
+
+# How long to wait for the shell to report the exit code after killing a timed out command
+KILL_TIMEOUT = 1.0
+
+
+class ShellCommand:
+    """
+    Command running in the shell session: its output and exit code.
+    """
+
+    def __init__(self, cmd: str, stdout: OutputBuffer, stderr: OutputBuffer):
+        self.cmd = cmd
+        self.stdout = stdout
+        self.stderr = stderr
+        self.status_code: Optional[int] = None
+        self.stdout_done = asyncio.Event()
+        self.stderr_done = asyncio.Event()
+
+    async def wait(self):
+        """Wait until the shell reports the command finished on both output streams."""
+        await self.stdout_done.wait()
+        await self.stderr_done.wait()
+
+
+class ShellSession:
+    """
+    Long-lived shell running the commands one after another.
+
+    Unlike one-shot commands (each running in a new shell), commands in the
+    session share the shell state: exported variables, an activated Python
+    virtualenv, nvm, shell functions and the like carry over to the next
+    command. The working directory is reset before every command, as the
+    commands are written to run from the project root.
+
+    After each command, the shell prints a sentinel line (unique for the
+    session) with the exit code to stdout, and another one to stderr, so we
+    know where the command output ends. Commands run in their own process
+    group (the shell has job control enabled), so a command that times out
+    is killed without killing the shell.
+
+    Requires bash, and only works on Unix-like systems; use `available()`
+    to check.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        env: dict[str, str],
+        *,
+        max_output_size: int = OUTPUT_BUFFER_SIZE,
+    ):
+        """
+        Create a new shell session. The shell is started on the first `run()`.
+
+        :param root_dir: Project root directory.
+        :param env: Environment variables for the shell.
+        :param max_output_size: How much of each command's output stream to keep in memory.
+        """
+        self.root_dir = root_dir
+        self.env = env
+        self.max_output_size = max_output_size
+        self.token = f"__GPT_PILOT_{uuid4().hex}__"
+        self.lock = asyncio.Lock()
+        self.current: Optional[ShellCommand] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._readers: list[asyncio.Task] = []
+
+    @staticmethod
+    def available() -> bool:
+        """Whether shell sessions are supported on this system."""
+        return sys.platform != "win32" and shutil.which("bash") is not None
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def busy(self) -> bool:
+        """Whether the session is running a command."""
+        return self.lock.locked()
+
+    async def start(self):
+        """
+        Start the shell.
+        """
+        log.debug(f"Starting shell session in {self.root_dir}")
+        self._process = await asyncio.create_subprocess_exec(
+            shutil.which("bash"),
+            "--noprofile",
+            "--norc",
+            cwd=self.root_dir,
+            env=self.env,
+            start_new_session=True,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._readers = [
+            asyncio.create_task(self._read(self._process.stdout, stderr=False)),
+            asyncio.create_task(self._read(self._process.stderr, stderr=True)),
+        ]
+        # Job control puts each command in its own process group
+        await self._send("set -m\n")
+
+    async def _send(self, script: str):
+        self._process.stdin.write(script.encode("utf-8"))
+        await self._process.stdin.drain()
+
+    def _write(self, text: str, stderr: bool):
+        if not text:
+            return
+        if self.current is None:
+            # Output from background jobs started by earlier commands
+            log.debug(f"Discarding shell output between commands: {text[:100]!r}")
+            return
+        (self.current.stderr if stderr else self.current.stdout).write(text)
+
+    def _consume(self, text: str, stderr: bool) -> str:
+        """
+        Split the output on sentinel lines, passing the output to the current command.
+
+        :param text: Output read from the shell.
+        :param stderr: Whether this is the standard error stream.
+        :return: Remaining text that may contain the beginning of a sentinel line.
+        """
+        marker = "\n" + self.token
+        while True:
+            idx = text.find(marker)
+            if idx == -1:
+                # Hold back the end of the output if it could be the start of a marker
+                hold = next((k for k in range(min(len(marker), len(text)), 0, -1) if marker.startswith(text[-k:])), 0)
+                self._write(text[: len(text) - hold], stderr)
+                return text[len(text) - hold :]
+
+            end = text.find("\n", idx + len(marker))
+            if end == -1:
+                self._write(text[:idx], stderr)
+                return text[idx:]
+
+            self._write(text[:idx], stderr)
+            trailer = text[idx + len(marker) : end]
+            text = text[end + 1 :]
+            if self.current is None:
+                continue
+            if stderr:
+                self.current.stderr_done.set()
+            else:
+                try:
+                    self.current.status_code = int(trailer.lstrip(":"))
+                except ValueError:
+                    log.warning(f"Invalid exit code in shell sentinel: {trailer!r}")
+                self.current.stdout_done.set()
+
+    async def _read(self, stream: asyncio.StreamReader, stderr: bool):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        try:
+            while True:
+                data = await stream.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                pending = self._consume(pending + decoder.decode(data), stderr)
+        except (ConnectionError, ValueError) as err:
+            log.debug(f"Error reading shell output: {err}")
+        finally:
+            # The shell exited (eg. the command ran `exit`), so the current command is done too
+            self._write(pending + decoder.decode(b"", final=True), stderr)
+            if self.current is not None:
+                (self.current.stderr_done if stderr else self.current.stdout_done).set()
+
+    @staticmethod
+    def _kill_commands(shell_pid: int, keep: set[int]):
+        # Kill the process groups of the commands started by the shell (except
+        # the ones in `keep`, started by earlier commands), but not the shell itself.
+        # This blocks while waiting for the processes to exit, so it should be run in an executor.
+        try:
+            shell = psutil.Process(shell_pid)
+            shell_pgid = os.getpgid(shell_pid)
+            children = [child for child in shell.children() if child.pid not in keep]
+        except (psutil.NoSuchProcess, ProcessLookupError):
+            return
+
+        processes = []
+        for child in children:
+            try:
+                processes.extend(child.children(recursive=True))
+                processes.append(child)
+                pgid = os.getpgid(child.pid)
+                if pgid != shell_pgid:
+                    os.killpg(pgid, signal.SIGKILL)
+                else:
+                    for proc in [child, *child.children(recursive=True)]:
+                        proc.kill()
+            except (psutil.NoSuchProcess, ProcessLookupError):
+                pass
+
+        psutil.wait_procs(processes, timeout=KILL_TIMEOUT)
+
+    async def run(
+        self,
+        cmd: str,
+        *,
+        cwd: str = ".",
+        timeout: Optional[float] = None,
+        output_handler: Optional[Callable] = None,
+        monitor: Optional[ResourceMonitor] = None,
+    ) -> tuple[Optional[int], str, str]:
+        """
+        Run the command in the shell session and wait for it to finish.
+
+        Status code is the command exit code, or None if the command timed
+        out and was killed. If the shell itself exits (eg. the command ran
+        `exit`), it's restarted on the next run, losing the shell state.
+
+        :param cmd: Command to run.
+        :param cwd: Working directory (relative to the project root).
+        :param timeout: Timeout in seconds (None for no timeout).
+        :param output_handler: Async callback called with new (stdout, stderr) output.
+        :param monitor: Resource monitor to sample the command resource usage with, if any.
+        :return: Tuple of (status code, stdout, stderr).
+        """
+        async with self.lock:
+            if not self.is_running:
+                await self.start()
+
+            command = ShellCommand(cmd, OutputBuffer(self.max_output_size), OutputBuffer(self.max_output_size))
+            try:
+                background_jobs = {child.pid for child in psutil.Process(self._process.pid).children()}
+            except psutil.NoSuchProcess:
+                background_jobs = set()
+
+            self.current = command
+            if monitor:
+                # The shell itself isn't part of the command, and neither are the background jobs
+                monitor.start(self._process.pid, include_root=False, exclude=background_jobs)
+            try:
+                return await self._run(command, cwd, timeout, output_handler, background_jobs)
+            except asyncio.CancelledError:
+                log.debug(f"Running {cmd} in shell session was cancelled, killing it")
+                await self._kill(background_jobs)
+                raise
+            finally:
+                if monitor:
+                    await monitor.stop()
+                self.current = None
+                command.stdout.close()
+                command.stderr.close()
+
+    async def _run(
+        self,
+        command: ShellCommand,
+        cwd: str,
+        timeout: Optional[float],
+        output_handler: Optional[Callable],
+        background_jobs: set[int],
+    ) -> tuple[Optional[int], str, str]:
+        abs_cwd = abspath(join(self.root_dir, cwd))
+        # Stdin is closed so the command can't read (and eat) the following lines of the script
+        await self._send(
+            f"cd {shlex.quote(abs_cwd)} && {{ eval {shlex.quote(command.cmd)}\n}} < /dev/null\n"
+            f"__status=$?; printf '\\n%s:%d\\n' {self.token} $__status; printf '\\n%s\\n' {self.token} >&2\n"
+        )
+
+        async def forward_output():
+            out, err = command.stdout.drain(), command.stderr.drain()
+            if output_handler and (out or err):
+                await output_handler(out, err)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        finished = asyncio.create_task(command.wait())
+        output = None
+        try:
+            while not finished.done():
+                remaining = deadline - loop.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                if output is None:
+                    output = asyncio.create_task(wait_for_output(command.stdout, command.stderr))
+                done, _ = await asyncio.wait([output, finished], timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if output in done:
+                    output = None
+                    await forward_output()
+
+            timed_out = not finished.done()
+            if timed_out:
+                log.debug(f"Command {command.cmd} still running after {timeout}s, killing it")
+                await self._kill(background_jobs)
+                done, _ = await asyncio.wait([finished], timeout=KILL_TIMEOUT)
+                if not done:
+                    # The shell itself is stuck (eg. in a shell loop), restart it next time
+                    await self.close()
+        finally:
+            if output is not None:
+                output.cancel()
+            finished.cancel()
+
+        await forward_output()
+        if timed_out:
+            status_code = None
+        elif command.status_code is not None:
+            status_code = command.status_code
+        else:
+            # The shell exited before reporting the exit code
+            status_code = await self._process.wait()
+        return status_code, command.stdout.getvalue(), command.stderr.getvalue()
+
+    async def _kill(self, background_jobs: set[int]):
+        if not self.is_running:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._kill_commands, self._process.pid, background_jobs)
+
+    async def close(self):
+        """
+        Stop the shell, along with any processes it started.
+        """
+        if not self.is_running:
+            return
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._kill_commands, self._process.pid, set())
+        try:
+            self._process.kill()
+        except ProcessLookupError:
+            pass
+        await self._process.wait()
+        await asyncio.wait(self._readers, timeout=KILL_TIMEOUT)
+
+
+__all__ = ["ShellSession"]
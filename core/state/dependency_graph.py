@@ -0,0 +1,275 @@
+import re
+from posixpath import dirname, join, normpath, splitext
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+if TYPE_CHECKING:
+    from core.db.models import File
+
+JS_EXTENSIONS = [".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".vue", ".svelte"]
+# Extensions tried (in order) when resolving extension-less JS/TS imports
+JS_RESOLVE_EXTENSIONS = [".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".json", ".vue", ".svelte"]
+PY_EXTENSIONS = [".py"]
+
+# import x from './x'; import { a, b } from "./x"; export * from './x'
+JS_FROM_RE = re.compile(r"""\b(?:import|export)\s[^'";]*?\bfrom\s*['"]([^'"\n]+)['"]""")
+# import './styles.css'
+JS_SIDE_EFFECT_RE = re.compile(r"""\bimport\s*['"]([^'"\n]+)['"]""")
+# require('./x'), import('./x')
+JS_CALL_RE = re.compile(r"""\b(?:require|import)\s*\(\s*['"]([^'"\n]+)['"]\s*\)""")
+# from .x import a, b / from x.y import (a, b)
+PY_FROM_RE = re.compile(r"^[ \t]*from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+(?:\(([^)]*)\)|([\w, \t]+))", re.MULTILINE)
+# import x.y, z as w
+PY_IMPORT_RE = re.compile(r"^[ \t]*import[ \t]+([\w., \t]+)", re.MULTILINE)
+
+
+def _js_candidates(importer: str, specifier: str) -> list[str]:
+    if not specifier.startswith("."):
+        # Package (or aliased) import, not a project file
+        return []
+    base = normpath(join(dirname(importer), specifier))
+    return (
+        [base]
+        + [base + ext for ext in JS_RESOLVE_EXTENSIONS]
+        + [join(base, "index" + ext) for ext in JS_RESOLVE_EXTENSIONS]
+    )
+
+
+def _py_module_candidates(importer: str, module: str) -> list[str]:
+    level = len(module) - len(module.lstrip("."))
+    parts = [part for part in module[level:].split(".") if part]
+    if level:
+        base_dirs = [dirname(importer)]
+        for _ in range(level - 1):
+            base_dirs = [dirname(base_dirs[0])]
+    else:
+        # Absolute imports are resolved from the project root, or the importing file's directory
+        base_dirs = ["", dirname(importer)]
+
+    candidates = []
+    for base_dir in base_dirs:
+        base = normpath(join(base_dir, *parts)) if parts or base_dir else ""
+        if not base or base == ".":
+            candidates.append("__init__.py")
+            continue
+        candidates.extend([base + ".py", join(base, "__init__.py")])
+    return candidates
+
+
+def parse_imports(path: str, content: str) -> list[list[str]]:
+    """
+    Statically parse the local imports of a JS/TS or Python file.
+
+    Imports aren't resolved against the actual project files here; each
+    import is returned as a list of candidate paths (in order of preference)
+    it could refer to. Package imports (eg. `react` or `os`) that can't
+    refer to a project file are skipped, except absolute Python imports,
+    which may refer to a project module.
+
+    :param path: Path of the file.
+    :param content: Content of the file.
+    :return: List of candidate path lists, one for each import.
+    """
+    ext = splitext(path)[1].lower()
+    imports = []
+
+    if ext in JS_EXTENSIONS:
+        for regex in [JS_FROM_RE, JS_SIDE_EFFECT_RE, JS_CALL_RE]:
+            for match in regex.finditer(content):
+                candidates = _js_candidates(path, match.group(1))
+                if candidates:
+                    imports.append(candidates)
+
+    elif ext in PY_EXTENSIONS:
+        for match in PY_FROM_RE.finditer(content):
+            module, names = match.group(1), match.group(2) or match.group(3)
+            imports.append(_py_module_candidates(path, module))
+            # The imported names may be submodules of the package
+            for item in names.split(","):
+                name = item.split()[0] if item.split() else ""
+                if name.isidentifier():
+                    sep = "" if module.endswith(".") else "."
+                    imports.append(_py_module_candidates(path, module + sep + name))
+        for match in PY_IMPORT_RE.finditer(content):
+            for item in match.group(1).split(","):
+                module = item.split()[0] if item.split() else ""
+                if module:
+                    imports.append(_py_module_candidates(path, module))
+
+    return imports
+
+
+class DependencyGraph:
+    """
+    Import/reference graph of the project files.
+
+    Edges come from the statically parsed JS/TS and Python imports, and from
+    the references the LLM listed when describing the file
+    (`meta["references"]`). Both forward (file -> files it imports) and
+    reverse (file -> files importing it) adjacency is kept, so dependencies
+    and dependents of a file can be looked up quickly.
+
+    The graph is updated incrementally: a file is only re-parsed when its
+    content (or references) change, and adding or removing a file only
+    re-resolves the imports that may refer to it.
+    """
+
+    def __init__(self):
+        self.forward: dict[str, set[str]] = {}
+        self.reverse: dict[str, set[str]] = {}
+        # path -> candidate path lists of its imports
+        self.imports: dict[str, list[list[str]]] = {}
+        # path -> references from file metadata
+        self.references: dict[str, list[str]] = {}
+        # path -> (content hash, references) of the parsed version, to detect changes
+        self.signatures: dict[str, tuple[Optional[str], tuple[str, ...]]] = {}
+        # candidate path -> files with an import that may refer to it
+        self.wanted: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.imports)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.imports
+
+    def _unwant(self, path: str):
+        """Forget the candidate paths the file's imports and references may refer to."""
+        for candidate in {c for candidates in self.imports[path] for c in candidates} | set(self.references[path]):
+            importers = self.wanted.get(candidate)
+            if importers is not None:
+                importers.discard(path)
+                if not importers:
+                    del self.wanted[candidate]
+
+    def _resolve(self, path: str):
+        """Recompute the outgoing edges of the file, from its imports and references."""
+        edges = set()
+        for candidates in self.imports[path]:
+            target = next((candidate for candidate in candidates if candidate in self), None)
+            if target is not None:
+                edges.add(target)
+        edges.update(ref for ref in self.references[path] if ref in self)
+        edges.discard(path)
+
+        for target in self.forward.get(path, set()) - edges:
+            self.reverse.get(target, set()).discard(path)
+        for target in edges:
+            self.reverse.setdefault(target, set()).add(path)
+        self.forward[path] = edges
+
+    def update(
+        self,
+        path: str,
+        content: str,
+        *,
+        references: Optional[list[str]] = None,
+        content_hash: Optional[str] = None,
+    ):
+        """
+        Add the file to the graph, or update its edges if it's already in the graph.
+
+        :param path: File path.
+        :param content: File content.
+        :param references: Files this file references (from the file description), if known.
+        :param content_hash: Hash of the content, used by `sync()` to skip unchanged files.
+        """
+        is_new = path not in self
+        if not is_new:
+            self._unwant(path)
+
+        self.imports[path] = parse_imports(path, content)
+        self.references[path] = [normpath(ref.lstrip("/")) for ref in references or []]
+        self.signatures[path] = (content_hash, tuple(references or []))
+        for candidates in self.imports[path]:
+            for candidate in candidates:
+                self.wanted.setdefault(candidate, set()).add(path)
+        for ref in self.references[path]:
+            self.wanted.setdefault(ref, set()).add(path)
+
+        self.reverse.setdefault(path, set())
+        self._resolve(path)
+        if is_new:
+            # Imports that couldn't be resolved before may refer to the new file
+            for importer in self.wanted.get(path, set()) - {path}:
+                self._resolve(importer)
+
+    def remove(self, path: str):
+        """
+        Remove the file from the graph (if present).
+
+        :param path: File path.
+        """
+        if path not in self:
+            return
+
+        self._unwant(path)
+        del self.imports[path]
+        del self.references[path]
+        self.signatures.pop(path, None)
+
+        for target in self.forward.pop(path, set()):
+            self.reverse[target].discard(path)
+        # Importers may now resolve to another candidate (eg. `./x.ts` instead of `./x.js`)
+        for importer in self.reverse.pop(path, set()):
+            self._resolve(importer)
+
+    def sync(self, files: Iterable["File"]):
+        """
+        Bring the graph up to date with the project files.
+
+        Only files that were added, or whose content or references changed,
+        are (re-)parsed; files no longer in the project are removed.
+
+        :param files: Project files.
+        """
+        seen = set()
+        for file in files:
+            seen.add(file.path)
+            references = (file.meta or {}).get("references") or []
+            if self.signatures.get(file.path) == (file.content_id, tuple(references)):
+                continue
+            self.update(file.path, file.content.content, references=references, content_hash=file.content_id)
+
+        for path in list(self.imports):
+            if path not in seen:
+                self.remove(path)
+
+    def within(
+        self,
+        paths: Union[str, Iterable[str]],
+        hops: int = 1,
+        *,
+        dependencies: bool = True,
+        dependents: bool = False,
+    ) -> dict[str, int]:
+        """
+        Find the files within the given number of hops from the given files.
+
+        :param paths: File path, or paths, to start from.
+        :param hops: Maximum distance (number of edges) from the starting files.
+        :param dependencies: Follow the edges to the files imported/referenced.
+        :param dependents: Follow the edges to the importing/referencing files.
+        :return: Files found (excluding the starting files), mapped to their distance.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        start = {path for path in paths if path in self}
+        found: dict[str, int] = {}
+        frontier = start
+        for distance in range(1, hops + 1):
+            next_frontier = set()
+            for path in frontier:
+                if dependencies:
+                    next_frontier.update(self.forward.get(path, ()))
+                if dependents:
+                    next_frontier.update(self.reverse.get(path, ()))
+            next_frontier -= start
+            next_frontier -= found.keys()
+            if not next_frontier:
+                break
+            for path in next_frontier:
+                found[path] = distance
+            frontier = next_frontier
+        return found
+
+
+__all__ = ["DependencyGraph", "parse_imports"]
@@ -0,0 +1,240 @@
+import re
+from collections import Counter
+from math import log as ln
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from core.db.models import File
+    from core.state.dependency_graph import DependencyGraph
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term weights of the indexed fields; path and description are short, but very telling
+PATH_WEIGHT = 3
+DESCRIPTION_WEIGHT = 2
+CONTENT_WEIGHT = 1
+# Only index the start of very large files
+MAX_INDEXED_CHARS = 50_000
+# Default number of top ranked files to propose
+MAX_CANDIDATES = 10
+# Files scoring below this fraction of the top score aren't proposed
+MIN_RELATIVE_SCORE = 0.2
+# How far in the dependency graph to follow the imports/references of the top ranked files
+REFERENCE_HOPS = 1
+
+WORD_RE = re.compile(r"[A-Za-z0-9_$]+")
+# Splits identifiers: "getUserById" -> get, User, By, Id; "HTTPServer" -> HTTP, Server
+SUBWORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = frozenset(
+    "a an and are as at be by do for from has have if in is it its not of on or so that the this to was we "
+    "will with you your const let var function return import export default require new null undefined true "
+    "false class def self none else elif then try catch async await".split()
+)
+
+
+def _stem(word: str) -> str:
+    # Minimal plural stemming, so "users" matches "user"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split the text into index terms.
+
+    Identifiers are split into their parts (camelCase, snake_case), but the
+    full identifier is kept as well. Terms are lowercased and stemmed, and
+    stopwords (including common keywords) are dropped.
+
+    :param text: Text to tokenize.
+    :return: List of terms.
+    """
+    terms = []
+    for word in WORD_RE.findall(text):
+        parts = SUBWORD_RE.findall(word)
+        if len(parts) > 1:
+            terms.append(word.lower())
+        terms.extend(part.lower() for part in parts)
+    return [_stem(term) for term in terms if len(term) > 1 and term not in STOPWORDS]
+
+
+class RelevanceIndex:
+    """
+    Lexical (BM25) index of the project files.
+
+    Indexes the file paths, descriptions (`meta["description"]`) and contents,
+    so that files relevant to a task can be proposed without asking the LLM
+    to go through the whole project. The index is updated incrementally:
+    `update()` re-indexes a single file, and `sync()` re-indexes only the
+    files whose content or description changed.
+    """
+
+    def __init__(self):
+        # term -> {path: weighted term frequency}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.doc_terms: dict[str, Counter] = {}
+        self.doc_len: dict[str, int] = {}
+        self.total_len = 0
+        # path -> (content hash, description) of the indexed version, to detect changes
+        self.signatures: dict[str, tuple[Optional[str], Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.doc_len
+
+    def update(
+        self,
+        path: str,
+        content: str,
+        *,
+        description: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ):
+        """
+        Add the file to the index, or re-index it if it's already indexed.
+
+        :param path: File path.
+        :param content: File content.
+        :param description: File description, if any.
+        :param content_hash: Hash of the content, used by `sync()` to skip unchanged files.
+        """
+        self.remove(path)
+
+        terms = Counter()
+        for term in tokenize(path.replace("/", " ").replace(".", " ")):
+            terms[term] += PATH_WEIGHT
+        for term in tokenize(description or ""):
+            terms[term] += DESCRIPTION_WEIGHT
+        for term in tokenize(content[:MAX_INDEXED_CHARS]):
+            terms[term] += CONTENT_WEIGHT
+
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[path] = tf
+        self.doc_terms[path] = terms
+        self.doc_len[path] = sum(terms.values())
+        self.total_len += self.doc_len[path]
+        self.signatures[path] = (content_hash, description)
+
+    def remove(self, path: str):
+        """
+        Remove the file from the index (if indexed).
+
+        :param path: File path.
+        """
+        terms = self.doc_terms.pop(path, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self.postings[term]
+            del docs[path]
+            if not docs:
+                del self.postings[term]
+        self.total_len -= self.doc_len.pop(path)
+        self.signatures.pop(path, None)
+
+    def sync(self, files: Iterable["File"]):
+        """
+        Bring the index up to date with the project files.
+
+        Only files that were added, or whose content or description changed,
+        are (re-)indexed; files no longer in the project are removed.
+
+        :param files: Project files.
+        """
+        seen = set()
+        for file in files:
+            seen.add(file.path)
+            description = (file.meta or {}).get("description")
+            if self.signatures.get(file.path) == (file.content_id, description) and file.path in self:
+                continue
+            self.update(
+                file.path,
+                file.content.content,
+                description=description,
+                content_hash=file.content_id,
+            )
+
+        for path in list(self.doc_len):
+            if path not in seen:
+                self.remove(path)
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[tuple[str, float]]:
+        """
+        Rank the files by relevance to the query.
+
+        :param query: Query text (eg. task description).
+        :param limit: Maximum number of results (default: all matching files).
+        :return: List of (path, score) tuples, best match first.
+        """
+        if not self.doc_len:
+            return []
+
+        n_docs = len(self.doc_len)
+        avg_len = self.total_len / n_docs or 1
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = ln(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for path, tf in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[path] / avg_len)
+                scores[path] = scores.get(path, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit is not None else ranked
+
+    def candidates(
+        self,
+        query: str,
+        limit: int = MAX_CANDIDATES,
+        *,
+        graph: Optional["DependencyGraph"] = None,
+        hops: int = REFERENCE_HOPS,
+    ) -> list[str]:
+        """
+        Propose files relevant to the query.
+
+        Returns the top ranked files (skipping those scoring much lower than
+        the best match), followed by the files they import or reference, up
+        to `hops` away in the dependency graph (the reference closure).
+
+        :param query: Query text (eg. task description).
+        :param limit: Maximum number of top ranked files.
+        :param graph: Dependency graph of the project files, for the reference closure (optional).
+        :param hops: Maximum distance of the referenced files from the top ranked files.
+        :return: List of proposed file paths.
+        """
+        ranked = self.search(query, limit)
+        if not ranked:
+            return []
+
+        top_score = ranked[0][1]
+        selected = [path for path, score in ranked if score >= top_score * MIN_RELATIVE_SCORE]
+        if graph is None:
+            return selected
+        closure = graph.within(selected, hops)
+        return selected + sorted((path for path in closure if path in self), key=lambda path: (closure[path], path))
+
+
+def candidate_recall(candidates: Iterable[str], selected: Iterable[str]) -> Optional[float]:
+    """
+    Compute the fraction of the selected files that were proposed as candidates.
+
+    :param candidates: Proposed files.
+    :param selected: Files actually selected (eg. by the LLM).
+    :return: Recall, or None if no files were selected.
+    """
+    selected = set(selected)
+    if not selected:
+        return None
+    return len(selected & set(candidates)) / len(selected)
+
+
+__all__ = ["RelevanceIndex", "tokenize", "candidate_recall", "MAX_CANDIDATES"]
@@ -3,7 +3,17 @@ from typing import TYPE_CHECKING, Optional
 from uuid import UUID, uuid4
 
 from core.config import FileSystemType, get_config
-from core.db.models import Branch, ExecLog, File, FileContent, LLMRequest, Project, ProjectState, UserInput
+from core.db.models import (
+    Branch,
+    ExecLog,
+    File,
+    FileContent,
+    FileDescription,
+    LLMRequest,
+    Project,
+    ProjectState,
+    UserInput,
+)
 from core.db.models.specification import Specification
 from core.db.session import SessionManager
 from core.disk.ignore import IgnoreMatcher
@@ -11,12 +21,15 @@ from core.disk.vfs import LocalDiskVFS, MemoryVFS, VirtualFileSystem
 from core.llm.request_log import LLMRequestLog, LLMRequestStatus
 from core.log import get_logger
 from core.proc.exec_log import ExecLog as ExecLogData
+from core.state.dependency_graph import DependencyGraph
+from core.state.relevance_index import RelevanceIndex
 from core.telemetry import telemetry
 from core.ui.base import UIBase
 from core.ui.base import UserInput as UserInputData
 
 if TYPE_CHECKING:
     from core.agents.base import BaseAgent
+    from core.agents.description_worker import DescriptionWorker
 
 log = get_logger(__name__)
 
@@ -33,11 +46,15 @@ class StateManager:
 
     current_state: Optional[ProjectState]
     next_state: Optional[ProjectState]
+    # Set by the Orchestrator if files are described in the background
+    description_worker: Optional["DescriptionWorker"] = None
 
     def __init__(self, session_manager: SessionManager, ui: Optional[UIBase] = None):
         self.session_manager = session_manager
         self.ui = ui
         self.file_system = None
+        self.relevance_index = RelevanceIndex()
+        self.dependency_graph = DependencyGraph()
         self.project = None
         self.branch = None
         self.current_state = None
@@ -53,6 +70,42 @@ class StateManager:
         async with self.session_manager as session:
             return await Project.get_all_projects(session)
 
+    async def get_command_usage(self, project_id: Optional[UUID] = None) -> list:
+        """
+        Summarize the resource usage of the commands run, by command.
+
+        See `ExecLog.get_usage_summary()` for details.
+
+        :param project_id: Only include the commands run in this project (default: all projects).
+        :return: List of per-command summary rows.
+        """
+        async with self.session_manager as session:
+            return await ExecLog.get_usage_summary(session, project_id)
+
+    async def get_llm_usage(self, project_id: UUID):
+        """
+        Summarize the LLM requests made in the project.
+
+        See `LLMRequest.get_usage_summary()` for details.
+
+        :param project_id: Project ID.
+        :return: Summary row.
+        """
+        async with self.session_manager as session:
+            return await LLMRequest.get_usage_summary(session, project_id)
+
+    async def get_relevant_files_selections(self, project_id: Optional[UUID] = None) -> list[ProjectState]:
+        """
+        Get the recorded selections of relevant files.
+
+        See `ProjectState.get_relevant_files_selections()` for details.
+
+        :param project_id: Only include the selections in this project (default: all projects).
+        :return: List of project states with the selections.
+        """
+        async with self.session_manager as session:
+            return await ProjectState.get_relevant_files_selections(session, project_id)
+
     async def create_project(self, name: str, folder_name: Optional[str] = None) -> Project:
         """
         Create a new project and set it as the current one.
@@ -85,6 +138,8 @@ class StateManager:
         self.project = project
         self.branch = branch
         self.file_system = await self.init_file_system(load_existing=False)
+        self.relevance_index = RelevanceIndex()
+        self.dependency_graph = DependencyGraph()
         return project
 
     async def delete_project(self, project_id: UUID) -> bool:
@@ -172,6 +227,8 @@ class StateManager:
         self.project = state.branch.project
         self.next_state = await state.create_next_state()
         self.file_system = await self.init_file_system(load_existing=True)
+        self.relevance_index = RelevanceIndex()
+        self.dependency_graph = DependencyGraph()
         log.debug(
             f"Loaded project {self.project} ({self.project.id}) "
             f"branch {self.branch} ({self.branch.id}"
@@ -258,6 +315,18 @@ class StateManager:
             request_log.duration,
             request_log.status != LLMRequestStatus.SUCCESS,
         )
+        if request_log.json_repaired:
+            telemetry.inc("num_llm_json_repairs")
+        if request_log.condensed_tokens_saved:
+            telemetry.inc("num_condensed_tokens_saved", request_log.condensed_tokens_saved)
+        if request_log.hedged:
+            telemetry.inc("num_llm_hedged_requests")
+            if request_log.hedge_winner == "backup":
+                telemetry.inc("num_llm_hedge_backup_wins")
+            telemetry.inc(
+                "num_llm_hedge_wasted_tokens",
+                request_log.wasted_prompt_tokens + request_log.wasted_completion_tokens,
+            )
         LLMRequest.from_request_log(self.current_state, agent, request_log)
 
     async def log_user_input(self, question: str, response: UserInputData):
@@ -323,6 +392,51 @@ class StateManager:
         """
         return self.current_state.get_file_by_path(path)
 
+    def get_relevance_index(self) -> RelevanceIndex:
+        """
+        Get the lexical relevance index of the project files.
+
+        The index is brought up to date with the current project state
+        (only changed files are re-indexed).
+
+        :return: The relevance index.
+        """
+        self.relevance_index.sync(self.current_state.files)
+        return self.relevance_index
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        """
+        Get the import/reference graph of the project files.
+
+        The graph is brought up to date with the current project state
+        (only changed files are re-parsed).
+
+        :return: The dependency graph.
+        """
+        self.dependency_graph.sync(self.current_state.files)
+        return self.dependency_graph
+
+    async def get_file_descriptions(self, content_ids: list[str], describer: str) -> dict[str, FileDescription]:
+        """
+        Get the cached descriptions of the file contents.
+
+        :param content_ids: IDs (hashes) of the file contents.
+        :param describer: Describer (model and prompt version) the descriptions were made with.
+        :return: Cached descriptions, by content ID.
+        """
+        return await FileDescription.get_many(self.current_session, content_ids, describer)
+
+    async def save_file_description(self, content_id: str, describer: str, description: str, references: list[str]):
+        """
+        Store the file content description in the description cache.
+
+        :param content_id: ID (hash) of the file content.
+        :param describer: Describer (model and prompt version) the description was made with.
+        :param description: The file description.
+        :param references: Files referenced by the file.
+        """
+        await FileDescription.store(self.current_session, content_id, describer, description, references)
+
     async def save_file(
         self,
         path: str,
@@ -341,10 +455,8 @@ class StateManager:
         :param metadata: Optional metadata (eg. description) to save with the file.
         :param from_template: Whether the file is part of a template.
         """
-        try:
-            original_content = self.file_system.read(path)
-        except ValueError:
-            original_content = ""
+        original_file = self.next_state.get_file_by_path(path)
+        original_lines = original_file.content.count()[0] if original_file else 0
 
         # FIXME: VFS methods should probably be async
         self.file_system.save(path, content)
@@ -357,9 +469,12 @@ class StateManager:
             await self.ui.open_editor(self.file_system.get_full_path(path))
         if metadata:
             file.meta = metadata
+        meta = file.meta or {}
+        self.relevance_index.update(path, content, description=meta.get("description"), content_hash=hash)
+        self.dependency_graph.update(path, content, references=meta.get("references"), content_hash=hash)
 
         if not from_template:
-            delta_lines = len(content.splitlines()) - len(original_content.splitlines())
+            delta_lines = file_content.count()[0] - original_lines
             telemetry.inc("created_lines", delta_lines)
 
     async def init_file_system(self, load_existing: bool) -> VirtualFileSystem:
@@ -444,8 +559,7 @@ class StateManager:
         for path, file in known_files.items():
             if path not in files_in_workspace:
                 log.debug(f"File {path} was removed from workspace, deleting from project")
-                next_state_file = self.next_state.get_file_by_path(path)
-                self.next_state.files.remove(next_state_file)
+                self.next_state.remove_file(path)
                 removed_files.append(file.path)
 
         return imported_files, removed_files
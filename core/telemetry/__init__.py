@@ -122,6 +122,22 @@ class Telemetry:
                 "num_llm_errors": 0,
                 # Number of tokens used for LLM requests
                 "num_llm_tokens": 0,
+                # Number of LLM retries avoided by repairing invalid JSON responses locally
+                "num_llm_json_repairs": 0,
+                # Number of prompt tokens saved by condensing command output and logs (estimate)
+                "num_condensed_tokens_saved": 0,
+                # Number of LLM requests hedged with a backup request
+                "num_llm_hedged_requests": 0,
+                # Number of hedged LLM requests won by the backup request
+                "num_llm_hedge_backup_wins": 0,
+                # Number of tokens spent on the losing hedged requests (estimate)
+                "num_llm_hedge_wasted_tokens": 0,
+                # Number of LLM calls started speculatively while waiting for the user
+                "num_speculations": 0,
+                # Number of speculative LLM calls whose result was used
+                "num_speculation_hits": 0,
+                # Number of tokens used by speculative LLM calls whose result wasn't used
+                "num_speculation_wasted_tokens": 0,
                 # Number of development steps
                 "num_steps": 0,
                 # Number of commands run during development
@@ -1,3 +1,4 @@
+import asyncio
 from json import loads
 from os.path import dirname, join
 from typing import TYPE_CHECKING, Any, Optional, Type
@@ -5,7 +6,10 @@ from uuid import uuid4
 
 from pydantic import BaseModel
 
+from core.config import get_config
+from core.disk.vfs import LocalDiskVFS
 from core.log import get_logger
+from core.templates.dependency_cache import DEPENDENCY_CACHE_DIR, DependencyCache
 from core.templates.render import Renderer
 
 if TYPE_CHECKING:
@@ -134,6 +138,44 @@ class BaseProjectTemplate:
         """
         raise NotImplementedError()
 
+    def get_dependency_cache(self) -> Optional[DependencyCache]:
+        """
+        Get the template dependency cache, if enabled.
+
+        The cache is only used for projects stored on the local disk.
+
+        :return: Dependency cache, or None if not available.
+        """
+        config = get_config()
+        if not config.proc.template_dependency_cache:
+            return None
+        if not isinstance(self.state_manager.file_system, LocalDiskVFS):
+            return None
+        return DependencyCache(join(config.fs.workspace_root, DEPENDENCY_CACHE_DIR))
+
+    async def install_node_modules(self):
+        """
+        Install the Node.js dependencies of the project.
+
+        If the same dependencies (same `package.json`) were already installed
+        for another project, they're restored from the dependency cache
+        instead of running `npm install`. This also works offline.
+        """
+        cache = self.get_dependency_cache()
+        if cache is None:
+            await self.process_manager.run_command("npm install")
+            return
+
+        project_dir = self.state_manager.file_system.root
+        key = cache.key(self.state_manager.file_system.read("package.json"))
+        if await asyncio.to_thread(cache.restore, key, project_dir):
+            log.info(f"Restored dependencies for project template {self.name} from cache")
+            return
+
+        status_code, _, _ = await self.process_manager.run_command("npm install")
+        if status_code == 0:
+            await asyncio.to_thread(cache.store, key, project_dir)
+
     @property
     def options_dict(self) -> dict[str, Any]:
         """Template options as a Python dictionary."""
@@ -0,0 +1,145 @@
+import os
+import platform
+import shutil
+import sys
+from hashlib import sha1
+from os.path import exists, isdir, join
+from uuid import uuid4
+
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# Cache directory, relative to the workspace root (so it's on the same file system as the projects)
+DEPENDENCY_CACHE_DIR = ".template-cache"
+# Dependency directory and lockfile snapshotted after a successful install
+NODE_MODULES = "node_modules"
+NODE_LOCKFILE = "package-lock.json"
+
+
+def _link_or_copy(src: str, dst: str):
+    """
+    Hardlink the file, falling back to a copy.
+
+    Hardlinks fail across file systems (and on some file systems that
+    don't support them), in which case the file is copied instead.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class DependencyCache:
+    """
+    Local cache of installed template dependencies.
+
+    Project templates run `npm install` for every new project, which is
+    slow and requires network access. Since the rendered `package.json` is
+    usually identical between projects, the installed `node_modules` (and
+    `package-lock.json`) is snapshotted after the first install, keyed by
+    the hash of `package.json`, and materialized for later projects using
+    hardlinks (or copies, where hardlinks aren't supported).
+
+    Hardlinked files are shared between the cache and the projects. Package
+    managers replace the files instead of modifying them in place, so this
+    is safe in practice, but tools that patch files in `node_modules` in
+    place would also modify the cached copy.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Create a new dependency cache.
+
+        :param cache_dir: Directory to store the cached dependencies in.
+        """
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(manifest: str) -> str:
+        """
+        Compute the cache key for the package manifest.
+
+        Installed packages may contain platform-specific binaries, so the
+        key includes the platform as well.
+
+        :param manifest: Contents of the (rendered) `package.json`.
+        :return: Cache key.
+        """
+        data = f"{sys.platform}-{platform.machine()}\n{manifest}"
+        return sha1(data.encode("utf-8")).hexdigest()
+
+    def has(self, key: str) -> bool:
+        """
+        Check whether the dependencies are cached.
+
+        :param key: Cache key, as returned by `key()`.
+        :return: True if the dependencies are cached.
+        """
+        return isdir(join(self.cache_dir, key, NODE_MODULES))
+
+    def restore(self, key: str, project_dir: str) -> bool:
+        """
+        Materialize the cached dependencies in the project directory.
+
+        This is a blocking operation, run it in a thread from async code.
+
+        :param key: Cache key, as returned by `key()`.
+        :param project_dir: Project directory (containing `package.json`).
+        :return: True if the dependencies were restored, False if not cached (or already installed).
+        """
+        if not self.has(key) or exists(join(project_dir, NODE_MODULES)):
+            return False
+
+        entry_dir = join(self.cache_dir, key)
+        try:
+            shutil.copytree(
+                join(entry_dir, NODE_MODULES),
+                join(project_dir, NODE_MODULES),
+                symlinks=True,
+                copy_function=_link_or_copy,
+            )
+            if exists(join(entry_dir, NODE_LOCKFILE)) and not exists(join(project_dir, NODE_LOCKFILE)):
+                shutil.copy2(join(entry_dir, NODE_LOCKFILE), join(project_dir, NODE_LOCKFILE))
+        except OSError as err:
+            log.warning(f"Error restoring cached dependencies {key} to {project_dir}: {err}", exc_info=True)
+            shutil.rmtree(join(project_dir, NODE_MODULES), ignore_errors=True)
+            return False
+
+        log.debug(f"Restored cached dependencies {key} to {project_dir}")
+        return True
+
+    def store(self, key: str, project_dir: str) -> bool:
+        """
+        Snapshot the installed dependencies from the project directory.
+
+        The snapshot is a full copy (not hardlinks), so later changes in the
+        project don't affect it. It is written to a temporary directory and
+        then moved in place, so a partial snapshot is never used.
+
+        This is a blocking operation, run it in a thread from async code.
+
+        :param key: Cache key, as returned by `key()`.
+        :param project_dir: Project directory with the installed dependencies.
+        :return: True if the dependencies were stored.
+        """
+        if self.has(key) or not isdir(join(project_dir, NODE_MODULES)):
+            return False
+
+        tmp_dir = join(self.cache_dir, f"{key}.tmp-{uuid4().hex}")
+        try:
+            shutil.copytree(join(project_dir, NODE_MODULES), join(tmp_dir, NODE_MODULES), symlinks=True)
+            if exists(join(project_dir, NODE_LOCKFILE)):
+                shutil.copy2(join(project_dir, NODE_LOCKFILE), join(tmp_dir, NODE_LOCKFILE))
+            os.rename(tmp_dir, join(self.cache_dir, key))
+        except OSError as err:
+            # Also happens if another process stored the same dependencies in the meantime
+            log.warning(f"Error caching dependencies {key} from {project_dir}: {err}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        log.debug(f"Cached dependencies {key} from {project_dir}")
+        return True
+
+
+__all__ = ["DependencyCache", "DEPENDENCY_CACHE_DIR"]
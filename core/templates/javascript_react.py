@@ -32,4 +32,4 @@ class JavascriptReactProjectTemplate(BaseProjectTemplate):
     options_description = ""
 
     async def install_hook(self):
-        await self.process_manager.run_command("npm install")
+        await self.install_node_modules()
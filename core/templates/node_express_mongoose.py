@@ -38,4 +38,4 @@ class NodeExpressMongooseProjectTemplate(BaseProjectTemplate):
     options_description = ""
 
     async def install_hook(self):
-        await self.process_manager.run_command("npm install")
+        await self.install_node_modules()
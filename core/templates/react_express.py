@@ -82,7 +82,7 @@ class ReactExpressProjectTemplate(BaseProjectTemplate):
     options_description = TEMPLATE_OPTIONS.strip()
 
     async def install_hook(self):
-        await self.process_manager.run_command("npm install")
+        await self.install_node_modules()
         if self.options.db_type == DatabaseType.SQL:
             await self.process_manager.run_command("npx prisma generate")
             await self.process_manager.run_command("npx prisma migrate dev --name initial")
@@ -234,12 +234,12 @@ class UIBase(ABC):
 
     async def send_modified_files(
         self,
-        modified_files: dict[str, str, str],
+        modified_files: list[dict],
     ):
         """
         Send a list of modified files to the UI.
 
-        :param modified_files: List of modified files.
+        :param modified_files: List of modified files (dicts with `path`, `file_old` and `file_new` keys).
         """
         raise NotImplementedError()
 
@@ -1,9 +1,12 @@
+import asyncio
+import sys
 from typing import Optional
 
 from prompt_toolkit.shortcuts import PromptSession
 
 from core.log import get_logger
 from core.ui.base import ProjectStage, UIBase, UIClosedError, UISource, UserInput
+from core.ui.stream_buffer import STREAM_FLUSH_DELAY
 
 log = get_logger(__name__)
 
@@ -13,19 +16,45 @@ class PlainConsoleUI(UIBase):
     UI adapter for plain (no color) console output.
     """
 
+    def __init__(self):
+        super().__init__()
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        # Sources with an unfinished stream, and the source of the last printed chunk
+        self.open_streams: set[Optional[UISource]] = set()
+        self.stream_source: Optional[UISource] = None
+
     async def start(self) -> bool:
         log.debug("Starting console UI")
         return True
 
     async def stop(self):
         log.debug("Stopping console UI")
+        self._flush_stream()
+
+    def _flush_stream(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        sys.stdout.flush()
 
     async def send_stream_chunk(self, chunk: Optional[str], *, source: Optional[UISource] = None):
         if chunk is None:
             # end of stream
-            print("", flush=True)
+            print("")
+            self._flush_stream()
+            self.open_streams.discard(source)
+            self.stream_source = None
         else:
-            print(chunk, end="", flush=True)
+            self.open_streams.add(source)
+            if source is not self.stream_source and len(self.open_streams) > 1:
+                # Several streams are interleaved (concurrent LLM requests), label the switch
+                print(f"\n[{source}] " if self.stream_source is not None else f"[{source}] ", end="")
+            self.stream_source = source
+            # The chunks are printed right away (so they stay in order with other output),
+            # but the (relatively expensive) flush is only done every STREAM_FLUSH_DELAY seconds
+            print(chunk, end="")
+            if self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(STREAM_FLUSH_DELAY, self._flush_stream)
 
     async def send_message(self, message: str, *, source: Optional[UISource] = None):
         if source:
@@ -75,6 +104,7 @@ class PlainConsoleUI(UIBase):
                 default_str = " (default)" if k == default else ""
                 print(f"  [{k}]: {v}{default_str}")
 
+        self._flush_stream()
         session = PromptSession("> ")
 
         while True:
@@ -120,7 +150,7 @@ class PlainConsoleUI(UIBase):
 
     async def send_modified_files(
         self,
-        modified_files: dict[str, str, str],
+        modified_files: list[dict],
     ):
         pass
 
@@ -1,19 +1,28 @@
 import asyncio
+import base64
 import json
+import zlib
+from difflib import unified_diff
 from enum import Enum
 from os.path import basename
-from typing import Any, Optional, Union
+from typing import Any, Iterator, Optional, Union
 
 from pydantic import BaseModel, ValidationError
 import websockets
 
 from core.config import LocalIPCConfig
+from core.disk.vfs import VirtualFileSystem
 from core.log import get_logger
 from core.ui.base import ProjectStage, UIBase, UIClosedError, UISource, UserInput
+from core.ui.stream_buffer import StreamCoalescer
 
 VSCODE_EXTENSION_HOST = "localhost"
 VSCODE_EXTENSION_PORT = 8125
 MESSAGE_SIZE_LIMIT = 512 * 1024
+# Maximum size of a message we accept from the extension, larger ones are discarded
+RECEIVE_SIZE_LIMIT = 16 * 1024 * 1024
+# Maximum size of the diffs sent in a single MODIFIED_FILES_PAGE message
+MODIFIED_FILES_PAGE_SIZE = 256 * 1024
 
 log = get_logger(__name__)
 
@@ -47,6 +56,8 @@ class MessageType(str, Enum):
     GENERATE_DIFF = "generateDiff"
     CLOSE_DIFF = "closeDiff"
     MODIFIED_FILES = "modifiedFiles"
+    MODIFIED_FILES_MANIFEST = "modifiedFilesManifest"
+    MODIFIED_FILES_PAGE = "modifiedFilesPage"
     IMPORTANT_STREAM = "importantStream"
 
 
@@ -75,22 +86,145 @@ class Message(BaseModel):
         """
         Parses raw byte payload into a message.
 
-        This is done in two phases. First, the bytes are UTF-8
-        decoded and converted to a dict. Then, the dictionary
-        structure is parsed into a Message object.
-
-        This lets us raise different errors based on whether the
-        data is not valid JSON or the JSON structure is not valid
-        for a Message object.
+        The payload is parsed and validated in a single pass, but we still
+        raise different errors based on whether the data is not valid JSON
+        (ValueError) or the JSON structure is not valid for a Message
+        object (ValidationError).
 
         :param data: Raw byte payload.
         :return: Message object.
         """
         try:
-            json_data = json.loads(data.decode("utf-8"))
-        except (json.JSONDecodeError, UnicodeDecodeError) as err:
-            raise ValueError(f"Error decoding JSON: {err}") from err
-        return Message.model_validate_json(json.dumps(json_data))
+            return Message.model_validate_json(data)
+        except ValidationError as err:
+            if any(error["type"] == "json_invalid" for error in err.errors()):
+                raise ValueError(f"Error decoding JSON: {err}") from err
+            raise
+
+
+class ModifiedFilesPager:
+    """
+    Split the modified files into a manifest and pages of unified diffs.
+
+    Sending the full old and new content of every modified file in a single
+    message can easily exceed the message size limit on big imports. Instead,
+    the extension first gets a manifest with the summary of each file
+    (path, sizes, line counts and content hashes), and then the diffs in
+    pages of at most `page_size` bytes. Diffs larger than a page are split
+    into several parts.
+
+    The diffs are only computed when the pages are generated (or when a
+    single diff is requested with `diff()`).
+    """
+
+    def __init__(self, modified_files: list[dict], page_size: int = MODIFIED_FILES_PAGE_SIZE, compress: bool = False):
+        """
+        Create a pager for the modified files.
+
+        :param modified_files: List of modified files (dicts with `path`, `file_old` and `file_new` keys).
+        :param page_size: Maximum size of the diffs in a single page, in bytes.
+        :param compress: Whether to zlib-compress the pages.
+        """
+        self.files = {file["path"]: file for file in modified_files}
+        self.page_size = page_size
+        self.compress = compress
+
+    @staticmethod
+    def _summary(content: Optional[str]) -> dict:
+        if content is None:
+            return {"size": None, "lines": None, "hash": None}
+        return {
+            "size": len(content.encode("utf-8")),
+            "lines": len(content.splitlines()),
+            "hash": VirtualFileSystem.hash_string(content),
+        }
+
+    def manifest(self) -> list[dict]:
+        """
+        Summary of the modified files, without the content.
+
+        :return: List of dicts with the path, old/new size, line count and hash, and the line delta.
+        """
+        manifest = []
+        for path, file in self.files.items():
+            old = self._summary(file["file_old"])
+            new = self._summary(file["file_new"])
+            manifest.append(
+                {
+                    "path": path,
+                    "old_size": old["size"],
+                    "new_size": new["size"],
+                    "old_lines": old["lines"],
+                    "new_lines": new["lines"],
+                    "line_delta": new["lines"] - (old["lines"] or 0),
+                    "old_hash": old["hash"],
+                    "new_hash": new["hash"],
+                }
+            )
+        return manifest
+
+    def diff(self, path: str) -> str:
+        """
+        Unified diff between the old and new content of the file.
+
+        :param path: Path of the file (as in the manifest).
+        :return: Unified diff.
+        """
+        file = self.files[path]
+        old_lines = (file["file_old"] or "").splitlines(keepends=True)
+        new_lines = (file["file_new"] or "").splitlines(keepends=True)
+        from_file = f"a/{path}" if file["file_old"] is not None else "/dev/null"
+        return "".join(unified_diff(old_lines, new_lines, fromfile=from_file, tofile=f"b/{path}"))
+
+    def _diff_parts(self) -> Iterator[dict]:
+        for path in self.files:
+            diff = self.diff(path)
+            data = diff.encode("utf-8")
+            if len(data) <= self.page_size:
+                yield {"path": path, "diff": diff, "part": 0, "parts": 1}
+                continue
+
+            # Split on line boundaries where possible so each part is readable on its own
+            parts = []
+            current, size = [], 0
+            for line in diff.splitlines(keepends=True):
+                line_size = len(line.encode("utf-8"))
+                if current and size + line_size > self.page_size:
+                    parts.append("".join(current))
+                    current, size = [], 0
+                current.append(line)
+                size += line_size
+            if current:
+                parts.append("".join(current))
+            for i, part in enumerate(parts):
+                yield {"path": path, "diff": part, "part": i, "parts": len(parts)}
+
+    def pages(self) -> Iterator[list[dict]]:
+        """
+        Generate the pages of diffs, each at most `page_size` bytes of diff text.
+
+        A single diff line longer than the page size still gets its own page.
+        """
+        page, size = [], 0
+        for part in self._diff_parts():
+            part_size = len(part["diff"].encode("utf-8"))
+            if page and size + part_size > self.page_size:
+                yield page
+                page, size = [], 0
+            page.append(part)
+            size += part_size
+        if page:
+            yield page
+
+    def encode_page(self, files: list[dict]) -> Union[list[dict], str]:
+        """
+        Encode the page for sending (compressing it if enabled).
+
+        Compressed pages are zlib-compressed JSON, base64-encoded.
+        """
+        if not self.compress:
+            return files
+        return base64.b64encode(zlib.compress(json.dumps(files).encode("utf-8"))).decode("ascii")
 
 
 class IPCClientUI(UIBase):
@@ -107,6 +241,8 @@ class IPCClientUI(UIBase):
         self.reader = None
         self.writer = None
         self.connected = asyncio.Event()
+        # Streamed chunks are coalesced into fewer, larger STREAM messages
+        self.stream_buffer = StreamCoalescer(self._send_stream_chunk)
         self.websocket = None
         self.uri = f"ws://{config.host}:{config.port}"
 
@@ -125,6 +261,10 @@ class IPCClientUI(UIBase):
             return False
 
     async def _send(self, type: MessageType, **kwargs):
+        if type != MessageType.STREAM and self.stream_buffer.pending:
+            # Keep the streamed output in order with the other messages
+            await self.stream_buffer.flush()
+
         msg = Message(type=type, **kwargs)
         data = msg.to_bytes()
         if self.writer.is_closing():
@@ -138,33 +278,44 @@ class IPCClientUI(UIBase):
             log.error(f"Connection lost while sending the message: {err}")
             raise UIClosedError()
 
+    async def _read_frame(self) -> Optional[bytes]:
+        """
+        Read a single length-prefixed message from the server.
+
+        Messages over RECEIVE_SIZE_LIMIT are read in bounded chunks and discarded.
+
+        :return: Message payload, or None if the message was too large.
+        """
+        size = int.from_bytes(await self.reader.readexactly(4), byteorder="big")
+        if size <= RECEIVE_SIZE_LIMIT:
+            return await self.reader.readexactly(size)
+
+        log.error(f"Ignoring incoming message of {size} bytes (limit is {RECEIVE_SIZE_LIMIT} bytes)")
+        while size > 0:
+            size -= len(await self.reader.readexactly(min(size, MESSAGE_SIZE_LIMIT)))
+        return None
+
     async def _receive(self) -> Message:
-        data = b""
         while True:
             try:
-                response = await self.reader.read(MESSAGE_SIZE_LIMIT)
+                data = await self._read_frame()
             except (
                 asyncio.exceptions.IncompleteReadError,
                 ConnectionResetError,
                 asyncio.exceptions.CancelledError,
                 BrokenPipeError,
             ):
+                # EOF or connection error, the server closed the connection
                 raise UIClosedError()
 
-            if response == b"":
-                # We're at EOF, the server closed the connection
-                raise UIClosedError()
+            if data is None:
+                continue
 
-            data += response
             try:
                 return Message.from_bytes(data)
-            except ValidationError as err:
+            except ValueError as err:
                 # Incorrect payload is most likely a bug in the server, ignore the message
                 log.error(f"Error parsing incoming message: {err}", exc_info=True)
-                data = b""
-                continue
-            except ValueError:
-                # Most likely, this is as an incomplete message from the server, wait a bit more
                 continue
 
     async def stop(self):
@@ -187,6 +338,9 @@ class IPCClientUI(UIBase):
         if not self.writer:
             return
 
+        await self.stream_buffer.write(chunk, source=source)
+
+    async def _send_stream_chunk(self, chunk: Optional[str], source: Optional[UISource]):
         if chunk is None:
             chunk = "\n"  # end of stream
 
@@ -196,14 +350,16 @@ class IPCClientUI(UIBase):
             category=source.type_name if source else None,
         )
 
-    async def send_message(self, message: str, source: str = None):
-        await self._send({  # Change this line
-            "type": "message",
-            "data": {
-                "message": message,
-                "source": source
-            }
-        })
+    async def send_message(self, message: str, *, source: Optional[UISource] = None):
+        if not self.writer:
+            return
+
+        log.debug(f"Sending message: [{message.strip()}] from {source.type_name if source else '(none)'}")
+        await self._send(
+            MessageType.VERBOSE,
+            content=message,
+            category=source.type_name if source else None,
+        )
 
     async def send_key_expired(self, message: Optional[str] = None):
         await self._send(MessageType.KEY_EXPIRED)
@@ -321,13 +477,38 @@ class IPCClientUI(UIBase):
 
     async def send_modified_files(
         self,
-        modified_files: dict[str, str, str],
+        modified_files: list[dict],
     ):
+        pager = ModifiedFilesPager(
+            modified_files,
+            page_size=MODIFIED_FILES_PAGE_SIZE,
+            compress=self.config.compress_modified_files,
+        )
+        encoding = "zlib+base64" if pager.compress else None
+
         await self._send(
-            MessageType.MODIFIED_FILES,
-            content={"files": modified_files},
+            MessageType.MODIFIED_FILES_MANIFEST,
+            content={"files": pager.manifest(), "encoding": encoding},
         )
 
+        # Diffs are computed page by page, so we look one page ahead to know which one is the last
+        pages = pager.pages()
+        page = next(pages, None)
+        index = 0
+        while page is not None:
+            next_page = next(pages, None)
+            await self._send(
+                MessageType.MODIFIED_FILES_PAGE,
+                content={
+                    "page": index,
+                    "last": next_page is None,
+                    "encoding": encoding,
+                    "files": pager.encode_page(page),
+                },
+            )
+            page = next_page
+            index += 1
+
     async def send_step_progress(
         self,
         index: int,
@@ -453,9 +634,9 @@ class IPCClientUI(UIBase):
     async def connect(self):
         self.websocket = await websockets.connect(self.uri)
 
-    async def _send(self, data: dict):
+    async def _send_websocket(self, data: dict):
         if not self.websocket:
             await self.connect()
         await self.websocket.send(json.dumps(data))
 
-__all__ = ["IPCClientUI"]
+__all__ = ["IPCClientUI", "ModifiedFilesPager"]
@@ -0,0 +1,141 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from core.log import get_logger
+from core.ui.base import UISource
+
+log = get_logger(__name__)
+
+# Flush the buffered chunks for a source once they reach this many characters ...
+STREAM_FLUSH_SIZE = 4096
+# ... or after this many seconds since the first buffered chunk, whichever comes first
+STREAM_FLUSH_DELAY = 0.025
+
+
+class StreamCoalescer:
+    """
+    Coalesce streamed chunks before sending them to the UI.
+
+    LLMs stream the response a token or two at a time, and sending each
+    token as a separate UI message is mostly overhead. The coalescer buffers
+    the chunks per source and sends them to the UI (via the `sink` callback)
+    joined together when the buffer reaches `max_size` characters, when
+    `max_delay` seconds have passed since the first buffered chunk, or at the
+    end of the stream (when `None` chunk is written).
+
+    The UI adapter must call `flush()` before sending any other message to
+    the UI, so that the streamed output and other messages are kept in order.
+
+    Example usage:
+
+    >>> coalescer = StreamCoalescer(send_chunk)
+    >>> await coalescer.write("Hello", source=source)
+    >>> await coalescer.write(" world", source=source)
+    >>> await coalescer.write(None, source=source)  # sends "Hello world", then None
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[Optional[str], Optional[UISource]], Awaitable],
+        *,
+        max_size: int = STREAM_FLUSH_SIZE,
+        max_delay: float = STREAM_FLUSH_DELAY,
+    ):
+        """
+        Create a new stream coalescer.
+
+        :param sink: Async callable that sends a (joined) chunk to the UI.
+        :param max_size: Buffer size (in characters) that triggers a flush.
+        :param max_delay: Maximum time (in seconds) a chunk is kept in the buffer.
+        """
+        self.sink = sink
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.buffers: dict[Optional[UISource], list[str]] = {}
+        self.sizes: dict[Optional[UISource], int] = {}
+        self.lock = asyncio.Lock()
+        self.flusher: Optional[asyncio.Task] = None
+        self.error: Optional[Exception] = None
+        # Number of chunks written and messages actually sent, for diagnostics
+        self.n_chunks = 0
+        self.n_sent = 0
+
+    @property
+    def pending(self) -> bool:
+        """Whether there are any buffered chunks."""
+        return bool(self.buffers)
+
+    async def write(self, chunk: Optional[str], *, source: Optional[UISource] = None):
+        """
+        Write a chunk of the stream.
+
+        :param chunk: Chunk of the stream, or None to mark the end of the stream.
+        :param source: Source of the stream (if any).
+        """
+        if self.error:
+            # Report errors from the background flush to the caller
+            err, self.error = self.error, None
+            raise err
+
+        if chunk is None:
+            await self.flush(source)
+            async with self.lock:
+                await self._send(None, source)
+            return
+
+        if not chunk:
+            return
+
+        self.n_chunks += 1
+        self.buffers.setdefault(source, []).append(chunk)
+        self.sizes[source] = self.sizes.get(source, 0) + len(chunk)
+
+        if self.sizes[source] >= self.max_size:
+            await self.flush(source)
+        elif self.flusher is None:
+            self.flusher = asyncio.create_task(self._flush_later())
+
+    async def _send(self, chunk: Optional[str], source: Optional[UISource]):
+        self.n_sent += 1
+        await self.sink(chunk, source)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self.flusher = None
+        try:
+            await self.flush()
+        except Exception as err:  # noqa
+            log.debug(f"Error sending buffered stream chunks: {err}")
+            self.error = err
+
+    async def flush(self, source: Optional[UISource] = ...):
+        """
+        Send the buffered chunks to the UI.
+
+        :param source: Only flush the chunks from this source (default: all sources).
+        """
+        if source is ...:
+            sources = list(self.buffers)
+        else:
+            sources = [source] if source in self.buffers else []
+
+        if self.flusher and len(sources) == len(self.buffers):
+            # Nothing left for the background flush to do
+            self.flusher.cancel()
+            self.flusher = None
+
+        async with self.lock:
+            for src in sources:
+                chunks = self.buffers.pop(src, None)
+                self.sizes.pop(src, None)
+                if chunks:
+                    await self._send("".join(chunks), src)
+
+    async def close(self):
+        """
+        Send any remaining buffered chunks and stop the background flush.
+        """
+        await self.flush()
+
+
+__all__ = ["StreamCoalescer", "STREAM_FLUSH_SIZE", "STREAM_FLUSH_DELAY"]
@@ -11,8 +11,15 @@ class VirtualUI(UIBase):
     Testing UI adapter.
     """
 
-    def __init__(self, inputs: list[dict[str, str]]):
+    def __init__(self, inputs: list[dict[str, str]], *, quiet: bool = False):
+        """
+        Create a new virtual UI.
+
+        :param inputs: Scripted user inputs, used in order.
+        :param quiet: Don't print the messages and questions to stdout.
+        """
         self.virtual_inputs = [UserInput(**input) for input in inputs]
+        self.quiet = quiet
 
     async def start(self) -> bool:
         log.debug("Starting test UI")
@@ -22,6 +29,8 @@ class VirtualUI(UIBase):
         log.debug("Stopping test UI")
 
     async def send_stream_chunk(self, chunk: Optional[str], *, source: Optional[UISource] = None):
+        if self.quiet:
+            return
         if chunk is None:
             # end of stream
             print("", flush=True)
@@ -29,6 +38,8 @@ class VirtualUI(UIBase):
             print(chunk, end="", flush=True)
 
     async def send_message(self, message: str, *, source: Optional[UISource] = None):
+        if self.quiet:
+            return
         if source:
             print(f"[{source}] {message}")
         else:
@@ -65,7 +76,9 @@ class VirtualUI(UIBase):
         initial_text: Optional[str] = None,
         source: Optional[UISource] = None,
     ) -> UserInput:
-        if source:
+        if self.quiet:
+            pass
+        elif source:
             print(f"[{source}] {question}")
         else:
             print(f"{question}")
@@ -75,7 +88,7 @@ class VirtualUI(UIBase):
             self.virtual_inputs = self.virtual_inputs[1:]
             return ret
 
-        if "continue" in buttons:
+        if buttons and "continue" in buttons:
             return UserInput(button="continue", text=None)
         elif default:
             if buttons:
@@ -83,7 +96,7 @@ class VirtualUI(UIBase):
             else:
                 return UserInput(text=default)
         elif buttons_only:
-            return UserInput(button=list(buttons.keys)[0])
+            return UserInput(button=list(buttons.keys())[0])
         else:
             return UserInput(text="")
 
@@ -119,7 +132,7 @@ class VirtualUI(UIBase):
 
     async def send_modified_files(
         self,
-        modified_files: dict[str, str, str],
+        modified_files: list[dict],
     ):
         pass
 
@@ -156,5 +169,23 @@ class VirtualUI(UIBase):
     async def import_project(self, project_dir: str):
         pass
 
+    async def send_diff(self, file_path: str, old_content: str, new_content: str):
+        pass
+
+    async def send_stream(self, content: str):
+        pass
+
+    async def send_testing_instructions(self, instructions: str):
+        pass
+
+    async def send_server_logs(self, logs: str):
+        pass
+
+    async def send_app_progress(self, progress: str):
+        pass
+
+    async def send_deployment_info(self, info: str):
+        pass
+
 
 __all__ = ["VirtualUI"]
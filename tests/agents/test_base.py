@@ -1,9 +1,13 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from core.agents.base import BaseAgent
-from core.ui.base import UIBase
+from core.agents.speculation import Speculation
+from core.llm.base import LLMError
+from core.telemetry import telemetry
+from core.ui.base import UIBase, UserInput
 
 
 class AgentUnderTest(BaseAgent):
@@ -29,6 +33,18 @@ async def test_stream_handler():
     ui.send_stream_chunk.assert_called_once_with("chunk", source=agent.ui_source)
 
 
+@pytest.mark.asyncio
+async def test_stream_handler_sub_source():
+    ui = MagicMock(spec=UIBase)
+    agent = AgentUnderTest(None, ui)
+    source = agent.sub_source("part-1", "part 1")
+
+    await agent.stream_handler("chunk", source=source)
+    ui.send_stream_chunk.assert_called_once_with("chunk", source=source)
+    assert source.type_name == "agent:test-agent:part-1"
+    assert str(source) == "Test Agent (part 1)"
+
+
 @pytest.mark.asyncio
 async def test_ask_question():
     ui = MagicMock()
@@ -52,6 +68,126 @@ async def test_ask_question():
     state_manager.log_user_input.assert_called_once_with("How are you?", "response")
 
 
+@pytest.mark.asyncio
+async def test_ask_question_marks_ui_idle():
+    ui = MagicMock()
+    state_manager = MagicMock(log_user_input=AsyncMock())
+    agent = AgentUnderTest(state_manager, ui)
+    worker = state_manager.description_worker
+
+    async def ask_question(*args, **kwargs):
+        worker.set_idle.assert_called_once_with(True)
+        return "response"
+
+    ui.ask_question = ask_question
+    await agent.ask_question("How are you?")
+    worker.set_idle.assert_called_with(False)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("button", "used"),
+    [
+        ("yes", True),
+        ("no", False),
+    ],
+)
+async def test_ask_question_speculates_on_default(button, used):
+    ui = MagicMock()
+    state_manager = MagicMock(log_user_input=AsyncMock(), description_worker=None)
+    agent = AgentUnderTest(state_manager, ui)
+    telemetry.clear_counters()
+
+    async def speculative_call():
+        return "prefetched"
+
+    async def ask_question(*args, **kwargs):
+        # The speculative call runs while we're waiting for the user
+        await asyncio.sleep(0)
+        return UserInput(button=button)
+
+    ui.ask_question = ask_question
+    response = await agent.ask_question(
+        "Continue?",
+        buttons={"yes": "Yes", "no": "No"},
+        default="yes",
+        buttons_only=True,
+        speculate=Speculation("next", speculative_call),
+    )
+    assert response.button == button
+
+    assert await agent.take_speculation("other") is None
+    assert await agent.take_speculation("next") == ("prefetched" if used else None)
+    assert agent.speculation is None
+    assert telemetry.data["num_speculations"] == 1
+    assert telemetry.data["num_speculation_hits"] == (1 if used else 0)
+
+
+@pytest.mark.asyncio
+async def test_ask_question_doesnt_speculate_without_default():
+    ui = MagicMock(ask_question=AsyncMock(return_value=UserInput(button="yes")))
+    state_manager = MagicMock(log_user_input=AsyncMock(), description_worker=None)
+    agent = AgentUnderTest(state_manager, ui)
+    speculation = MagicMock()
+
+    await agent.ask_question("Continue?", buttons={"yes": "Yes"}, buttons_only=True, speculate=speculation)
+    speculation.start.assert_not_called()
+    assert agent.speculation is None
+
+
+@pytest.mark.asyncio
+async def test_discard_speculation_counts_wasted_tokens():
+    telemetry.clear_counters()
+    speculation = Speculation("next", AsyncMock(return_value="prefetched"))
+    speculation.start("yes")
+    speculation.record(MagicMock(prompt_tokens=100, completion_tokens=20))
+    await asyncio.sleep(0)
+
+    agent = AgentUnderTest(None, None)
+    agent.speculation = speculation
+    await agent.discard_speculation()
+
+    assert agent.speculation is None
+    assert telemetry.data["num_speculation_wasted_tokens"] == 120
+    assert telemetry.data["num_speculation_hits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_speculative_llm_errors_arent_reported():
+    ui = MagicMock(spec=UIBase)
+    agent = AgentUnderTest(None, ui)
+
+    async def speculative_call():
+        return await agent.error_handler(LLMError.GENERIC_API_ERROR, "error")
+
+    speculation = Speculation("next", speculative_call)
+    speculation.start("yes")
+    assert await speculation.result() is False
+    ui.ask_question.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_llm_errors_are_handled_one_at_a_time():
+    ui = MagicMock(spec=UIBase)
+    agent = AgentUnderTest(None, ui)
+    asking = 0
+    max_asking = 0
+
+    async def ask_question(*args, **kwargs):
+        nonlocal asking, max_asking
+        asking += 1
+        max_asking = max(max_asking, asking)
+        await asyncio.sleep(0.01)
+        asking -= 1
+        return UserInput(button="yes")
+
+    ui.ask_question = ask_question
+    results = await asyncio.gather(*[agent.error_handler(LLMError.GENERIC_API_ERROR, "error") for _ in range(3)])
+
+    assert results == [True, True, True]
+    assert max_asking == 1
+
+
 @pytest.mark.asyncio
 @patch("core.agents.base.BaseLLMClient")
 async def test_get_llm(mock_BaseLLMClient):
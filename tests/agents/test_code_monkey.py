@@ -0,0 +1,70 @@
+import pytest
+
+from core.agents.code_monkey import CodeMonkey, FileDescription
+from core.agents.response import ResponseType
+from core.errors import APIError
+
+
+@pytest.mark.asyncio
+async def test_describe_files_uses_description_cache(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    await sm.commit()
+    await sm.save_file("a.js", "console.log('hello');")
+    await sm.save_file("b.js", "console.log('hello');")
+    await sm.save_file("empty.js", "")
+    await sm.commit()
+
+    cm = CodeMonkey(sm, ui)
+    cm.get_llm = mock_get_llm(return_value=FileDescription(summary="Prints hello", references=["c.js"]))
+    response = await cm.describe_files()
+    assert response.type == ResponseType.DONE
+
+    # Files with the same content are only described once
+    cm.get_llm.return_value.assert_awaited_once()
+    await sm.commit()
+
+    assert sm.current_state.get_file_by_path("a.js").meta == {"description": "Prints hello", "references": ["c.js"]}
+    assert sm.current_state.get_file_by_path("b.js").meta["description"] == "Prints hello"
+    assert sm.current_state.get_file_by_path("empty.js").meta["description"] == "Empty file"
+
+    # Same content in a new file is described from the cache
+    await sm.save_file("copy.js", "console.log('hello');")
+    await sm.commit()
+
+    cm = CodeMonkey(sm, ui)
+    cm.get_llm = mock_get_llm()
+    cm.get_llm.return_value.reset_mock()
+    await cm.describe_files()
+    cm.get_llm.return_value.assert_not_awaited()
+    await sm.commit()
+
+    assert sm.current_state.get_file_by_path("copy.js").meta == {"description": "Prints hello", "references": ["c.js"]}
+
+
+@pytest.mark.asyncio
+async def test_describe_files_keeps_completed_descriptions_on_error(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    await sm.commit()
+    await sm.save_file("ok.js", "console.log('ok');")
+    await sm.save_file("broken.js", "console.log('broken');")
+    await sm.commit()
+
+    async def describe_file(llm, path, content):
+        if path == "broken.js":
+            raise APIError("Error connecting to the LLM")
+        return FileDescription(summary="Prints ok", references=[])
+
+    cm = CodeMonkey(sm, ui)
+    cm.get_llm = mock_get_llm()
+    cm.describe_file = describe_file
+    with pytest.raises(APIError):
+        await cm.describe_files()
+
+    # The successful description is stored in the cache and applied
+    ok = sm.current_state.get_file_by_path("ok.js")
+    cached = await sm.get_file_descriptions({ok.content_id}, cm.get_describer())
+    assert cached[ok.content_id].description == "Prints ok"
+    assert sm.next_state.get_file_by_path("ok.js").meta["description"] == "Prints ok"
+    assert "description" not in sm.next_state.get_file_by_path("broken.js").meta
@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from core.agents.code_monkey import FileDescription
+from core.agents.description_worker import DescriptionWorker
+from core.agents.orchestrator import Orchestrator
+from core.agents.response import ResponseType
+from core.db.models import FileDescription as CachedFileDescription
+from core.db.models import LLMRequest
+from core.llm.base import LLMError
+from core.llm.request_log import LLMRequestLog
+
+
+@pytest.mark.asyncio
+async def test_describes_files_while_idle(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    await sm.commit()
+    await sm.save_file("a.js", "console.log('a');")
+    await sm.save_file("empty.js", "")
+    await sm.commit()
+
+    worker = DescriptionWorker(sm, ui)
+    worker.agent.get_llm = mock_get_llm(return_value=FileDescription(summary="Logs a", references=[]))
+
+    assert await worker.schedule(sm.current_state.files) == 1
+    assert sm.next_state.get_file_by_path("empty.js").meta["description"] == "Empty file"
+
+    # Nothing happens until the UI is idle
+    await asyncio.sleep(0.01)
+    worker.agent.get_llm.return_value.assert_not_awaited()
+
+    worker.set_idle(True)
+    await asyncio.wait_for(worker._task, 1)
+    worker.agent.get_llm.return_value.assert_awaited_once()
+    assert not worker.busy
+
+    assert await worker.apply(sm.next_state) == 1
+    await sm.commit()
+    assert sm.current_state.get_file_by_path("a.js").meta == {"description": "Logs a", "references": []}
+
+    describer = worker.agent.get_describer()
+    content_id = sm.current_state.get_file_by_path("a.js").content_id
+    cached = await CachedFileDescription.get_many(sm.current_session, [content_id], describer)
+    assert cached[content_id].description == "Logs a"
+
+    await worker.stop()
+
+
+@pytest.mark.asyncio
+@patch("core.agents.base.BaseLLMClient")
+async def test_background_requests_dont_touch_session_or_user(mock_BaseLLMClient, agentcontext):
+    sm, _, ui, _ = agentcontext
+
+    await sm.commit()
+    await sm.save_file("a.js", "console.log('a');")
+    await sm.save_file("b.js", "console.log('b');")
+    await sm.commit()
+
+    mock_client_class = mock_BaseLLMClient.for_provider.return_value
+
+    async def fake_llm(convo, **kwargs):
+        if any("b.js" in msg["content"] for msg in convo.messages):
+            error_handler = mock_client_class.call_args.kwargs["error_handler"]
+            assert await error_handler(LLMError.GENERIC_API_ERROR, "Server error") is False
+            raise RuntimeError("Server error")
+        request_log = LLMRequestLog(provider="openai", model="gpt-4o", temperature=0.5)
+        return FileDescription(summary="Logs a", references=[]), request_log
+
+    mock_client_class.return_value = AsyncMock(side_effect=fake_llm)
+
+    worker = DescriptionWorker(sm, ui)
+    assert await worker.schedule(sm.current_state.files) == 2
+    worker.set_idle(True)
+    await asyncio.wait_for(worker._task, 1)
+
+    # The failed request isn't retried, and the user isn't asked about it
+    ui.ask_question.assert_not_awaited()
+    ui.send_stream_chunk.assert_not_called()
+    # The request log is only added to the session when applying the descriptions
+    assert not [obj for obj in sm.current_session.new if isinstance(obj, LLMRequest)]
+    assert len(worker.agent.deferred_requests) == 1
+
+    assert await worker.apply(sm.next_state) == 1
+    assert worker.agent.deferred_requests == []
+    await sm.commit()
+
+    llm_requests = (await sm.current_session.execute(select(LLMRequest))).scalars().all()
+    assert [(r.agent, r.model) for r in llm_requests] == [("code-monkey", "gpt-4o")]
+    assert "description" not in sm.current_state.get_file_by_path("b.js").meta
+
+    await worker.stop()
+
+
+@pytest.mark.asyncio
+async def test_handle_done_schedules_background_descriptions(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    await sm.commit()
+    await sm.save_file("a.js", "console.log('a');")
+
+    orca = Orchestrator(sm, ui)
+    orca.description_worker = DescriptionWorker(sm, ui)
+    orca.description_worker.agent.get_llm = mock_get_llm(return_value=FileDescription(summary="Logs a", references=[]))
+
+    response = await orca.handle_done(orca, None)
+    assert response is None
+    assert orca.description_worker.busy
+
+    orca.description_worker.set_idle(True)
+    await asyncio.wait_for(orca.description_worker._task, 1)
+
+    response = await orca.handle_done(orca, None)
+    assert sm.current_state.get_file_by_path("a.js").meta["description"] == "Logs a"
+
+    # Without the worker, files are described as a blocking step
+    await sm.save_file("b.js", "console.log('b');")
+    orca.description_worker = None
+    response = await orca.handle_done(orca, None)
+    assert response.type == ResponseType.DESCRIBE_FILES
@@ -0,0 +1,280 @@
+import asyncio
+from copy import deepcopy
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.agents.executor import CommandResult, Executor
+from core.llm.request_log import LLMRequestLog
+from core.proc.command_cache import CachedCommandResult
+from core.ui.base import UserInput
+
+
+def command_step(step_id: str, cmd: str) -> dict:
+    return {"id": step_id, "completed": False, "type": "command", "command": {"command": cmd, "timeout": 60}}
+
+
+@pytest.mark.asyncio
+async def test_independent_commands_run_concurrently(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [
+        command_step("1", "cd api && npm install"),
+        command_step("2", "cd ui && npm install"),
+        command_step("3", "cd api && npm run build"),
+    ]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+    running = 0
+    max_running = 0
+
+    async def run_command(cmd, timeout=None, show_output=True, cache=False, monitor=None):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return 0, f"output of {cmd}", ""
+
+    executor = Executor(sm, ui)
+    executor.process_manager.run_command = run_command
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    for _ in range(3):
+        step = sm.current_state.current_step
+        await executor.for_step(step).run()
+        await sm.commit()
+
+    # The first two commands ran concurrently, the third one (same directory as the first) on its own
+    assert max_running == 2
+    # The first two commands were confirmed in a single question
+    assert ui.ask_question.await_count == 2
+    question = ui.ask_question.await_args_list[0].args[0]
+    assert "1. cd api && npm install (60s timeout)\n2. cd ui && npm install" in question
+    # Results are committed in step order
+    assert [call.args[0].cmd for call in sm.log_command_run.await_args_list] == [
+        "cd api && npm install",
+        "cd ui && npm install",
+        "cd api && npm run build",
+    ]
+    assert sm.current_state.current_step is None
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_cached_command_result(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [command_step("1", "npm install")]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+
+    executor = Executor(sm, ui)
+    executor.process_manager.get_cached_result = MagicMock(
+        return_value=CachedCommandResult(status_code=0, stdout="up to date", stderr="")
+    )
+    executor.process_manager.run_command = AsyncMock()
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    await executor.for_step(sm.current_state.current_step).run()
+
+    executor.process_manager.run_command.assert_not_awaited()
+    exec_log = sm.log_command_run.await_args.args[0]
+    assert exec_log.cached is True
+    assert exec_log.stdout == "up to date"
+    ui.send_stream_chunk.assert_any_await("up to date", source=executor.cmd_ui_source)
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_uncached_command_result_is_stored(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [command_step("1", "npm install")]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+
+    executor = Executor(sm, ui)
+    pm = executor.process_manager
+    pm.get_cached_result = MagicMock(return_value=None)
+    pm.store_cached_result = MagicMock()
+    pm.run_command = AsyncMock(return_value=(0, "added 1 package", ""))
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    await executor.for_step(sm.current_state.current_step).run()
+
+    # The cache is only checked once, before running the command
+    pm.get_cached_result.assert_called_once_with("npm install")
+    assert pm.run_command.await_args.kwargs.get("cache", False) is False
+    pm.store_cached_result.assert_called_once_with("npm install", 0, "added 1 package", "")
+    assert sm.log_command_run.await_args.args[0].cached is False
+    await pm.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_commands_started_ahead(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [
+        command_step("1", "cd api && npm install"),
+        command_step("2", "cd ui && npm install"),
+    ]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+    cancelled = []
+
+    async def run_command(cmd, timeout=None, show_output=True, cache=False, monitor=None):
+        try:
+            await asyncio.sleep(0 if cmd.startswith("cd api") else 10)
+        except asyncio.CancelledError:
+            cancelled.append(cmd)
+            raise
+        return 0, "", ""
+
+    executor = Executor(sm, ui)
+    executor.process_manager.run_command = run_command
+    executor.process_manager.get_cached_result = MagicMock(return_value=None)
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    await executor.for_step(sm.current_state.current_step).run()
+    task = executor.pending["2"]
+
+    await executor.stop()
+
+    assert executor.pending == {}
+    assert task.cancelled()
+    assert cancelled == ["cd ui && npm install"]
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_commands_ahead_need_confirmation(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [
+        command_step("1", "cd api && npm install"),
+        command_step("2", "cd ui && npm install"),
+    ]
+    await sm.commit()
+
+    ui.ask_question.side_effect = [UserInput(button="first"), UserInput(button="yes")]
+    ui.send_stream_chunk = AsyncMock()
+
+    executor = Executor(sm, ui)
+    executor.process_manager.run_command = AsyncMock(return_value=(0, "", ""))
+    executor.process_manager.get_cached_result = MagicMock(return_value=None)
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    await executor.for_step(sm.current_state.current_step).run()
+    assert executor.pending == {}
+    executor.process_manager.run_command.assert_awaited_once()
+    await sm.commit()
+
+    # The second command is asked about when its step comes up
+    await executor.for_step(sm.current_state.current_step).run()
+    assert ui.ask_question.await_count == 2
+    assert ui.ask_question.await_args.args[0] == "Can I run command: cd ui && npm install with 60s timeout?"
+    assert executor.process_manager.run_command.await_count == 2
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_failed_command_cancels_commands_started_ahead(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [
+        command_step("1", "cd api && npm install"),
+        command_step("2", "cd ui && npm install"),
+    ]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+    analyzed = []
+
+    async def run_command(cmd, timeout=None, show_output=True, cache=False, monitor=None):
+        await asyncio.sleep(0 if cmd.startswith("cd api") else 10)
+        return 1, "", "error"
+
+    async def check_command_output(cmd, *args, task_steps=None, **kwargs):
+        analyzed.append((cmd, task_steps))
+        return CommandResult(analysis="failed", success=False)
+
+    executor = Executor(sm, ui)
+    executor.process_manager.run_command = run_command
+    executor.process_manager.get_cached_result = MagicMock(return_value=None)
+    executor.check_command_output = check_command_output
+    sm.log_command_run = AsyncMock()
+
+    steps = deepcopy(sm.current_state.steps)
+    await executor.for_step(sm.current_state.current_step).run()
+
+    # The output was analyzed against the steps as they were when the command started
+    assert analyzed == [("cd api && npm install", steps)]
+    assert executor.pending == {}
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_no_concurrent_commands_with_persistent_shell(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Install", "status": "todo", "instructions": "Install deps"}]
+    sm.current_state.steps = [
+        command_step("1", "cd api && npm install"),
+        command_step("2", "cd ui && npm install"),
+    ]
+    await sm.commit()
+
+    ui.ask_question.return_value = UserInput(button="yes")
+    ui.send_stream_chunk = AsyncMock()
+
+    executor = Executor(sm, ui)
+    executor.process_manager.shell = MagicMock()
+    executor.process_manager.run_command = AsyncMock(return_value=(0, "", ""))
+    executor.process_manager.get_cached_result = MagicMock(return_value=None)
+    executor.get_llm = mock_get_llm(return_value=CommandResult(analysis="ok", success=True))
+    sm.log_command_run = AsyncMock()
+
+    await executor.for_step(sm.current_state.current_step).run()
+
+    assert executor.pending == {}
+    executor.process_manager.run_command.assert_awaited_once()
+    assert ui.ask_question.await_args.args[0] == "Can I run command: cd api && npm install with 60s timeout?"
+    executor.process_manager.shell = None
+    await executor.process_manager.stop_watcher()
+
+
+@pytest.mark.asyncio
+@patch("core.agents.base.BaseLLMClient")
+async def test_executor_logs_llm_requests(mock_BaseLLMClient, agentcontext):
+    sm, _, ui, _ = agentcontext
+
+    request_log = LLMRequestLog(provider="openai", model="gpt-4o", temperature=0)
+    mock_BaseLLMClient.for_provider.return_value.return_value = AsyncMock(return_value=("response", request_log))
+    sm.log_llm_request = AsyncMock()
+
+    executor = Executor(sm, ui)
+    llm = executor.get_llm()
+    assert await llm(None) == "response"
+    sm.log_llm_request.assert_awaited_once_with(request_log, agent=executor)
+    await executor.process_manager.stop_watcher()
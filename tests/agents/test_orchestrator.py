@@ -18,7 +18,7 @@ async def test_offline_changes_check_restores_if_workspace_empty():
 
 @pytest.mark.asyncio
 async def test_offline_changes_check_imports_changes_from_disk():
-    sm = AsyncMock()
+    sm = AsyncMock(description_worker=None)
     sm.workspace_is_empty = Mock(return_value=False)
     sm.import_files = AsyncMock(return_value=([], []))
     ui = AsyncMock()
@@ -31,7 +31,7 @@ async def test_offline_changes_check_imports_changes_from_disk():
 
 @pytest.mark.asyncio
 async def test_offline_changes_check_restores_changes_from_db():
-    sm = AsyncMock()
+    sm = AsyncMock(description_worker=None)
     sm.workspace_is_empty = Mock(return_value=False)
     ui = AsyncMock()
     ui.ask_question.return_value.button = "no"
@@ -1,7 +1,17 @@
+import asyncio
+
 import pytest
 
 from core.agents.response import ResponseType
-from core.agents.tech_lead import DevelopmentPlan, Epic, TechLead, UpdatedDevelopmentPlan
+from core.agents.tech_lead import (
+    MAX_CONCURRENT_EPIC_BREAKDOWNS,
+    DevelopmentPlan,
+    Epic,
+    EpicPlan,
+    Task,
+    TechLead,
+    UpdatedDevelopmentPlan,
+)
 from core.db.models import Complexity
 from core.db.models.project_state import TaskStatus
 from core.ui.base import UserInput
@@ -102,6 +112,91 @@ async def test_plan_epic(agentcontext):
     assert sm.current_state.tasks[1]["description"] == "Task 2"
 
 
+@pytest.mark.asyncio
+async def test_break_down_epics_concurrently(agentcontext):
+    sm, _, ui, _ = agentcontext
+    n_epics = MAX_CONCURRENT_EPIC_BREAKDOWNS + 2
+    sm.next_state.epics = [{"description": f"Epic {i}"} for i in range(n_epics)]
+
+    tl = TechLead(sm, ui)
+    sources = []
+    running = 0
+    max_running = 0
+
+    def get_llm(stream_output=False, source=None):
+        sources.append(source)
+        i = len(sources) - 1
+
+        async def llm(convo, parser=None):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            # Later epics finish first
+            await asyncio.sleep(0.001 * (n_epics - i))
+            running -= 1
+            return EpicPlan(plan=[Task(description=f"Task for epic {i}", solution="", review="")])
+
+        return llm
+
+    tl.get_llm = get_llm
+    await tl.break_down_epics()
+
+    assert [epic["tasks"][0]["description"] for epic in sm.next_state.epics] == [
+        f"Task for epic {i}" for i in range(n_epics)
+    ]
+    assert max_running == MAX_CONCURRENT_EPIC_BREAKDOWNS
+    assert len({source.type_name for source in sources}) == n_epics
+    assert sources[0].type_name == "agent:tech-lead:epic-1"
+
+
+@pytest.mark.asyncio
+async def test_break_down_epics_retries_failed_epics_once(agentcontext):
+    sm, _, ui, _ = agentcontext
+    sm.next_state.epics = [{"description": f"Epic {i}"} for i in range(3)]
+
+    tl = TechLead(sm, ui)
+    calls = []
+
+    def get_llm(stream_output=False, source=None):
+        async def llm(convo, parser=None):
+            i = int(source.type_name.rsplit("-", 1)[1]) - 1
+            calls.append(i)
+            if i > 0 and calls.count(i) == 1:
+                raise ValueError(f"Epic {i} failed")
+            return EpicPlan(plan=[Task(description=f"Task for epic {i}", solution="", review="")])
+
+        return llm
+
+    tl.get_llm = get_llm
+    await tl.break_down_epics()
+
+    assert sorted(calls) == [0, 1, 1, 2, 2]
+    assert [epic["tasks"][0]["description"] for epic in sm.next_state.epics] == [f"Task for epic {i}" for i in range(3)]
+
+
+@pytest.mark.asyncio
+async def test_break_down_epics_fails_if_retry_fails(agentcontext):
+    sm, _, ui, _ = agentcontext
+    sm.next_state.epics = [{"description": f"Epic {i}"} for i in range(2)]
+
+    tl = TechLead(sm, ui)
+    calls = []
+
+    def get_llm(stream_output=False, source=None):
+        async def llm(convo, parser=None):
+            calls.append(source.type_name)
+            if source.type_name.endswith("-2"):
+                raise ValueError("Epic failed")
+            return EpicPlan(plan=[])
+
+        return llm
+
+    tl.get_llm = get_llm
+    with pytest.raises(ValueError, match="Epic failed"):
+        await tl.break_down_epics()
+    assert len(calls) == 3
+
+
 @pytest.mark.skip(reason="Temporary")
 async def test_update_epic(agentcontext):
     """
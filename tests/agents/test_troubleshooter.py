@@ -1,3 +1,5 @@
+from unittest.mock import MagicMock
+
 import pytest
 
 from core.agents.troubleshooter import RouteFilePaths, Troubleshooter
@@ -29,3 +31,29 @@ async def test_route_files_are_included_in_the_prompt(agentcontext):
     user_msg_contents = [msg["content"] for msg in second_llm_call[0][0] if msg["role"] == "user"]
     assert "File 1 content" in user_msg_contents[1]  # Prompt at [1] has the route file contents
     assert "File 2 content" not in user_msg_contents[1]
+
+
+@pytest.mark.asyncio
+async def test_relevant_file_candidates_are_listed_without_contents(agentcontext):
+    sm, _, ui, mock_get_llm = agentcontext
+
+    sm.current_state.tasks = [{"description": "Fix the login form", "status": "todo"}]
+    await sm.commit()
+    sm.current_state.files = [
+        File(path="login.js", content=FileContent(content="LOGIN FORM\n" * 100), meta={"description": "Login form"}),
+        File(path="other.js", content=FileContent(content="Other content"), meta={}),
+    ]
+    sm.get_relevance_index = MagicMock()
+    sm.get_relevance_index.return_value.candidates.return_value = ["login.js"]
+
+    ts = Troubleshooter(sm, ui)
+    ts.get_llm = mock_get_llm(
+        return_value=MagicMock(read_files=[], add_files=[], remove_files=[], done=True, original_response="{}")
+    )
+    await ts.get_relevant_files()
+
+    convo = ts.get_llm().call_args.args[0]
+    prompt = next(msg["content"] for msg in convo.messages if "most likely relevant" in msg["content"])
+    assert "* `login.js` (100 lines of code): Login form" in prompt
+    assert "LOGIN FORM" not in prompt
+    assert sm.next_state.relevant_files == ["login.js"]
@@ -0,0 +1,50 @@
+import os
+from time import perf_counter
+
+import pytest
+
+# Benchmarks run with small inputs as part of the regular test suite, so they
+# stay fast. Set BENCHMARK_SCALE (eg. to 100) to run them with bigger inputs.
+BENCHMARK_SCALE = int(os.environ.get("BENCHMARK_SCALE", "1"))
+
+
+class Benchmark:
+    """
+    Minimal benchmark helper: times code blocks and prints a report.
+
+    Run the benchmarks with `pytest tests/benchmarks -s --no-cov` to see the report.
+
+    >>> with benchmark("json-parser") as t:
+    ...     parser(text)
+    >>> benchmark.report()
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.results: dict[str, dict] = {}
+        self.scale = BENCHMARK_SCALE
+
+    def __call__(self, label: str, **metrics) -> "Benchmark":
+        self.label = label
+        self.results[label] = dict(metrics)
+        return self
+
+    def __enter__(self) -> dict:
+        self.t0 = perf_counter()
+        return self.results[self.label]
+
+    def __exit__(self, *args):
+        self.results[self.label]["seconds"] = perf_counter() - self.t0
+
+    def report(self):
+        print(f"\n{self.name}:")
+        for label, metrics in self.results.items():
+            values = ", ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items())
+            print(f"  {label}: {values}")
+
+
+@pytest.fixture
+def benchmark(request):
+    bench = Benchmark(request.node.name)
+    yield bench
+    bench.report()
@@ -0,0 +1,41 @@
+from unittest.mock import MagicMock
+
+from core.state.dependency_graph import DependencyGraph
+
+from .conftest import BENCHMARK_SCALE
+
+
+def project_files(n_files: int, version: int = 0) -> list:
+    # Each module imports the next few modules, plus some shared utilities
+    files = []
+    for i in range(n_files):
+        imports = "".join(f"import m{j} from './m{j}';\n" for j in range(i + 1, min(i + 4, n_files)))
+        content = (
+            f"{imports}import {{ log }} from './utils/log';\n// v{version if i == 0 else 0}\n" + "const x = 1;\n" * 50
+        )
+        files.append(
+            MagicMock(path=f"m{i}.js", content=MagicMock(content=content), meta={}, content_id=f"{i}-{hash(content)}")
+        )
+    files.append(MagicMock(path="utils/log.js", content=MagicMock(content=""), meta={}, content_id="log"))
+    return files
+
+
+def test_dependency_graph_incremental_sync(benchmark):
+    n_files = 200 * BENCHMARK_SCALE
+    graph = DependencyGraph()
+    files = project_files(n_files)
+
+    with benchmark("full-build", files=n_files + 1):
+        graph.sync(files)
+
+    changed = project_files(n_files, version=1)
+    with benchmark("incremental-sync", files=n_files + 1, changed=1):
+        graph.sync(changed)
+
+    with benchmark("within-3-hops", queries=100) as metrics:
+        for i in range(100):
+            found = graph.within(f"m{i % n_files}.js", 3, dependents=True)
+        metrics["found"] = len(found)
+
+    assert graph.reverse["utils/log.js"] == {f"m{i}.js" for i in range(n_files)}
+    assert benchmark.results["incremental-sync"]["seconds"] < benchmark.results["full-build"]["seconds"]
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from core.config import LocalIPCConfig
+from core.ui.ipc_client import MESSAGE_SIZE_LIMIT, IPCClientUI, Message, MessageType
+
+from .conftest import BENCHMARK_SCALE
+
+
+def modified_files_payload(n_files: int = 50, file_size: int = 40_000) -> bytes:
+    # Roughly the shape of a MODIFIED_FILES message: old and new content of each file
+    files = [
+        {
+            "path": f"src/module{i}.js",
+            "old_content": "const a = 1;\n" * (file_size // 13),
+            "new_content": "const b = 2;\n" * (file_size // 13),
+        }
+        for i in range(n_files)
+    ]
+    return Message(type=MessageType.MODIFIED_FILES, content={"files": files}).to_bytes()
+
+
+async def legacy_receive(reader: asyncio.StreamReader) -> Message:
+    # The previous implementation: ignore the length prefix and re-parse the growing buffer after each read
+    data = b""
+    while True:
+        data += await reader.read(MESSAGE_SIZE_LIMIT)
+        try:
+            return Message.model_validate_json(json.dumps(json.loads(data[4:].decode("utf-8"))))
+        except ValueError:
+            continue
+
+
+async def serve(payload: bytes, n_messages: int):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        for _ in range(n_messages):
+            writer.write(len(payload).to_bytes(4, byteorder="big") + payload)
+            await writer.drain()
+            # Wait for the client to ask for the next message
+            await reader.readexactly(1)
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+@pytest.mark.asyncio
+async def test_ipc_receive_throughput(benchmark):
+    payload = modified_files_payload()
+    n_messages = 5 * BENCHMARK_SCALE
+
+    for label in ("legacy", "framed"):
+        server = await serve(payload, n_messages)
+        port = server.sockets[0].getsockname()[1]
+        ui = IPCClientUI(LocalIPCConfig(port=port))
+        await ui.start()
+
+        with benchmark(label, messages=n_messages, size=len(payload)) as metrics:
+            for _ in range(n_messages):
+                if label == "legacy":
+                    msg = await legacy_receive(ui.reader)
+                else:
+                    msg = await ui._receive()
+                assert len(msg.content["files"]) == 50
+                ui.writer.write(b"\n")
+        metrics["mb_per_sec"] = n_messages * len(payload) / metrics["seconds"] / 1024 / 1024
+
+        ui.writer.close()
+        server.close()
+        await server.wait_closed()
+
+    assert benchmark.results["framed"]["seconds"] < benchmark.results["legacy"]["seconds"]
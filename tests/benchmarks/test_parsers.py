@@ -0,0 +1,83 @@
+import json
+
+from core.agents.convo import _schema_cache, get_schema_text
+from core.agents.developer import StepType, TaskSteps
+from core.llm import parser as parser_module
+from core.llm.parser import CodeBlockParser, EnumParser, JSONParser, OptionalCodeBlockParser
+
+from .conftest import BENCHMARK_SCALE
+
+N_ITERATIONS = 50 * BENCHMARK_SCALE
+
+
+def task_steps_response(n_steps: int = 200) -> str:
+    steps = []
+    for i in range(n_steps):
+        if i % 3 == 0:
+            steps.append({"type": "command", "command": {"command": f"npm run step{i}", "timeout": 60}})
+        elif i % 3 == 1:
+            steps.append({"type": "save_file", "save_file": {"path": f"src/components/Component{i}.jsx"}})
+        else:
+            steps.append({"type": "human_intervention", "human_intervention_description": "Check the app " * 20})
+    return "```json\n" + json.dumps({"steps": steps}, indent=2) + "\n```"
+
+
+def code_response(n_lines: int = 2000) -> str:
+    code = "\n".join(f"    const value{i} = compute({i}, 'argument');" for i in range(n_lines))
+    return f"Here's the updated file:\n\n```javascript\nfunction main() {{\n{code}\n}}\n```\n\nLet me know!"
+
+
+def test_json_parser(benchmark):
+    text = task_steps_response()
+    parser = JSONParser(TaskSteps)
+
+    with benchmark("uncached", iterations=N_ITERATIONS):
+        for _ in range(N_ITERATIONS):
+            # Simulate creating the extended model for every response
+            parser_module._extended_models.clear()
+            result = parser(text)
+
+    with benchmark("cached", iterations=N_ITERATIONS):
+        for _ in range(N_ITERATIONS):
+            result = parser(text)
+
+    assert len(result.steps) == 200
+    # Parsing dominates the timing, so only check that the extended model is reused (timings are in the report)
+    assert len(parser_module._extended_models) == 1
+
+
+def test_require_schema(benchmark):
+    with benchmark("uncached", iterations=N_ITERATIONS):
+        for _ in range(N_ITERATIONS):
+            _schema_cache.clear()
+            schema = get_schema_text(TaskSteps)
+
+    with benchmark("cached", iterations=N_ITERATIONS):
+        for _ in range(N_ITERATIONS):
+            assert get_schema_text(TaskSteps) is schema
+
+    assert benchmark.results["cached"]["seconds"] < benchmark.results["uncached"]["seconds"]
+
+
+def test_code_block_parsers(benchmark):
+    text = code_response()
+
+    with benchmark("CodeBlockParser", iterations=N_ITERATIONS, size=len(text)):
+        for _ in range(N_ITERATIONS):
+            code = CodeBlockParser()(text)
+    assert code.startswith("function main()")
+
+    block = text[text.index("```") : text.rindex("```") + 3]
+    with benchmark("OptionalCodeBlockParser", iterations=N_ITERATIONS, size=len(block)):
+        for _ in range(N_ITERATIONS):
+            code = OptionalCodeBlockParser()(block)
+    assert code.startswith("function main()")
+
+
+def test_enum_parser(benchmark):
+    parser = EnumParser(StepType)
+
+    with benchmark("EnumParser", iterations=N_ITERATIONS * 100):
+        for _ in range(N_ITERATIONS * 100):
+            result = parser("  Human_Intervention \n")
+    assert result == StepType.HUMAN_INTERVENTION
@@ -0,0 +1,38 @@
+import sys
+
+import psutil
+import pytest
+
+from core.proc.output_buffer import OUTPUT_BUFFER_SIZE
+from core.proc.process_manager import ProcessManager
+
+from .conftest import BENCHMARK_SCALE
+
+# Total size of the output the process emits; the request targets 50 MB (BENCHMARK_SCALE=100)
+OUTPUT_SIZE = 512 * 1024 * BENCHMARK_SCALE
+LINE = "2024-01-01 12:00:00 INFO [server] GET /api/items?page=42 200 12ms\n"
+
+
+@pytest.mark.asyncio
+async def test_process_output_throughput(benchmark, tmp_path):
+    script = tmp_path / "emit.py"
+    script.write_text(
+        "import sys\n"
+        f"line = {LINE!r}\n"
+        f"for _ in range({OUTPUT_SIZE // len(LINE)}):\n"
+        "    sys.stdout.write(line)\n"
+    )
+    pm = ProcessManager(root_dir=str(tmp_path))
+    cpu = psutil.Process().cpu_times()
+
+    with benchmark("run-command", mb=OUTPUT_SIZE / 1024 / 1024) as metrics:
+        status_code, stdout, _ = await pm.run_command(f'"{sys.executable}" emit.py')
+
+    cpu_after = psutil.Process().cpu_times()
+    metrics["cpu_seconds"] = (cpu_after.user + cpu_after.system) - (cpu.user + cpu.system)
+    metrics["mb_per_second"] = metrics["mb"] / metrics["seconds"]
+    await pm.stop_watcher()
+
+    assert status_code == 0
+    # Only the tail of the output is kept in memory
+    assert len(stdout) == min(OUTPUT_SIZE // len(LINE), OUTPUT_BUFFER_SIZE // len(LINE)) * len(LINE)
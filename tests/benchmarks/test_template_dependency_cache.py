@@ -0,0 +1,48 @@
+import os
+import shutil
+from os.path import join
+
+from core.templates.dependency_cache import DependencyCache
+
+from .conftest import BENCHMARK_SCALE
+
+# Size of the synthetic dependency tree; a fresh Vite + React install has about 10k files (BENCHMARK_SCALE=10)
+NUM_PACKAGES = 100 * BENCHMARK_SCALE
+FILES_PER_PACKAGE = 10
+FILE_CONTENT = "module.exports = function () { return 42; };\n" * 20
+
+
+def make_node_modules(project_dir: str):
+    for i in range(NUM_PACKAGES):
+        package_dir = join(project_dir, "node_modules", f"package-{i}", "lib")
+        os.makedirs(package_dir)
+        for j in range(FILES_PER_PACKAGE):
+            with open(join(package_dir, f"file-{j}.js"), "w") as f:
+                f.write(FILE_CONTENT)
+
+
+def test_template_dependency_cache(benchmark, tmp_path):
+    """
+    Compare a cold template install (snapshot after npm install) to warm ones.
+
+    No network access (and no npm) is needed: the "installed" dependency
+    tree is synthetic, and the warm installs only touch the local cache.
+    """
+    cache = DependencyCache(str(tmp_path / "cache"))
+    key = cache.key('{"name": "benchmark"}')
+    seed = str(tmp_path / "seed")
+    make_node_modules(seed)
+    num_files = NUM_PACKAGES * FILES_PER_PACKAGE
+
+    with benchmark("cold-snapshot", files=num_files):
+        assert cache.store(key, seed)
+
+    with benchmark("warm-copy", files=num_files):
+        shutil.copytree(join(tmp_path, "cache", key, "node_modules"), join(tmp_path, "copy", "node_modules"))
+
+    project = str(tmp_path / "project")
+    os.makedirs(project)
+    with benchmark("warm-hardlink", files=num_files):
+        assert cache.restore(key, project)
+
+    assert len(os.listdir(join(project, "node_modules"))) == NUM_PACKAGES
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from core.ui.base import AgentSource
+from core.ui.ipc_client import Message, MessageType
+from core.ui.stream_buffer import StreamCoalescer
+
+from .conftest import BENCHMARK_SCALE
+
+
+class ExtensionStandIn:
+    """
+    Local socket server reading length-prefixed messages, like the VSCode extension does.
+    """
+
+    def __init__(self):
+        self.messages = 0
+        self.text = []
+        self.done = asyncio.Event()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                size = int.from_bytes(await reader.readexactly(4), byteorder="big")
+                msg = Message.from_bytes(await reader.readexactly(size))
+                self.messages += 1
+                if msg.type == MessageType.EXIT:
+                    break
+                self.text.append(msg.content)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+            self.done.set()
+
+
+async def stream_tokens(tokens: list[str], coalesce: bool) -> ExtensionStandIn:
+    ext = ExtensionStandIn()
+    server = await asyncio.start_server(ext.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    source = AgentSource("Developer", "developer")
+
+    # Same wire format as IPCClientUI._send()
+    async def send(type: MessageType, content, source):
+        data = Message(type=type, content=content, category=source.type_name if source else None).to_bytes()
+        writer.write(len(data).to_bytes(4, byteorder="big"))
+        writer.write(data)
+        await writer.drain()
+
+    async def send_chunk(chunk, source):
+        await send(MessageType.STREAM, "\n" if chunk is None else chunk, source)
+
+    if coalesce:
+        coalescer = StreamCoalescer(send_chunk)
+        for token in tokens:
+            await coalescer.write(token, source=source)
+        await coalescer.write(None, source=source)
+    else:
+        for token in tokens:
+            await send_chunk(token, source)
+        await send_chunk(None, source)
+
+    await send(MessageType.EXIT, None, None)
+    await ext.done.wait()
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return ext
+
+
+@pytest.mark.asyncio
+async def test_stream_coalescing_throughput(benchmark):
+    tokens = [f"tok{i % 100} " for i in range(5000 * BENCHMARK_SCALE)]
+    expected = "".join(tokens) + "\n"
+
+    results = {}
+    for coalesce in (False, True):
+        label = "coalesced" if coalesce else "per-token"
+        with benchmark(label, tokens=len(tokens)) as metrics:
+            ext = await stream_tokens(tokens, coalesce)
+        metrics["messages"] = ext.messages
+        metrics["tokens_per_sec"] = len(tokens) / metrics["seconds"]
+        assert "".join(ext.text) == expected
+        results[label] = ext.messages
+
+    assert results["coalesced"] < results["per-token"] / 10
@@ -0,0 +1,145 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from core.cli.batch import BatchJob, BatchResult, get_batch_concurrency, load_batch_jobs, run_batch, show_batch_report
+from core.config import DBConfig
+from core.db.models import Base, Project
+from core.db.session import SessionManager
+from core.llm.request_log import LLMRequestLog, LLMRequestStatus
+
+
+def test_load_batch_jobs(tmp_path):
+    jobs_file = tmp_path / "jobs.json"
+    jobs_file.write_text(
+        json.dumps([{"name": "first", "inputs": [{"text": "A todo app"}]}, {"name": "second"}]),
+        encoding="utf-8",
+    )
+
+    jobs = load_batch_jobs(str(jobs_file))
+    assert jobs == [BatchJob("first", [{"text": "A todo app"}]), BatchJob("second", [])]
+
+
+@pytest.mark.parametrize("data", [{"name": "first"}, [{"inputs": []}], ["first"]])
+def test_load_batch_jobs_invalid(tmp_path, data):
+    jobs_file = tmp_path / "jobs.json"
+    jobs_file.write_text(json.dumps(data), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_batch_jobs(str(jobs_file))
+
+
+@pytest.mark.asyncio
+@patch("core.state.state_manager.get_config")
+async def test_run_batch(mock_get_config, testmanager):
+    mock_get_config.return_value.fs.type = "memory"
+    running = 0
+    max_running = 0
+
+    async def fake_run_project(sm, ui):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+        if sm.project.name == "broken":
+            raise RuntimeError("boom")
+        if sm.project.name == "slow":
+            await asyncio.sleep(1)
+
+        for status in [LLMRequestStatus.SUCCESS, LLMRequestStatus.ERROR]:
+            await sm.log_llm_request(
+                LLMRequestLog(
+                    provider="openai",
+                    model="gpt-4o",
+                    temperature=0.5,
+                    prompt_tokens=100,
+                    completion_tokens=50,
+                    duration=2.0,
+                    status=status,
+                ),
+                agent=MagicMock(agent_type="developer"),
+            )
+        await sm.commit()
+        return sm.project.name != "failed"
+
+    jobs = [BatchJob(name) for name in ["ok", "failed", "broken", "slow"]]
+    with patch("core.cli.batch.run_project", side_effect=fake_run_project):
+        results = await run_batch(testmanager, jobs, concurrency=2, timeout=0.5)
+
+    assert max_running == 2
+    assert [result.name for result in results] == ["ok", "failed", "broken", "slow"]
+    assert [result.success for result in results] == [True, False, False, False]
+    assert [result.error for result in results] == [None, "failed", "boom", "timeout"]
+
+    ok = results[0]
+    assert ok.project_id is not None
+    assert ok.steps == 1
+    assert ok.llm_requests == 2
+    assert ok.llm_errors == 1
+    assert ok.prompt_tokens == 200
+    assert ok.completion_tokens == 100
+    assert ok.avg_llm_latency == 2.0
+    assert ok.max_llm_latency == 2.0
+    assert results[2].llm_requests == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_concurrent_commits_are_locked(tmp_path):
+    # Two concurrent projects on a file-backed SQLite database: once one flushes, the other can't commit
+    db = SessionManager(DBConfig(url=f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}?timeout=0.1"))
+    async with db.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    first, second = db.fork(), db.fork()
+    async with first as session1, second as session2:
+        session1.add(Project(name="first"))
+        await session1.flush()
+        session2.add(Project(name="second"))
+        with pytest.raises(OperationalError, match="database is locked"):
+            await session2.commit()
+        await session1.commit()
+    await db.engine.dispose()
+
+
+@pytest.mark.parametrize(
+    ("url", "concurrency", "expected"),
+    [
+        ("sqlite+aiosqlite:///pythagora.db", None, 1),
+        ("sqlite+aiosqlite:///pythagora.db", 1, 1),
+        ("postgresql+asyncpg://localhost/pythagora", None, 4),
+        ("postgresql+asyncpg://localhost/pythagora", 8, 8),
+    ],
+)
+def test_get_batch_concurrency(url, concurrency, expected):
+    assert get_batch_concurrency(url, concurrency) == expected
+
+
+@pytest.mark.parametrize(
+    ("url", "concurrency"),
+    [("sqlite+aiosqlite:///pythagora.db", 2), ("postgresql+asyncpg://localhost/pythagora", 0)],
+)
+def test_get_batch_concurrency_invalid(url, concurrency):
+    with pytest.raises(ValueError):
+        get_batch_concurrency(url, concurrency)
+
+
+def test_show_batch_report(capsys):
+    results = [
+        BatchResult(
+            "ok", success=True, duration=10.0, llm_requests=2, prompt_tokens=150, completion_tokens=50, llm_time=4.0
+        ),
+        BatchResult("slow", error="timeout", duration=5.0),
+    ]
+
+    show_batch_report(results, 10.0)
+
+    out = capsys.readouterr().out
+    assert "1/2 projects succeeded" in out
+    assert "20.0" in out
+    assert "timeout" in out
+    assert "Total: 200 tokens" in out
@@ -15,6 +15,8 @@ from core.cli.helpers import (
     parse_llm_endpoint,
     parse_llm_key,
     show_config,
+    show_exec_report,
+    show_relevance_report,
 )
 from core.cli.main import async_main
 from core.config import Config, LLMProvider, loader
@@ -57,6 +59,8 @@ def test_parse_arguments(mock_ArgumentParser):
         "--email",
         "--extension-version",
         "--no-check",
+        "--exec-report",
+        "--relevance-report",
     }
 
     parser.parse_args.assert_called_once_with()
@@ -240,6 +244,60 @@ async def test_list_projects(mock_StateManager, capsys):
     assert "- branch1 (1234)" in data
 
 
+@pytest.mark.asyncio
+@patch("core.cli.helpers.StateManager")
+async def test_show_exec_report(mock_StateManager, capsys):
+    sm = mock_StateManager.return_value
+    row = MagicMock(
+        cmd="npm install",
+        runs=2,
+        cached=1,
+        total_duration=12.5,
+        max_duration=10.0,
+        peak_rss=300 * 1024 * 1024,
+        cpu_time=4.25,
+        read_bytes=None,
+        write_bytes=2048,
+    )
+    sm.get_command_usage = AsyncMock(return_value=[row])
+
+    await show_exec_report(None, "abc")
+
+    sm.get_command_usage.assert_awaited_once_with("abc")
+    data = capsys.readouterr().out
+    assert "2 runs of 1 commands" in data
+    assert "12.5s" in data
+    assert "300.0 MB" in data
+    assert "4.2s" in data
+    assert "2.0 KB" in data
+    assert data.rstrip().endswith("npm install")
+
+
+@pytest.mark.asyncio
+@patch("core.cli.helpers.StateManager")
+async def test_show_relevance_report(mock_StateManager, capsys):
+    sm = mock_StateManager.return_value
+    files = [
+        MagicMock(path="routes/auth.js", content=MagicMock(content="login route"), meta={}, content_id="1"),
+        MagicMock(path="models/user.js", content=MagicMock(content="user schema"), meta={}, content_id="2"),
+    ]
+    state = MagicMock(
+        step_index=3,
+        files=files,
+        relevant_files=["routes/auth.js", "models/user.js"],
+        current_task={"description": "Add login"},
+    )
+    sm.get_relevant_files_selections = AsyncMock(return_value=[state])
+
+    await show_relevance_report(None, "abc")
+
+    sm.get_relevant_files_selections.assert_awaited_once_with("abc")
+    data = capsys.readouterr().out
+    assert "on 1 recorded selections" in data
+    assert "50%" in data
+    assert "Mean recall: 50%, mean precision: 100%" in data
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("args", "kwargs", "retval"),
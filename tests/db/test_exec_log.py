@@ -0,0 +1,56 @@
+import pytest
+
+from core.db.models import ExecLog
+from core.proc.exec_log import ExecLog as ExecLogData
+
+from .factories import create_project_state
+
+
+def exec_log_data(cmd: str, duration: float, **kwargs) -> ExecLogData:
+    return ExecLogData(
+        duration=duration,
+        cmd=cmd,
+        cwd=".",
+        env={},
+        timeout=None,
+        status_code=0,
+        stdout="",
+        stderr="",
+        analysis="",
+        success=True,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_usage_summary(testdb):
+    state = create_project_state()
+    other_state = create_project_state(project_name="Other Project")
+    testdb.add(state)
+    testdb.add(other_state)
+    await testdb.commit()
+
+    ExecLog.from_exec_log(
+        state,
+        exec_log_data("npm install", 10.0, peak_rss=200, cpu_user=1.0, cpu_system=0.5, read_bytes=10, write_bytes=20),
+    )
+    ExecLog.from_exec_log(state, exec_log_data("npm install", 0.5, cached=True))
+    ExecLog.from_exec_log(state, exec_log_data("npm run build", 3.0, peak_rss=500, cpu_user=2.0, cpu_system=1.0))
+    ExecLog.from_exec_log(other_state, exec_log_data("pip install -r requirements.txt", 60.0))
+    await testdb.commit()
+
+    rows = await ExecLog.get_usage_summary(testdb)
+    assert [row.cmd for row in rows] == ["pip install -r requirements.txt", "npm install", "npm run build"]
+
+    rows = await ExecLog.get_usage_summary(testdb, state.branch.project_id)
+    assert [row.cmd for row in rows] == ["npm install", "npm run build"]
+    npm_install, npm_build = rows
+    assert npm_install.runs == 2
+    assert npm_install.cached == 1
+    assert npm_install.total_duration == 10.5
+    assert npm_install.max_duration == 10.0
+    assert npm_install.peak_rss == 200
+    assert npm_install.cpu_time == 1.5
+    assert (npm_install.read_bytes, npm_install.write_bytes) == (10, 20)
+    assert npm_build.peak_rss == 500
+    assert npm_build.read_bytes is None
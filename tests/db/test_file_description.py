@@ -0,0 +1,41 @@
+import pytest
+
+from core.db.models import FileContent, FileDescription
+
+
+@pytest.mark.asyncio
+async def test_store_and_get_many(testdb):
+    await FileContent.store(testdb, "hash1", "content 1")
+    await FileContent.store(testdb, "hash2", "content 2")
+    await testdb.commit()
+
+    fd = await FileDescription.store(testdb, "hash1", "openai/gpt-4o/v1", "First file", ["b.js"])
+    await testdb.commit()
+
+    # Storing the same content again returns the existing description
+    again = await FileDescription.store(testdb, "hash1", "openai/gpt-4o/v1", "Other", [])
+    assert again.id == fd.id
+    await FileDescription.store(testdb, "hash1", "openai/gpt-4o/v2", "First file, v2", [])
+    await testdb.commit()
+
+    descriptions = await FileDescription.get_many(testdb, ["hash1", "hash2"], "openai/gpt-4o/v1")
+    assert list(descriptions) == ["hash1"]
+    assert descriptions["hash1"].description == "First file"
+    assert descriptions["hash1"].references == ["b.js"]
+
+    assert (await FileDescription.get_many(testdb, ["hash1"], "openai/gpt-4o/v2"))["hash1"].description == (
+        "First file, v2"
+    )
+    assert await FileDescription.get_many(testdb, [], "openai/gpt-4o/v1") == {}
+
+
+@pytest.mark.asyncio
+async def test_deleted_with_content(testdb):
+    await FileContent.store(testdb, "hash1", "content 1")
+    await FileDescription.store(testdb, "hash1", "openai/gpt-4o/v1", "First file", [])
+    await testdb.commit()
+
+    await FileContent.delete_orphans(testdb)
+    await testdb.commit()
+
+    assert await FileDescription.get_many(testdb, ["hash1"], "openai/gpt-4o/v1") == {}
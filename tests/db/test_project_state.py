@@ -219,3 +219,70 @@ async def test_completing_unfinished_epics(testdb):
     await testdb.refresh(state)
 
     assert state.current_epic is None
+
+
+@pytest.mark.asyncio
+async def test_file_content_store_counts_lines_and_bytes(testdb):
+    fc = await FileContent.store(testdb, "hash", "héllo\nworld\n")
+    assert (fc.num_lines, fc.num_bytes) == (2, 13)
+
+    # Content stored before the counts were tracked
+    legacy = FileContent(id="legacy", content="one\ntwo\nthree")
+    assert legacy.count() == (3, 13)
+    assert legacy.num_lines == 3
+
+
+@pytest.mark.asyncio
+async def test_file_stats_are_updated_incrementally(testdb):
+    state = create_project_state()
+    state.files.append(
+        File(path="a.txt", content=FileContent(id="a", content="one\ntwo"), meta={"description": "A file"})
+    )
+    testdb.add(state)
+    await testdb.commit()
+
+    stats = state.file_stats
+    assert (stats.num_files, stats.num_lines, stats.num_bytes) == (1, 2, 7)
+    assert state.get_undescribed_files() == []
+
+    next_state = await state.create_next_state()
+    await testdb.flush()
+    for file in next_state.files:
+        await file.awaitable_attrs.content
+    next_state.save_file("b.txt", FileContent(id="b", content="three"))
+    next_state.save_file("a.txt", FileContent(id="a2", content="one\ntwo\nfour"))
+    stats = next_state.file_stats
+    assert (stats.num_files, stats.num_lines, stats.num_bytes) == (2, 4, 17)
+    # The original state isn't affected
+    assert state.file_stats.num_files == 1
+
+    # a.txt still has the old description, b.txt has none
+    assert [file.path for file in next_state.get_undescribed_files()] == ["b.txt"]
+
+    next_state.remove_file("b.txt")
+    assert next_state.remove_file("missing.txt") is None
+    stats = next_state.file_stats
+    assert (stats.num_files, stats.num_lines, stats.num_bytes) == (1, 3, 12)
+    assert next_state.get_undescribed_files() == []
+    assert stats.maybe_undescribed == set()
+
+
+@pytest.mark.asyncio
+async def test_file_index_is_updated_incrementally(testdb):
+    state = create_project_state()
+    state.files.append(File(path="a.txt", content=FileContent(id="a", content="one"), meta={"description": "A file"}))
+    testdb.add(state)
+    await testdb.commit()
+
+    next_state = await state.create_next_state()
+    await testdb.flush()
+    # The index is built while cloning the files, not when looking up undescribed files
+    assert list(next_state.__dict__["_files_by_path"]) == ["a.txt"]
+
+    b = next_state.save_file("b.txt", FileContent(id="b", content="two"))
+    assert next_state._file_index == {"a.txt": next_state.get_file_by_path("a.txt"), "b.txt": b}
+    assert next_state.get_undescribed_files() == [b]
+
+    next_state.remove_file("b.txt")
+    assert list(next_state._file_index) == ["a.txt"]
+    assert next_state.get_undescribed_files() == []
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from core.config import LLMConfig, LLMProvider
+
+
+class StubAnthropicServer:
+    """
+    Local stand-in for the Anthropic streaming Messages API.
+
+    Streams the given chunks, waiting `first_token_delay` seconds before
+    the first one and `chunk_delay` seconds between them.
+    """
+
+    def __init__(self, chunks: list[str], first_token_delay: float = 0.0, chunk_delay: float = 0.0):
+        self.chunks = chunks
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.disconnected = 0
+        self.server = None
+
+    async def __aenter__(self) -> "StubAnthropicServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def event(type: str, data: dict) -> bytes:
+        return f"event: {type}\ndata: {json.dumps({'type': type, **data})}\n\n".encode()
+
+    @staticmethod
+    async def sleep(reader: asyncio.StreamReader, delay: float):
+        # Wait for the delay, noticing if the client disconnects in the meantime
+        try:
+            data = await asyncio.wait_for(reader.read(1), delay)
+        except asyncio.TimeoutError:
+            return
+        if not data:
+            raise ConnectionError("Client disconnected")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.requests += 1
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in headers.decode().split("\r\n"):
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        await reader.readexactly(length)
+
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            writer.write(
+                self.event(
+                    "message_start",
+                    {
+                        "message": {
+                            "id": "msg_1",
+                            "type": "message",
+                            "role": "assistant",
+                            "model": "stub",
+                            "content": [],
+                            "stop_reason": None,
+                            "stop_sequence": None,
+                            "usage": {"input_tokens": 10, "output_tokens": 1},
+                        }
+                    },
+                )
+            )
+            writer.write(self.event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}))
+            await writer.drain()
+
+            await self.sleep(reader, self.first_token_delay)
+            for chunk in self.chunks:
+                writer.write(
+                    self.event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": chunk}})
+                )
+                await writer.drain()
+                await self.sleep(reader, self.chunk_delay)
+
+            writer.write(self.event("content_block_stop", {"index": 0}))
+            writer.write(
+                self.event(
+                    "message_delta",
+                    {"delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 5}},
+                )
+            )
+            writer.write(self.event("message_stop", {}))
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            self.disconnected += 1
+        finally:
+            writer.close()
+
+
+def llm_config(url: str, model: str) -> LLMConfig:
+    return LLMConfig(provider=LLMProvider.ANTHROPIC, model=model, base_url=url, api_key="test", read_timeout=30.0)
@@ -0,0 +1,45 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic import BaseModel
+
+from core.errors import APIError
+from core.llm.anthropic_client import AnthropicClient
+from core.llm.convo import Convo
+from core.llm.parser import JSONParser, StreamingJSONParser
+
+from .stub_anthropic import StubAnthropicServer, llm_config
+
+
+@pytest.mark.asyncio
+async def test_streaming_parser_aborts_invalid_response():
+    class Steps(BaseModel):
+        steps: list[int]
+
+    invalid = StubAnthropicServer(['{"steps": [1, "two", ', "3]}"], chunk_delay=5.0)
+    async with invalid:
+        stream_handler = AsyncMock()
+        client = AnthropicClient(llm_config(invalid.url, "claude"), stream_handler=stream_handler)
+
+        with pytest.raises(APIError):
+            await asyncio.wait_for(client(Convo().user("hi"), parser=StreamingJSONParser(Steps), max_retries=2), 3)
+        await asyncio.sleep(0.1)
+
+    # Each attempt is aborted right after the invalid item, without waiting for the rest
+    assert invalid.requests == 2
+    assert invalid.disconnected == 2
+    assert client.stream_handler is stream_handler
+    assert [c.args[0] for c in stream_handler.await_args_list] == ['{"steps": [1, "two", ', None] * 2
+
+
+@pytest.mark.asyncio
+async def test_repaired_json_response_is_not_retried():
+    server = StubAnthropicServer(['```json\n{"steps": [1, 2,', "]}"])
+    async with server:
+        client = AnthropicClient(llm_config(server.url, "claude"))
+        response, request_log = await client(Convo().user("hi"), parser=JSONParser())
+
+    assert response == {"steps": [1, 2]}
+    assert request_log.json_repaired is True
+    assert server.requests == 1
@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.config import LLMConfig, LLMProvider
+from core.llm.client_registry import ClientRegistry
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_for_same_config():
+    registry = ClientRegistry()
+    factory = MagicMock(side_effect=lambda http_client: object())
+
+    cfg1 = LLMConfig(model="gpt-4o", api_key="secret", temperature=0.0)
+    cfg2 = LLMConfig(model="gpt-3.5-turbo", api_key="secret", temperature=0.5)
+
+    client1 = registry.get(cfg1, factory)
+    client2 = registry.get(cfg2, factory)
+
+    assert client1 is client2
+    factory.assert_called_once()
+
+    stats = registry.stats()
+    assert len(stats) == 1
+    assert stats[0]["provider"] == "openai"
+    assert stats[0]["handouts"] == 2
+    assert stats[0]["connections"] == 0
+    assert "secret" not in repr(registry.entries)
+
+    await registry.close()
+    assert registry.stats() == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "other",
+    [
+        LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude", api_key="secret"),
+        LLMConfig(model="gpt-4o", api_key="other-secret"),
+        LLMConfig(model="gpt-4o", api_key="secret", base_url="http://localhost:1234/v1"),
+        LLMConfig(model="gpt-4o", api_key="secret", read_timeout=60.0),
+        LLMConfig(model="gpt-4o", api_key="secret", extra={"azure_deployment": "x"}),
+    ],
+)
+async def test_registry_separates_different_configs(other):
+    registry = ClientRegistry()
+    factory = MagicMock(side_effect=lambda http_client: object())
+
+    client1 = registry.get(LLMConfig(model="gpt-4o", api_key="secret"), factory)
+    client2 = registry.get(other, factory)
+
+    assert client1 is not client2
+    assert len(registry.stats()) == 2
+    await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_registry_passes_pooled_http_client():
+    registry = ClientRegistry()
+    factory = MagicMock()
+
+    registry.get(LLMConfig(model="gpt-4o", connect_timeout=5.0, read_timeout=7.0), factory)
+
+    http_client = factory.call_args.args[0]
+    assert http_client.timeout.connect == 5.0
+    assert http_client.timeout.read == 7.0
+
+    await registry.close()
+    assert http_client.is_closed
+
+
+def test_registry_replaces_client_from_other_event_loop():
+    registry = ClientRegistry()
+    factory = MagicMock(side_effect=lambda http_client: object())
+    cfg = LLMConfig(model="gpt-4o")
+
+    client1 = registry.get(cfg, factory)
+
+    async def get_in_loop():
+        return registry.get(cfg, factory)
+
+    client2 = asyncio.run(get_in_loop())
+    assert client1 is not client2
+    assert factory.call_count == 2
+
+
+def test_registry_closes_client_replaced_from_other_event_loop():
+    registry = ClientRegistry()
+    factory = MagicMock(side_effect=lambda http_client: object())
+    cfg = LLMConfig(model="gpt-4o")
+
+    async def get_in_loop():
+        return registry.get(cfg, factory)
+
+    asyncio.run(get_in_loop())
+    old_http_client = factory.call_args.args[0]
+
+    async def replace_and_close():
+        registry.get(cfg, factory)
+        await registry.close()
+
+    asyncio.run(replace_and_close())
+    assert old_http_client.is_closed
+    assert factory.call_count == 2
@@ -0,0 +1,156 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from core.config import HedgeConfig, LLMProvider
+from core.llm.anthropic_client import AnthropicClient
+from core.llm.convo import Convo
+from core.llm.hedging import HedgedLLMClient
+
+from .stub_anthropic import StubAnthropicServer, llm_config
+
+
+@pytest.fixture(autouse=True)
+def anthropic_only():
+    # Avoid importing all the provider clients (and loading their tokenizers)
+    with patch("core.llm.hedging.BaseLLMClient.for_provider", return_value=AnthropicClient):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_fired_for_fast_primary():
+    primary = StubAnthropicServer(["Hello", " world"])
+    backup = StubAnthropicServer(["Backup"])
+    async with primary, backup:
+        stream_handler = AsyncMock()
+        client = HedgedLLMClient(
+            llm_config(primary.url, "claude-primary"),
+            llm_config(backup.url, "claude-backup"),
+            HedgeConfig(agent="backup", first_token_timeout=2.0),
+            stream_handler=stream_handler,
+        )
+
+        response, request_log = await client(Convo().user("hi"))
+
+    assert response == "Hello world"
+    assert request_log.hedged is False
+    assert request_log.model == "claude-primary"
+    assert backup.requests == 0
+    assert [c.args[0] for c in stream_handler.await_args_list] == ["Hello", " world", None]
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_on_first_token_timeout():
+    primary = StubAnthropicServer(["Slow"], first_token_delay=5.0)
+    backup = StubAnthropicServer(["Fast", " backup"])
+    async with primary, backup:
+        stream_handler = AsyncMock()
+        client = HedgedLLMClient(
+            llm_config(primary.url, "claude-primary"),
+            llm_config(backup.url, "claude-backup"),
+            HedgeConfig(agent="backup", first_token_timeout=0.2),
+            stream_handler=stream_handler,
+        )
+
+        response, request_log = await client(Convo().user("hi"))
+        await asyncio.sleep(0.1)
+
+    assert response == "Fast backup"
+    assert request_log.hedged is True
+    assert request_log.hedge_winner == "backup"
+    assert request_log.model == "claude-backup"
+    assert request_log.wasted_prompt_tokens == request_log.prompt_tokens
+    assert backup.requests == 1
+    assert primary.disconnected == 1
+    assert [c.args[0] for c in stream_handler.await_args_list] == ["Fast", " backup", None]
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_on_low_throughput():
+    primary = StubAnthropicServer(["a", "b", "c", "d"], chunk_delay=1.0)
+    backup = StubAnthropicServer(["Fast"])
+    async with primary, backup:
+        stream_handler = AsyncMock()
+        client = HedgedLLMClient(
+            llm_config(primary.url, "claude-primary"),
+            llm_config(backup.url, "claude-backup"),
+            HedgeConfig(agent="backup", first_token_timeout=2.0, min_throughput=10.0, throughput_window=0.3),
+            stream_handler=stream_handler,
+        )
+
+        response, request_log = await client(Convo().user("hi"))
+
+    assert response == "Fast"
+    assert request_log.hedge_winner == "backup"
+    # The partial primary stream is terminated before the backup response is streamed
+    assert [c.args[0] for c in stream_handler.await_args_list] == ["a", None, "Fast", None]
+
+
+@pytest.mark.asyncio
+async def test_hedge_primary_wins_race():
+    primary = StubAnthropicServer(["Primary"], first_token_delay=0.3)
+    backup = StubAnthropicServer(["Backup"], first_token_delay=5.0)
+    async with primary, backup:
+        client = HedgedLLMClient(
+            llm_config(primary.url, "claude-primary"),
+            llm_config(backup.url, "claude-backup"),
+            HedgeConfig(agent="backup", first_token_timeout=0.1),
+        )
+
+        response, request_log = await client(Convo().user("hi"))
+
+    assert response == "Primary"
+    assert request_log.hedged is True
+    assert request_log.hedge_winner == "primary"
+    assert backup.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_with_streaming_parser():
+    from pydantic import BaseModel
+
+    from core.llm.parser import StreamingJSONParser
+
+    class Steps(BaseModel):
+        steps: list[dict]
+
+    # Both responses are valid, but their chunks arrive interleaved
+    primary = StubAnthropicServer(['{"steps": [{"a": 1}', "]}"], first_token_delay=0.3, chunk_delay=0.5)
+    backup = StubAnthropicServer(['{"steps": [{"a": 2', "}]}"], first_token_delay=0.2, chunk_delay=0.2)
+    async with primary, backup:
+        items = []
+        parser = StreamingJSONParser(Steps, on_item=lambda field, item: items.append((field, item)))
+        client = HedgedLLMClient(
+            llm_config(primary.url, "claude-primary"),
+            llm_config(backup.url, "claude-backup"),
+            HedgeConfig(agent="backup", first_token_timeout=0.1),
+        )
+
+        response, request_log = await client(Convo().user("hi"), parser=parser)
+
+    assert request_log.hedge_winner == "backup"
+    assert response.steps == [{"a": 2}]
+    # Neither stream was corrupted by the other, so there were no retries
+    assert backup.requests == 1
+    assert len(request_log.messages) == 1
+    # Items parsed from the losing primary stream aren't surfaced
+    assert items == [("steps", {"a": 2})]
+
+
+def test_config_rejects_unknown_hedge_agent():
+    from core.config import AgentLLMConfig, Config
+
+    with pytest.raises(ValueError):
+        Config(agent={"default": AgentLLMConfig(hedge=HedgeConfig(agent="nonexistent"))})
+
+    config = Config(
+        agent={
+            "default": AgentLLMConfig(hedge=HedgeConfig(agent="backup")),
+            "backup": AgentLLMConfig(provider=LLMProvider.ANTHROPIC, model="claude"),
+        }
+    )
+    policy, backup_config = config.hedge_for_agent("SomeAgent")
+    assert policy.agent == "backup"
+    assert backup_config.model == "claude"
+    assert config.hedge_for_agent("backup") is None
@@ -4,7 +4,16 @@ from typing import Tuple
 import pytest
 from pydantic import BaseModel, field_validator
 
-from core.llm.parser import CodeBlockParser, EnumParser, JSONParser, MultiCodeBlockParser, OptionalCodeBlockParser
+from core.llm.parser import (
+    CodeBlockParser,
+    EnumParser,
+    JSONParser,
+    MultiCodeBlockParser,
+    OptionalCodeBlockParser,
+    StreamingJSONParser,
+    StreamingParseError,
+    repair_json,
+)
 
 
 @pytest.mark.parametrize(
@@ -204,3 +213,177 @@ def test_enum_parser(input, expected):
 def test_optional_block_parser(input, expected):
     parser = OptionalCodeBlockParser()
     assert parser(input) == expected
+
+
+class StreamChild(BaseModel):
+    name: str
+    age: int
+
+
+class StreamParent(BaseModel):
+    name: str
+    children: list[StreamChild]
+
+
+def chunked(text: str, size: int = 3) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.asyncio
+async def test_streaming_json_parser_surfaces_items():
+    text = '```json\n{"name": "John", "children": [{"name": "Jane", "age": 3}, {"name": "Jim, \\"jr\\" [}", "age": 1}]}\n```'
+    seen = []
+    parser = StreamingJSONParser(StreamParent, on_item=lambda field, item: seen.append((field, item)))
+
+    for chunk in chunked(text):
+        await parser.feed(chunk)
+    await parser.feed(None)
+
+    assert seen == [
+        ("children", StreamChild(name="Jane", age=3)),
+        ("children", StreamChild(name='Jim, "jr" [}', age=1)),
+    ]
+    assert parser.items["children"] == [child for _, child in seen]
+    assert parser(parser.text).model_dump() == JSONParser(StreamParent)(text).model_dump()
+
+
+@pytest.mark.asyncio
+async def test_streaming_json_parser_async_callback():
+    seen = []
+
+    async def on_item(field, item):
+        seen.append(item.name)
+
+    parser = StreamingJSONParser(StreamParent, on_item=on_item)
+    await parser.feed('{"name": "John", "children": [{"name": "Jane", "age": 3}, ')
+    assert seen == ["Jane"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("text", "error"),
+    [
+        # invalid list item is detected before the list is complete
+        ('{"name": "John", "children": [{"name": "Jane", "age": "old"}, ', "children.0.age"),
+        # invalid top-level field is detected as soon as it's complete
+        ('{"name": 42, "children": [', "name"),
+        ('Here it is:\n```json\n{"name": 42, "children": [', "name"),
+        # invalid JSON
+        ('{"name": "John", "children": [{"name": "Jane" "age": 3}, ', "JSON is not valid"),
+        ('{"name": "John"]', "JSON is not valid"),
+    ],
+)
+async def test_streaming_json_parser_aborts_early(text, error):
+    parser = StreamingJSONParser(StreamParent)
+    with pytest.raises(StreamingParseError, match=error.replace(".", r"\.")):
+        for chunk in chunked(text):
+            await parser.feed(chunk)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("text", "streamed"),
+    [
+        # braces in the text before the code fence
+        ('Use {name, children}:\n```json\n{"name": "John", "children": [{"name": "Jane", "age": 3}]}\n```', 1),
+        # single-quoted strings with commas
+        ("{'name': 'Doe, John', 'children': [{'name': 'Jane, jr', 'age': 3},]}", 1),
+        # repairable problems the streaming parser doesn't understand are left for the final parse
+        ('{"name": "John", // comment, with [brackets\n "children": [{"name": "Jane", "age": 3}]}', 0),
+    ],
+)
+async def test_streaming_json_parser_accepts_repairable_responses(text, streamed):
+    expected = JSONParser(StreamParent)(text)
+    parser = StreamingJSONParser(StreamParent)
+    for size in [1, 3, len(text)]:
+        parser.reset()
+        for chunk in chunked(text, size):
+            await parser.feed(chunk)
+        await parser.feed(None)
+
+        assert parser.items["children"] == expected.children[:streamed]
+        assert parser(parser.text).model_dump() == expected.model_dump()
+
+
+@pytest.mark.asyncio
+async def test_streaming_json_parser_reset():
+    parser = StreamingJSONParser(StreamParent)
+    with pytest.raises(StreamingParseError):
+        await parser.feed('{"name": 1,')
+
+    parser.reset()
+    await parser.feed('{"name": "John", "children": [{"name": "Jane", "age": 3}]}')
+    assert parser.items["children"] == [StreamChild(name="Jane", age=3)]
+    assert parser.text.startswith('{"name": "John"')
+
+
+@pytest.mark.parametrize(
+    ("input", "expected"),
+    [
+        # stray prose and unterminated fence
+        ('Sure, here it is:\n```json\n{"a": 1}\n', '{"a": 1}'),
+        ('{"a": 1}\nLet me know if you need anything else!', '{"a": 1}'),
+        # comments and trailing commas
+        ('{"a": [1, 2,], // the list\n "b": 2, /* done */}', '{"a": [1, 2], \n "b": 2}'),
+        # single quotes
+        ("{'a': 'it\\'s \"quoted\"'}", '{"a": "it\'s \\"quoted\\""}'),
+        # raw newlines in strings
+        ('{"a": "line\nbreak"}', '{"a": "line\\nbreak"}'),
+        # truncated response, right after a complete value
+        ('{"a": [1, 2, {"b": "c"}, ', '{"a": [1, 2, {"b": "c"}]}'),
+        ('{"a": "b"', '{"a": "b"}'),
+        # truncated response, in the middle of a value or member
+        ('{"a": [1, 2, {"b": "c"}, {"b": "trunc', None),
+        ('{"steps": [{"a":1}, {"a":2}, {"a":', None),
+        ('{"a": "b", "c"', None),
+        ('{"a": 12', None),
+        # nothing to salvage
+        ("{", None),
+        ("```{", None),
+        ('{"a": 1]', None),
+    ],
+)
+def test_repair_json(input, expected):
+    assert repair_json(input) == expected
+
+
+@pytest.mark.parametrize("strict", [True, False])
+def test_parse_json_repairs_response(strict):
+    parser = JSONParser(strict=strict)
+    assert parser('```json\n{"a": [1, 2,],}') == {"a": [1, 2]}
+    assert parser.repaired is True
+
+    assert parser('{"a": 1}') == {"a": 1}
+    assert parser.repaired is False
+
+
+def test_parse_json_truncated_response_is_not_repaired():
+    # Closing the brackets would silently drop the last step, so the LLM should be asked to retry
+    with pytest.raises(ValueError):
+        JSONParser()('{"steps": [{"a": 1}, {"a": 2}, {"a":')
+
+
+def test_parse_json_with_spec_repairs_response():
+    class TestModel(BaseModel):
+        name: str
+        tags: list[str]
+
+    text = "{'name': 'John', 'tags': ['a', 'b',],}"
+    parser = JSONParser(spec=TestModel)
+    result = parser(text)
+    assert result.name == "John"
+    assert result.tags == ["a", "b"]
+    assert result.original_response == text
+    assert parser.repaired is True
+
+
+def test_parse_json_reuses_extended_model():
+    class TestModel(BaseModel):
+        name: str
+
+    first = JSONParser(spec=TestModel)('{"name": "John"}')
+    second = JSONParser(spec=TestModel)('{"name": "Jane"}')
+
+    assert type(first) is type(second)
+    assert type(first).__name__ == "ExtendedTestModel"
+    assert second.model_dump() == {"name": "Jane", "original_response": '{"name": "Jane"}'}
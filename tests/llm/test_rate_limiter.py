@@ -0,0 +1,43 @@
+import asyncio
+from time import monotonic
+
+import pytest
+
+from core.config import LLMProvider
+from core.llm.rate_limiter import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_backoff_holds_back_provider_requests():
+    limiter = RateLimiter()
+    limiter.backoff(LLMProvider.OPENAI, 0.2)
+    # A shorter backoff doesn't shorten the existing one
+    limiter.backoff(LLMProvider.OPENAI, 0.01)
+
+    t0 = monotonic()
+    async with limiter.slot(LLMProvider.ANTHROPIC):
+        pass
+    assert monotonic() - t0 < 0.1
+
+    async with limiter.slot(LLMProvider.OPENAI):
+        pass
+    assert monotonic() - t0 >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_max_concurrent_requests():
+    limiter = RateLimiter()
+    limiter.configure(max_concurrent=2)
+    running = 0
+    max_running = 0
+
+    async def request():
+        nonlocal running, max_running
+        async with limiter.slot(LLMProvider.OPENAI):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*[request() for _ in range(5)])
+    assert max_running == 2
@@ -0,0 +1,128 @@
+from os.path import join
+from sys import platform
+
+import pytest
+
+from core.disk.vfs import LocalDiskVFS
+from core.proc.command_cache import MAX_CACHE_ENTRIES, CacheRule, CommandCache
+from core.proc.process_manager import ProcessManager
+
+
+@pytest.fixture
+def vfs(tmp_path):
+    vfs = LocalDiskVFS(str(tmp_path / "project"))
+    vfs.save("package.json", '{"name": "test"}')
+    vfs.save("node_modules/.package-lock.json", "{}")
+    vfs.save("api/requirements.txt", "fastapi\n")
+    return vfs
+
+
+def test_key_depends_on_inputs(vfs, tmp_path):
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"))
+
+    key = cache.key("npm install")
+    assert key is not None
+    assert cache.key("npm install") == key
+    assert cache.key("npm install", env={"NODE_ENV": "production"}) != key
+
+    vfs.save("package-lock.json", "{}")
+    assert cache.key("npm install") != key
+
+    vfs.save("package.json", '{"name": "changed"}')
+    assert cache.key("npm install") != key
+
+
+def test_key_uncacheable_commands(vfs, tmp_path):
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"))
+
+    assert cache.key("npm run dev") is None
+    assert cache.key("npm install express") is None
+    assert cache.key("cd .. && npm install") is None
+    # node_modules doesn't exist in api/, so npm install must run there
+    assert cache.key("cd api && npm install") is None
+
+
+def test_key_input_from_command(vfs, tmp_path):
+    rules = [CacheRule(pattern=r"^pip install -r (?P<file>\S+)$", inputs=["{file}"])]
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"), rules=rules)
+
+    key = cache.key("cd api && pip install -r requirements.txt")
+    assert key is not None
+    assert cache.key("pip install -r requirements.txt", cwd="api") != key
+
+    vfs.save("api/requirements.txt", "fastapi\nuvicorn\n")
+    assert cache.key("cd api && pip install -r requirements.txt") != key
+
+
+def test_python_installs_not_cached_by_default(vfs, tmp_path):
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"))
+
+    # The virtualenv they install into isn't tracked, so it could have been deleted since
+    assert cache.key("cd api && pip install -r requirements.txt") is None
+    assert cache.key("poetry install") is None
+
+
+def test_put_get_persist(vfs, tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = CommandCache(vfs, path)
+    key = cache.key("npm install")
+
+    cache.put(key, 1, "", "error")
+    assert cache.get(key) is None
+
+    cache.put(key, 0, "added 1 package", "")
+    assert cache.get(key).stdout == "added 1 package"
+
+    cache = CommandCache(vfs, path)
+    assert cache.get(key).status_code == 0
+    assert cache.get(None) is None
+
+
+def test_put_limits_entries(vfs, tmp_path):
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"))
+
+    for i in range(MAX_CACHE_ENTRIES + 5):
+        cache.put(f"key-{i}", 0, "", "")
+
+    assert len(cache.entries) == MAX_CACHE_ENTRIES
+    assert cache.get("key-0") is None
+    assert cache.get(f"key-{MAX_CACHE_ENTRIES + 4}") is not None
+
+
+def test_invalid_cache_file_is_ignored(vfs, tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text("not json")
+
+    cache = CommandCache(vfs, str(path))
+    assert cache.entries == {}
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(platform == "win32", reason="Uses a POSIX shell command")
+async def test_run_command_uses_cache(vfs, tmp_path):
+    rules = [CacheRule(pattern=r"^echo setup >> setup.log$", inputs=["package.json"])]
+    cache = CommandCache(vfs, str(tmp_path / "cache.json"), rules=rules)
+    pm = ProcessManager(root_dir=vfs.root, command_cache=cache)
+    cmd = "echo setup >> setup.log"
+    setup_log = join(vfs.root, "setup.log")
+
+    assert pm.get_cached_result(cmd) is None
+    assert await pm.run_command(cmd, cache=True) == (0, "", "")
+    assert pm.get_cached_result(cmd) is not None
+
+    # Cache hit, command is not run again
+    assert await pm.run_command(cmd, cache=True) == (0, "", "")
+    with open(setup_log) as f:
+        assert f.read() == "setup\n"
+
+    # Cache not requested
+    await pm.run_command(cmd)
+    with open(setup_log) as f:
+        assert f.read() == "setup\nsetup\n"
+
+    # Input changed, cache is invalidated
+    vfs.save("package.json", '{"name": "changed"}')
+    assert pm.get_cached_result(cmd) is None
+    await pm.run_command(cmd, cache=True)
+    with open(setup_log) as f:
+        assert f.read() == "setup\nsetup\nsetup\n"
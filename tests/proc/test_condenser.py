@@ -0,0 +1,58 @@
+from core.proc.condenser import OutputCondenser, estimate_tokens
+
+
+def test_condenser_strips_ansi_and_progress():
+    text = "\x1b[32mok\x1b[0m\nDownloading  10%\rDownloading  50%\rDownloading 100%\n\x1b]0;title\x07done  \n\n"
+    result = OutputCondenser().condense(text)
+
+    assert result.text == "ok\nDownloading 100%\ndone"
+
+
+def test_condenser_collapses_duplicates():
+    lines = ["start"] + ["npm WARN deprecated"] * 5
+    lines += [f"fetch package-{i} took {i * 3}ms" for i in range(100)] + ["end"]
+    result = OutputCondenser().condense("\n".join(lines))
+
+    assert result.text.splitlines() == [
+        "start",
+        "npm WARN deprecated [repeated 5 times]",
+        "fetch package-0 took 0ms",
+        "[... 98 similar lines ...]",
+        "fetch package-99 took 297ms",
+        "end",
+    ]
+    assert result.saved_tokens > 0
+
+
+def test_condenser_keeps_head_tail_and_errors():
+    lines = [f"compiling module {chr(97 + i % 26)}{i % 7}" for i in range(2000)]
+    lines[1000] = "TypeError: Cannot read properties of undefined (reading 'id')"
+    text = "\n".join(lines)
+
+    condenser = OutputCondenser(max_tokens=500, head_lines=5, tail_lines=5, context_lines=1)
+    result = condenser.condense(text)
+    out = result.text.splitlines()
+
+    assert out[:5] == lines[:5]
+    assert out[-5:] == lines[-5:]
+    assert lines[999] in out and lines[1000] in out and lines[1001] in out
+    assert any("lines omitted" in line for line in out)
+    assert result.condensed_tokens <= 500
+    assert result.original_tokens == estimate_tokens(text)
+
+    # Deterministic
+    assert condenser.condense(text) == result
+
+
+def test_condenser_uses_given_tokenizer():
+    text = "\n".join(f"line {chr(97 + i % 26)}" for i in range(1000))
+    result = OutputCondenser(max_tokens=50, count_tokens=lambda t: len(t.split())).condense(text)
+
+    assert result.original_tokens == 2000
+    assert result.condensed_tokens <= 50
+
+
+def test_condenser_empty_output():
+    result = OutputCondenser().condense(None)
+    assert result.text == ""
+    assert result.saved_tokens == 0
@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import os
+import time
+
+import pytest
+
+from core.proc.output_buffer import OutputBuffer, prune_spill_files, read_stream, wait_for_output
+
+
+def test_output_buffer_drain():
+    buf = OutputBuffer()
+    buf.write("hello\nwor")
+    assert buf.drain() == "hello\nwor"
+    assert buf.drain() == ""
+
+    buf.write("ld\nfoo\n")
+    assert buf.drain() == "ld\nfoo\n"
+    assert buf.getvalue() == "hello\nworld\nfoo\n"
+    assert [line for _, line in buf.lines] == ["hello\n", "world\n", "foo\n"]
+
+
+def test_output_buffer_tail():
+    buf = OutputBuffer()
+    buf.write("one\ntwo\nthree\nfour")
+
+    assert buf.tail(2) == "three\nfour"
+    assert buf.tail(10) == "one\ntwo\nthree\nfour"
+    assert buf.tail(0) == ""
+
+
+def test_output_buffer_drops_oldest_lines():
+    buf = OutputBuffer(max_size=10)
+    buf.write("aaaa\nbbbb\ncccc\n")
+
+    assert buf.getvalue() == "bbbb\ncccc\n"
+    assert buf.start == 5
+    assert buf.total == 15
+
+    # Reading from dropped output starts at the oldest line still kept
+    assert buf.read(0) == ("bbbb\ncccc\n", 15)
+    assert buf.read(7) == ("bb\ncccc\n", 15)
+    assert buf.read(15) == ("", 15)
+
+
+@pytest.mark.asyncio
+async def test_read_stream_decodes_split_characters():
+    stream = asyncio.StreamReader()
+    data = "žabe ✓ 🐸\n".encode("utf-8")
+    for i in range(len(data)):
+        stream.feed_data(data[i : i + 1])
+    stream.feed_data(b"bad \xff byte")
+    stream.feed_eof()
+
+    buf = OutputBuffer()
+    await read_stream(stream, buf)
+
+    assert buf.drain() == "žabe ✓ 🐸\nbad � byte"
+
+
+@pytest.mark.asyncio
+async def test_wait_for_output():
+    stdout, stderr = OutputBuffer(), OutputBuffer()
+    assert await wait_for_output(stdout, stderr, timeout=0.01) is False
+
+    asyncio.get_running_loop().call_later(0.01, stderr.write, "error\n")
+    assert await wait_for_output(stdout, stderr, timeout=1) is True
+    assert stderr.drain() == "error\n"
+
+
+def test_output_buffer_spills_to_disk(tmp_path):
+    spill_path = tmp_path / "logs" / "out.log.gz"
+    buf = OutputBuffer(max_size=100, spill_path=str(spill_path))
+    for i in range(1000):
+        buf.write(f"line {i}\n" if i != 500 else "ERROR: something failed\n")
+
+    assert buf.size <= 100
+    assert buf.tail(1) == "line 999\n"
+
+    # The dropped output is still accessible through the spill file
+    matches = buf.grep(r"^ERROR")
+    assert [line for _, line in matches] == ["ERROR: something failed\n"]
+    offset = matches[0][0]
+    text, new_offset = buf.since(offset)
+    assert text.startswith("ERROR: something failed\nline 501\n")
+    assert text.endswith("line 999\n")
+    assert new_offset == buf.total
+
+    buf.close()
+    assert buf.since(0)[0] == "".join(f"line {i}\n" if i != 500 else "ERROR: something failed\n" for i in range(1000))
+    assert gzip.decompress(spill_path.read_bytes()).decode() == buf.since(0)[0]
+
+    buf.discard()
+    assert buf.grep(r"^ERROR") == []
+    assert buf.since(0)[0] == buf.getvalue()
+    # The file is removed in the background
+    for _ in range(100):
+        if not spill_path.exists():
+            break
+        time.sleep(0.01)
+    assert not spill_path.exists()
+
+
+def test_output_buffer_spills_only_on_overflow(tmp_path):
+    spill_path = tmp_path / "out.log.gz"
+    buf = OutputBuffer(max_size=100, spill_path=str(spill_path))
+    buf.write("fits in memory\n")
+    buf.close()
+    assert buf.since(0)[0] == "fits in memory\n"
+    assert not spill_path.exists()
+
+
+def test_prune_spill_files(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"{i}.stdout.log.gz"
+        path.write_bytes(b"")
+        os.utime(path, (i, i))
+    (tmp_path / "other.txt").write_text("keep")
+
+    prune_spill_files(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == ["3.stdout.log.gz", "4.stdout.log.gz", "other.txt"]
@@ -0,0 +1,46 @@
+import pytest
+
+from core.proc.planner import command_cwd, commands_independent, plan_concurrent_commands
+
+
+@pytest.mark.parametrize(
+    ("cmd", "cwd"),
+    [
+        ("npm install", "."),
+        ("cd api && npm install", "api"),
+        ("cd ./ui/ && npm run build", "ui"),
+        ('cd "client app"; npm install', "client app"),
+        ("cd api/src/.. && npm test", "api"),
+        ("cd .. && npm install", None),
+        ("cd /tmp && rm -rf x", None),
+        ("cd api && cd ../ui && npm install", None),
+        ("cd api && cp .env ../.env", None),
+        ("cd api && npm install $PKG", None),
+    ],
+)
+def test_command_cwd(cmd, cwd):
+    assert command_cwd(cmd) == cwd
+
+
+def test_commands_independent():
+    assert commands_independent("cd api && npm install", "cd ui && npm install")
+    assert not commands_independent("cd api && npm install", "cd api && npx prisma generate")
+    assert not commands_independent("cd client && npm install", "cd client/lib && npm install")
+    assert not commands_independent("npm install", "cd ui && npm install")
+
+
+def test_plan_concurrent_commands():
+    def cmd(command):
+        return {"type": "command", "command": {"command": command, "timeout": 60}}
+
+    steps = [
+        cmd("cd api && npm install"),
+        cmd("cd ui && npm install"),
+        cmd("cd api && npx prisma generate"),
+        cmd("cd docs && npm install"),
+    ]
+    assert plan_concurrent_commands(steps) == steps[:2]
+
+    steps = [cmd("cd api && npm install"), {"type": "save_file", "save_file": {"path": "ui/a.js"}}, steps[1]]
+    assert plan_concurrent_commands(steps) == steps[:1]
+    assert plan_concurrent_commands([cmd("npm install"), cmd("cd ui && npm install")]) == [cmd("npm install")]
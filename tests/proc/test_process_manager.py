@@ -1,7 +1,8 @@
+import asyncio
+import os
 from os import getenv, makedirs
 from os.path import join
 from sys import platform
-from unittest.mock import patch
 
 import pytest
 from psutil import Process
@@ -54,7 +55,6 @@ async def test_local_process_wait(tmp_path):
 
 
 @pytest.mark.asyncio
-@patch("core.proc.process_manager.WATCHER_IDLE_INTERVAL", 0.1)
 async def test_process_manager_run_command_capture_stdout(tmp_path):
     pm = ProcessManager(root_dir=tmp_path)
 
@@ -71,7 +71,6 @@ async def test_process_manager_run_command_capture_stdout(tmp_path):
 
 
 @pytest.mark.asyncio
-@patch("core.proc.process_manager.WATCHER_IDLE_INTERVAL", 0.1)
 async def test_process_manager_run_command_capture_stderr(tmp_path):
     pm = ProcessManager(root_dir=tmp_path)
 
@@ -88,7 +87,6 @@ async def test_process_manager_run_command_capture_stderr(tmp_path):
 
 
 @pytest.mark.asyncio
-@patch("core.proc.process_manager.WATCHER_IDLE_INTERVAL", 0.1)
 async def test_process_manager_start_list_terminate(tmp_path):
     cmd = "timeout 5" if platform == "win32" else "sleep 5"
     cwd = join("some", "sub", "directory")
@@ -115,7 +113,6 @@ async def test_process_manager_start_list_terminate(tmp_path):
 
 
 @pytest.mark.asyncio
-@patch("core.proc.process_manager.WATCHER_IDLE_INTERVAL", 0.1)
 async def test_watcher(tmp_path):
     stdout = ""
     stderr = ""
@@ -133,7 +130,6 @@ async def test_watcher(tmp_path):
     pm = ProcessManager(root_dir=tmp_path, output_handler=output_handler, exit_handler=exit_handler)
 
     lp = await pm.start_process("echo hello", bg=True)
-    import asyncio
 
     for i in range(10):
         await asyncio.sleep(0.1)
@@ -148,3 +144,92 @@ async def test_watcher(tmp_path):
     assert lp.stderr == ""
 
     await pm.stop_watcher()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(platform == "win32", reason="Uses POSIX shell commands")
+async def test_watch_many_background_processes(tmp_path):
+    outputs = []
+    exited = []
+    all_exited = asyncio.Event()
+
+    async def output_handler(out, err):
+        outputs.append(out)
+
+    async def exit_handler(process):
+        exited.append(process)
+        if len(exited) == 50:
+            all_exited.set()
+
+    pm = ProcessManager(root_dir=tmp_path, output_handler=output_handler, exit_handler=exit_handler)
+
+    procs = [await pm.start_process(f"sleep 0.{i % 5}; echo process-{i}", bg=True) for i in range(50)]
+
+    await asyncio.wait_for(all_exited.wait(), 5)
+    await asyncio.sleep(0)
+
+    assert sorted(p.id for p in exited) == sorted(p.id for p in procs)
+    assert sorted("".join(outputs).split()) == sorted(f"process-{i}" for i in range(50))
+    assert all(p.returncode == 0 and not p.is_running for p in procs)
+    assert pm.watchers == {}
+
+    await pm.stop_watcher()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(platform == "win32", reason="Uses POSIX shell commands")
+async def test_terminate_does_not_block_event_loop(tmp_path):
+    pm = ProcessManager(root_dir=tmp_path)
+    # The shell ignores SIGTERM, so terminating it waits for the full timeout
+    lp = await pm.start_process("trap '' TERM; sleep 5 & wait", bg=True)
+    await asyncio.sleep(0.1)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.05)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await pm.terminate_process(lp.id)
+    task.cancel()
+
+    assert ticks >= 5
+    await pm.stop_watcher()
+    await lp.terminate()
+    await lp.wait()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(platform == "win32", reason="Uses POSIX shell commands")
+async def test_run_command_bounded_output(tmp_path):
+    log_dir = join(tmp_path, "logs")
+    pm = ProcessManager(root_dir=tmp_path, max_output_size=1024, log_dir=log_dir)
+
+    lp = await pm.start_process("seq 1 10000; echo done >&2", bg=True)
+    await asyncio.wait_for(pm.watchers[lp.id], 5)
+
+    assert len(lp.stdout) <= 1024
+    assert lp.tail(2) == "9999\n10000\n"
+    assert lp.tail(1, stderr=True) == "done\n"
+    assert [line for _, line in lp.grep(r"^500$")] == ["500\n"]
+
+    offset = lp.grep(r"^9990$")[0][0]
+    assert lp.since(offset)[0].split() == [str(i) for i in range(9990, 10001)]
+    assert lp.since(0)[0].split() == [str(i) for i in range(1, 10001)]
+
+    # Only the output that didn't fit in memory, of background processes, is saved
+    status_code, stdout, _ = await pm.run_command("seq 1 10000", show_output=False)
+    assert status_code == 0 and len(stdout) <= 1024
+    assert sorted(os.listdir(log_dir)) == [f"{lp.id}.stdout.log.gz"]
+
+    await pm.terminate_process(lp.id)
+    for _ in range(100):
+        if not os.listdir(log_dir):
+            break
+        await asyncio.sleep(0.01)
+    assert os.listdir(log_dir) == []
+
+    await pm.stop_watcher()
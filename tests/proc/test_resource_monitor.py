@@ -0,0 +1,93 @@
+import sys
+
+import pytest
+
+from core.proc.process_manager import ProcessManager
+from core.proc.resource_monitor import ResourceMonitor, ResourceUsage
+from core.proc.shell_session import ShellSession
+
+# Allocates and touches ~100MB, burns some CPU and writes a file, in a child process
+SCRIPT = (
+    "import subprocess, sys, time\n"
+    "if len(sys.argv) > 1:\n"
+    "    data = bytearray(100 * 1024 * 1024)\n"
+    "    end = time.time() + 0.5\n"
+    "    while time.time() < end: pass\n"
+    "    open('out.bin', 'wb').write(data[:1024 * 1024])\n"
+    "else:\n"
+    "    subprocess.run([sys.executable, sys.argv[0], 'child'])\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_run_command_resource_usage(tmp_path):
+    (tmp_path / "work.py").write_text(SCRIPT)
+    pm = ProcessManager(root_dir=str(tmp_path))
+    monitor = ResourceMonitor(0.05)
+
+    status_code, _, _ = await pm.run_command(f'"{sys.executable}" work.py', monitor=monitor)
+
+    assert status_code == 0
+    usage = monitor.usage
+    assert usage.peak_rss > 100 * 1024 * 1024
+    assert usage.cpu_user + usage.cpu_system > 0.2
+    assert usage.max_children >= 1
+    if usage.write_bytes is not None:
+        assert usage.write_bytes >= 0
+    # Stopped sampling
+    assert monitor._task is None
+    await pm.stop_watcher()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not ShellSession.available(), reason="Shell sessions require bash")
+async def test_shell_session_resource_usage(tmp_path):
+    (tmp_path / "work.py").write_text(SCRIPT)
+    pm = ProcessManager(root_dir=str(tmp_path), persistent_shell=True)
+    monitor = ResourceMonitor(0.05)
+
+    status_code, _, _ = await pm.run_command(f'"{sys.executable}" work.py child', monitor=monitor)
+
+    assert status_code == 0
+    assert monitor.usage.peak_rss > 100 * 1024 * 1024
+    await pm.stop_watcher()
+
+
+@pytest.mark.asyncio
+async def test_monitor_missing_process():
+    monitor = ResourceMonitor(0.01)
+    monitor.start(2**22 + 12345)
+
+    usage = await monitor.stop()
+    assert usage == ResourceUsage()
+    # Nothing was sampled, which isn't the same as no usage
+    assert usage.peak_rss is None
+    assert usage.cpu_user is None
+
+
+# Runs short CPU-bound children one after another, then idles
+SHORT_CHILDREN_SCRIPT = (
+    "import subprocess, sys, time\n"
+    "if len(sys.argv) > 1:\n"
+    "    end = time.process_time() + 0.15\n"
+    "    while time.process_time() < end: pass\n"
+    "else:\n"
+    "    for _ in range(3):\n"
+    "        subprocess.run([sys.executable, sys.argv[0], 'child'])\n"
+    "    time.sleep(1.5)\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_short_lived_children_cpu_time(tmp_path):
+    (tmp_path / "work.py").write_text(SHORT_CHILDREN_SCRIPT)
+    pm = ProcessManager(root_dir=str(tmp_path))
+    # The children start and exit between two samples
+    monitor = ResourceMonitor(1.2)
+
+    status_code, _, _ = await pm.run_command(f'"{sys.executable}" work.py', monitor=monitor)
+
+    assert status_code == 0
+    usage = monitor.usage
+    assert usage.cpu_user + usage.cpu_system >= 0.45
+    await pm.stop_watcher()
@@ -0,0 +1,100 @@
+import asyncio
+from os import environ, makedirs
+from os.path import join
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.proc.process_manager import ProcessManager
+from core.proc.shell_session import ShellSession
+
+pytestmark = pytest.mark.skipif(not ShellSession.available(), reason="Shell sessions require bash")
+
+
+@pytest.mark.asyncio
+async def test_shell_session_keeps_state(tmp_path):
+    shell = ShellSession(str(tmp_path), dict(environ))
+
+    assert await shell.run("export GREETING=hello") == (0, "", "")
+    assert await shell.run("echo $GREETING") == (0, "hello\n", "")
+    assert await shell.run("greet() { echo hi $1; }; greet there") == (0, "hi there\n", "")
+    assert await shell.run("greet again") == (0, "hi again\n", "")
+
+    await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_session_output_and_exit_code(tmp_path):
+    makedirs(join(tmp_path, "sub"))
+    shell = ShellSession(str(tmp_path), dict(environ))
+
+    assert await shell.run("echo -n out; echo err >&2; exit_with() { return $1; }; exit_with 3") == (3, "out", "err\n")
+    # Working directory is reset before each command
+    assert await shell.run("cd sub && pwd") == (0, join(tmp_path, "sub") + "\n", "")
+    assert await shell.run("pwd") == (0, str(tmp_path) + "\n", "")
+    assert await shell.run("pwd", cwd="sub") == (0, join(tmp_path, "sub") + "\n", "")
+    # Commands can't read the rest of the script
+    assert await shell.run("cat") == (0, "", "")
+    # Syntax errors don't kill the shell
+    status_code, _, stderr = await shell.run("if then")
+    assert status_code != 0 and "syntax error" in stderr
+    assert await shell.run("echo still here") == (0, "still here\n", "")
+
+    await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_session_large_output(tmp_path):
+    shell = ShellSession(str(tmp_path), dict(environ))
+    output_handler = AsyncMock()
+
+    status_code, stdout, _ = await shell.run("seq 1 100000", output_handler=output_handler)
+
+    assert status_code == 0
+    assert stdout == "".join(f"{i}\n" for i in range(1, 100001))
+    assert "".join(call.args[0] for call in output_handler.await_args_list) == stdout
+    await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_session_timeout_keeps_shell(tmp_path):
+    shell = ShellSession(str(tmp_path), dict(environ))
+    await shell.run("export KEEP=me")
+    pid = shell._process.pid
+
+    status_code, stdout, _ = await shell.run("echo started; sleep 10 | cat", timeout=0.5)
+
+    assert status_code is None
+    assert stdout == "started\n"
+    assert shell._process.pid == pid
+    assert await shell.run("echo $KEEP") == (0, "me\n", "")
+    await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_shell_session_restarts_after_exit(tmp_path):
+    shell = ShellSession(str(tmp_path), dict(environ))
+    await shell.run("export GONE=yes")
+
+    assert (await shell.run("exit 4"))[0] == 4
+    assert not shell.is_running
+    assert await shell.run("echo ${GONE:-no}") == (0, "no\n", "")
+    await shell.close()
+
+
+@pytest.mark.asyncio
+async def test_process_manager_persistent_shell(tmp_path, caplog):
+    pm = ProcessManager(root_dir=str(tmp_path), persistent_shell=True)
+
+    await pm.run_command("export STEP=1")
+    assert await pm.run_command("echo $STEP") == (0, "1\n", "")
+    # Custom environment falls back to one-shot mode (without the shell state)
+    assert await pm.run_command("echo $STEP$EXTRA", env={"EXTRA": "x"}) == (0, "x\n", "")
+
+    # Concurrent command falls back to one-shot mode while the shell is busy
+    results = await asyncio.gather(pm.run_command("sleep 0.3; echo $STEP"), pm.run_command("echo ${STEP:-none}"))
+    assert sorted(results) == [(0, "1\n", ""), (0, "none\n", "")]
+    assert "Shell session is busy" in caplog.text
+
+    await pm.stop_watcher()
+    assert not pm.shell.is_running
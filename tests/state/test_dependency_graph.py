@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.state.dependency_graph import DependencyGraph, parse_imports
+
+
+def make_file(path, content, references=None):
+    meta = {"references": references} if references else {}
+    return MagicMock(path=path, content=MagicMock(content=content), meta=meta, content_id=str(hash(content)))
+
+
+def resolved(path, content, existing):
+    return [next((c for c in candidates if c in existing), None) for candidates in parse_imports(path, content)]
+
+
+@pytest.mark.parametrize(
+    ("path", "content", "existing", "expected"),
+    [
+        (
+            "src/App.jsx",
+            "import React from 'react';\nimport { a,\n  b } from './utils';\nimport './App.css';",
+            {"src/utils/index.js", "src/App.css"},
+            ["src/utils/index.js", "src/App.css"],
+        ),
+        (
+            "api/routes/auth.js",
+            "const User = require('../models/User');\nconst lazy = () => import('./lazy.ts');",
+            {"api/models/User.js", "api/routes/lazy.ts"},
+            ["api/models/User.js", "api/routes/lazy.ts"],
+        ),
+        ("index.ts", "export * from './types'", {"types.ts"}, ["types.ts"]),
+        (
+            "app/main.py",
+            "import os\nfrom app.models import user, Base as B\nfrom .utils import (\n    helper,\n)\n",
+            {"app/models/__init__.py", "app/models/user.py", "app/utils.py"},
+            ["app/models/__init__.py", "app/models/user.py", None, "app/utils.py", None, None],
+        ),
+        ("app/api/views.py", "from .. import db", {"app/__init__.py", "app/db.py"}, ["app/__init__.py", "app/db.py"]),
+        ("README.md", "import x from './x'", {"x.js"}, []),
+    ],
+)
+def test_parse_imports(path, content, existing, expected):
+    assert resolved(path, content, existing) == expected
+
+
+def test_graph_edges_and_closure():
+    graph = DependencyGraph()
+    graph.sync(
+        [
+            make_file("server.js", "const app = require('./app')"),
+            make_file("app.js", "const routes = require('./routes')", references=["config.json"]),
+            make_file("routes/index.js", "import { User } from '../models/user.js'"),
+            make_file("models/user.js", ""),
+            make_file("config.json", "{}"),
+        ]
+    )
+
+    assert graph.forward["server.js"] == {"app.js"}
+    assert graph.forward["app.js"] == {"routes/index.js", "config.json"}
+    assert graph.reverse["models/user.js"] == {"routes/index.js"}
+
+    assert graph.within("server.js") == {"app.js": 1}
+    assert graph.within("server.js", 2) == {"app.js": 1, "routes/index.js": 2, "config.json": 2}
+    assert graph.within("models/user.js", 3, dependents=True, dependencies=False) == {
+        "routes/index.js": 1,
+        "app.js": 2,
+        "server.js": 3,
+    }
+    assert graph.within(["app.js", "routes/index.js"], 1, dependents=True) == {
+        "server.js": 1,
+        "config.json": 1,
+        "models/user.js": 1,
+    }
+    assert graph.within("missing.js", 2) == {}
+
+
+def test_graph_incremental_updates():
+    graph = DependencyGraph()
+    graph.update("a.js", "import b from './b'")
+    assert graph.forward["a.js"] == set()
+
+    # Adding the imported file resolves the pending import
+    graph.update("b.js", "")
+    assert graph.forward["a.js"] == {"b.js"}
+    assert graph.reverse["b.js"] == {"a.js"}
+
+    # Removing it falls back to another candidate, if any
+    graph.update("b/index.js", "")
+    graph.remove("b.js")
+    assert graph.forward["a.js"] == {"b/index.js"}
+    assert graph.reverse["b/index.js"] == {"a.js"}
+    assert "b.js" not in graph.reverse
+
+    # Changing the content updates the edges
+    graph.update("a.js", "// no imports")
+    assert graph.forward["a.js"] == set()
+    assert graph.reverse["b/index.js"] == set()
+    assert "b.js" not in graph.wanted
+
+
+def test_graph_sync_reparses_only_changed_files():
+    graph = DependencyGraph()
+    files = [make_file("a.js", "import './b'"), make_file("b.js", "")]
+    graph.sync(files)
+
+    graph.update = MagicMock(wraps=graph.update)
+    graph.sync([files[0], make_file("b.js", "", references=["a.js"])])
+    assert [call.args[0] for call in graph.update.call_args_list] == ["b.js"]
+    assert graph.forward["b.js"] == {"a.js"}
+
+    graph.sync([files[0]])
+    assert len(graph) == 1
+    assert graph.forward["a.js"] == set()
@@ -0,0 +1,102 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.state.dependency_graph import DependencyGraph
+from core.state.relevance_index import RelevanceIndex, candidate_recall, tokenize
+
+
+def make_file(path, content, description=None, references=None, content_id=None):
+    meta = {}
+    if description:
+        meta["description"] = description
+    if references:
+        meta["references"] = references
+    return MagicMock(path=path, content=MagicMock(content=content), meta=meta, content_id=content_id or content)
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("getUserById", ["getuserbyid", "get", "user", "id"]),
+        ("user_profiles", ["user_profile", "user", "profile"]),
+        ("HTTPServer", ["httpserver", "http", "server"]),
+        ("Add the login page", ["add", "login", "page"]),
+        ("const x = 1", []),
+        ("categories", ["category"]),
+    ],
+)
+def test_tokenize(text, expected):
+    assert tokenize(text) == expected
+
+
+def test_search_ranks_by_relevance():
+    index = RelevanceIndex()
+    index.update("routes/auth.js", "router.post('/login', loginUser)", description="Login and logout routes")
+    index.update("models/user.js", "const userSchema = new Schema({ username: String })", description="User model")
+    index.update("public/css/style.css", "body { margin: 0 }", description="Stylesheet")
+
+    ranked = index.search("Implement user login")
+    assert [path for path, _ in ranked][:2] == ["routes/auth.js", "models/user.js"]
+    assert "public/css/style.css" not in dict(ranked)
+
+    assert index.search("nothing matches") == []
+    assert len(index.search("user login", limit=1)) == 1
+
+
+def test_update_and_remove():
+    index = RelevanceIndex()
+    index.update("a.js", "payment processing")
+    index.update("b.js", "unrelated")
+    assert [path for path, _ in index.search("payment")] == ["a.js"]
+
+    index.update("a.js", "something else")
+    assert index.search("payment") == []
+
+    index.remove("a.js")
+    index.remove("missing.js")
+    assert "a.js" not in index
+    assert len(index) == 1
+    assert index.total_len == index.doc_len["b.js"]
+    assert "something" not in index.postings
+
+
+def test_sync_reindexes_only_changed_files():
+    index = RelevanceIndex()
+    files = [make_file("a.js", "alpha"), make_file("b.js", "beta")]
+    index.sync(files)
+    assert len(index) == 2
+
+    index.update = MagicMock(wraps=index.update)
+    files = [make_file("a.js", "alpha"), make_file("c.js", "gamma"), make_file("b.js", "beta", description="Beta")]
+    index.sync(files)
+
+    assert sorted(call.args[0] for call in index.update.call_args_list) == ["b.js", "c.js"]
+    assert len(index) == 3
+
+    index.sync(files[:1])
+    assert len(index) == 1
+    assert "a.js" in index
+
+
+def test_candidates_include_reference_closure():
+    files = [
+        make_file("routes/auth.js", "login route", references=["models/user.js", "missing.js"]),
+        make_file("models/user.js", "const db = require('../utils/db')"),
+        make_file("utils/db.js", "database connection"),
+    ]
+    index = RelevanceIndex()
+    index.sync(files)
+    graph = DependencyGraph()
+    graph.sync(files)
+
+    assert index.candidates("login") == ["routes/auth.js"]
+    assert index.candidates("login", graph=graph) == ["routes/auth.js", "models/user.js"]
+    assert index.candidates("login", graph=graph, hops=2) == ["routes/auth.js", "models/user.js", "utils/db.js"]
+    assert index.candidates("unknown", graph=graph) == []
+
+
+def test_candidate_recall():
+    assert candidate_recall(["a", "b"], ["a", "c"]) == 0.5
+    assert candidate_recall(["a", "b"], ["a"]) == 1.0
+    assert candidate_recall(["a"], []) is None
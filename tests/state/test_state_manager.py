@@ -4,7 +4,10 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from core.config import FileSystemConfig
+from core.db.models import LLMRequest
+from core.llm.request_log import LLMRequestLog
 from core.state.state_manager import StateManager
+from core.telemetry import telemetry
 
 
 @pytest.mark.asyncio
@@ -128,6 +131,41 @@ async def test_commit(mock_get_config, testmanager):
     assert next_state.steps == [{"id": "step-012"}]
 
 
+@pytest.mark.asyncio
+@patch("core.state.state_manager.get_config")
+async def test_log_hedged_llm_request(mock_get_config, testmanager):
+    mock_get_config.return_value.fs.type = "memory"
+    telemetry.clear_counters()
+    sm = StateManager(testmanager)
+    await sm.create_project("test")
+
+    request_log = LLMRequestLog(
+        provider="openai",
+        model="gpt-4o",
+        temperature=0.5,
+        prompt_tokens=100,
+        completion_tokens=50,
+        hedged=True,
+        hedge_winner="backup",
+        hedge_model="gpt-4o-mini",
+        wasted_prompt_tokens=100,
+        wasted_completion_tokens=20,
+    )
+    await sm.log_llm_request(request_log, agent=MagicMock(agent_type="developer"))
+    await sm.commit()
+
+    async with testmanager as session:
+        llm_request = (await session.execute(LLMRequest.__table__.select())).one()
+    assert llm_request.hedge_winner == "backup"
+    assert llm_request.hedge_model == "gpt-4o-mini"
+    assert llm_request.wasted_prompt_tokens == 100
+    assert llm_request.wasted_completion_tokens == 20
+
+    assert telemetry.data["num_llm_hedged_requests"] == 1
+    assert telemetry.data["num_llm_hedge_backup_wins"] == 1
+    assert telemetry.data["num_llm_hedge_wasted_tokens"] == 120
+
+
 @pytest.mark.asyncio
 @patch("core.state.state_manager.get_config")
 async def test_save_file(mock_get_config, testmanager):
@@ -160,6 +198,9 @@ async def test_save_file(mock_get_config, testmanager):
     assert file is not None
     assert file.content.content == "Hello, world!"
 
+    # Assert that file was added to the relevance index
+    assert sm.get_relevance_index().candidates("hello") == ["test.txt"]
+
 
 @pytest.mark.asyncio
 @patch("core.state.state_manager.get_config")
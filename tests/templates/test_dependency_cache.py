@@ -0,0 +1,99 @@
+import os
+from os.path import islink, join
+from sys import platform
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from core.disk.vfs import LocalDiskVFS
+from core.templates.dependency_cache import DependencyCache
+from core.templates.registry import PROJECT_TEMPLATES
+
+
+def install_node_modules(project_dir: str):
+    os.makedirs(join(project_dir, "node_modules", "react", "lib"))
+    os.makedirs(join(project_dir, "node_modules", ".bin"))
+    with open(join(project_dir, "node_modules", "react", "lib", "index.js"), "w") as f:
+        f.write("module.exports = {};\n")
+    with open(join(project_dir, "package-lock.json"), "w") as f:
+        f.write("{}")
+    if platform != "win32":
+        os.symlink(join("..", "react", "lib", "index.js"), join(project_dir, "node_modules", ".bin", "react"))
+
+
+def test_key():
+    assert DependencyCache.key('{"name": "a"}') == DependencyCache.key('{"name": "a"}')
+    assert DependencyCache.key('{"name": "a"}') != DependencyCache.key('{"name": "b"}')
+
+
+def test_store_restore(tmp_path):
+    cache = DependencyCache(str(tmp_path / "cache"))
+    key = cache.key("{}")
+    project1 = str(tmp_path / "project1")
+    project2 = str(tmp_path / "project2")
+    os.makedirs(project2)
+
+    assert cache.restore(key, project2) is False
+    assert cache.store(key, project1) is False
+
+    install_node_modules(project1)
+    assert cache.store(key, project1) is True
+    assert cache.has(key)
+    assert cache.store(key, project1) is False
+
+    assert cache.restore(key, project2) is True
+    index_js = join(project2, "node_modules", "react", "lib", "index.js")
+    with open(index_js) as f:
+        assert f.read() == "module.exports = {};\n"
+    assert (
+        os.stat(index_js).st_ino
+        == os.stat(join(tmp_path, "cache", key, "node_modules", "react", "lib", "index.js")).st_ino
+    )
+    assert os.path.exists(join(project2, "package-lock.json"))
+    if platform != "win32":
+        assert islink(join(project2, "node_modules", ".bin", "react"))
+
+    # Already installed
+    assert cache.restore(key, project2) is False
+
+
+@pytest.mark.asyncio
+@patch("core.templates.base.get_config")
+async def test_install_node_modules_uses_cache(mock_get_config, tmp_path):
+    mock_get_config.return_value.proc.template_dependency_cache = True
+    mock_get_config.return_value.fs.workspace_root = str(tmp_path)
+    TemplateClass = PROJECT_TEMPLATES["javascript_react"]
+
+    async def run_command(cmd, **kwargs):
+        install_node_modules(pm.root_dir)
+        return 0, "", ""
+
+    for project in ["project1", "project2"]:
+        vfs = LocalDiskVFS(str(tmp_path / project))
+        vfs.save("package.json", '{"name": "app"}')
+        sm = MagicMock(file_system=vfs)
+        pm = MagicMock(run_command=AsyncMock(side_effect=run_command), root_dir=vfs.root)
+        template = TemplateClass(TemplateClass.options_class(), sm, pm)
+        await template.install_hook()
+
+        assert os.path.exists(join(vfs.root, "node_modules", "react", "lib", "index.js"))
+        if project == "project1":
+            pm.run_command.assert_awaited_once_with("npm install")
+        else:
+            pm.run_command.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch("core.templates.base.get_config")
+async def test_install_node_modules_without_cache(mock_get_config, tmp_path):
+    mock_get_config.return_value.proc.template_dependency_cache = False
+    vfs = LocalDiskVFS(str(tmp_path / "project"))
+    vfs.save("package.json", '{"name": "app"}')
+    sm = MagicMock(file_system=vfs)
+    pm = MagicMock(run_command=AsyncMock(return_value=(0, "", "")))
+    TemplateClass = PROJECT_TEMPLATES["node_express_mongoose"]
+    template = TemplateClass(TemplateClass.options_class(), sm, pm)
+
+    await template.install_hook()
+
+    pm.run_command.assert_awaited_once_with("npm install")
@@ -1,12 +1,16 @@
 import asyncio
+import base64
 import json
 import sys
+import zlib
+from unittest.mock import patch
 
 import pytest
 
 from core.config import LocalIPCConfig
+from core.disk.vfs import VirtualFileSystem
 from core.ui.base import AgentSource, UIClosedError
-from core.ui.ipc_client import IPCClientUI
+from core.ui.ipc_client import IPCClientUI, ModifiedFilesPager
 
 if sys.platform == "win32":
     pytest.skip(
@@ -46,25 +50,19 @@ class IPCServer:
         """
 
         while len(self.responses):
-            data = await reader.read(65536)
+            # VSCode IPC protocol: first 4 bytes are the message length
+            data_len = int.from_bytes(await reader.readexactly(4), byteorder="big")
+            payload_json = await reader.readexactly(data_len)
 
-            while len(data):
-                # VSCode IPC protocol: first 4 bytes are the message length
-                data_len = int.from_bytes(data[:4], byteorder="big")
-                payload_json = data[4 : 4 + data_len]
+            # Record the incoming message
+            payload = json.loads(payload_json.decode("utf-8"))
+            self.messages.append(payload)
 
-                # Record the incoming message
-                payload = json.loads(payload_json.decode("utf-8"))
-                self.messages.append(payload)
-
-                # Since data can have multiple messages, we need to check
-                # if there are any more responses again here.
-                response = self.responses.pop(0) if len(self.responses) else None
-                if response is not None:
-                    writer.write(json.dumps(response).encode("utf-8"))
-                    await writer.drain()
-
-                data = data[4 + data_len :]
+            response = self.responses.pop(0)
+            if response is not None:
+                response_json = json.dumps(response).encode("utf-8")
+                writer.write(len(response_json).to_bytes(4, byteorder="big") + response_json)
+                await writer.drain()
 
         writer.close()
         await writer.wait_closed()
@@ -111,7 +109,7 @@ async def test_send_message():
 
 @pytest.mark.asyncio
 async def test_stream():
-    server_responses = [None, None, None]
+    server_responses = [None, None]
 
     async with IPCServer(server_responses) as (port, messages):
         src = AgentSource("Product Owner", "product-owner")
@@ -122,18 +120,13 @@ async def test_stream():
 
         for word in ["Hello", "world"]:
             await ui.send_stream_chunk(word, source=src)
-            await asyncio.sleep(0.01)
         await ui.stop()
 
+    # Chunks are coalesced and flushed before any other message
     assert messages == [
         {
             "type": "stream",
-            "content": "Hello",
-            "category": "agent:product-owner",
-        },
-        {
-            "type": "stream",
-            "content": "world",
+            "content": "Helloworld",
             "category": "agent:product-owner",
         },
         {
@@ -264,3 +257,92 @@ async def test_handle_garbage_response():
             await ui.ask_question("Are you sure")
 
         await ui.stop()
+
+
+@pytest.mark.asyncio
+async def test_receive_framed_messages():
+    reader = asyncio.StreamReader()
+    ui = IPCClientUI(LocalIPCConfig(port=1))
+    ui.reader = reader
+
+    payloads = [
+        json.dumps({"type": "response", "content": "first"}).encode(),
+        b"not json",
+        json.dumps({"type": "response", "content": "x" * 100_000}).encode(),
+    ]
+    data = b"".join(len(payload).to_bytes(4, byteorder="big") + payload for payload in payloads)
+    # Feed the data in small pieces, as it would arrive from the socket
+    for i in range(0, len(data), 1000):
+        reader.feed_data(data[i : i + 1000])
+    reader.feed_eof()
+
+    assert (await ui._receive()).content == "first"
+    # The invalid message is skipped
+    assert (await ui._receive()).content == "x" * 100_000
+    with pytest.raises(UIClosedError):
+        await ui._receive()
+
+
+@pytest.mark.asyncio
+async def test_receive_skips_oversized_messages():
+    reader = asyncio.StreamReader()
+    ui = IPCClientUI(LocalIPCConfig(port=1))
+    ui.reader = reader
+
+    ok = json.dumps({"type": "response", "content": "ok"}).encode()
+    with patch("core.ui.ipc_client.RECEIVE_SIZE_LIMIT", 100):
+        reader.feed_data((1000).to_bytes(4, byteorder="big") + b"x" * 1000)
+        reader.feed_data(len(ok).to_bytes(4, byteorder="big") + ok)
+        assert (await ui._receive()).content == "ok"
+
+
+def test_modified_files_pager():
+    files = [
+        {"path": "new.txt", "file_old": None, "file_new": "hello\n"},
+        {"path": "big.txt", "file_old": "".join(f"old {i}\n" for i in range(200)), "file_new": "x\n"},
+        {"path": "small.txt", "file_old": "a\nb\n", "file_new": "a\nc\n"},
+    ]
+    pager = ModifiedFilesPager(files, page_size=500)
+
+    manifest = {entry["path"]: entry for entry in pager.manifest()}
+    assert manifest["new.txt"]["old_size"] is None
+    assert manifest["new.txt"]["line_delta"] == 1
+    assert manifest["big.txt"]["line_delta"] == -199
+    assert manifest["small.txt"]["new_hash"] == VirtualFileSystem.hash_string("a\nc\n")
+
+    pages = list(pager.pages())
+    for page in pages:
+        assert sum(len(part["diff"].encode("utf-8")) for part in page) <= 500
+
+    big_parts = [part for page in pages for part in page if part["path"] == "big.txt"]
+    assert len(big_parts) > 1
+    assert "".join(part["diff"] for part in big_parts) == pager.diff("big.txt")
+    assert pager.diff("new.txt").startswith("--- /dev/null\n+++ b/new.txt\n")
+    assert "-b\n+c\n" in pager.diff("small.txt")
+
+
+@pytest.mark.asyncio
+async def test_send_modified_files():
+    server_responses = [None, None, None, None]
+    files = [
+        {"path": "a.txt", "file_old": "a\n", "file_new": "b\n"},
+        {"path": "b.txt", "file_old": None, "file_new": "new\n"},
+    ]
+
+    async with IPCServer(server_responses) as (port, messages):
+        ui = IPCClientUI(LocalIPCConfig(port=port, compress_modified_files=True))
+        await ui.start()
+        with patch("core.ui.ipc_client.MODIFIED_FILES_PAGE_SIZE", 60):
+            await ui.send_modified_files(files)
+        await ui.stop()
+
+    manifest, *pages, exit_msg = messages
+    assert manifest["type"] == "modifiedFilesManifest"
+    assert [entry["path"] for entry in manifest["content"]["files"]] == ["a.txt", "b.txt"]
+    assert [page["content"]["last"] for page in pages] == [False, True]
+
+    page = pages[0]["content"]
+    assert page["encoding"] == "zlib+base64"
+    decoded = json.loads(zlib.decompress(base64.b64decode(page["files"])))
+    assert decoded[0]["path"] == "a.txt"
+    assert "-a\n+b\n" in decoded[0]["diff"]
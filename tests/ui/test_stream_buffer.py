@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from core.ui.base import AgentSource
+from core.ui.stream_buffer import StreamCoalescer
+
+
+class Sink:
+    def __init__(self):
+        self.sent = []
+
+    async def __call__(self, chunk, source):
+        self.sent.append((chunk, source.type_name if source else None))
+
+
+@pytest.mark.asyncio
+async def test_coalesce_until_end_of_stream():
+    sink = Sink()
+    coalescer = StreamCoalescer(sink, max_delay=10)
+    src = AgentSource("Developer", "developer")
+
+    for word in ["Hello", " ", "world"]:
+        await coalescer.write(word, source=src)
+    assert sink.sent == []
+
+    await coalescer.write(None, source=src)
+    assert sink.sent == [("Hello world", "agent:developer"), (None, "agent:developer")]
+    assert coalescer.n_chunks == 3
+    assert coalescer.n_sent == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_size():
+    sink = Sink()
+    coalescer = StreamCoalescer(sink, max_size=5, max_delay=10)
+
+    await coalescer.write("abc")
+    await coalescer.write("def")
+    await coalescer.write("g")
+    assert sink.sent == [("abcdef", None)]
+    await coalescer.close()
+    assert sink.sent == [("abcdef", None), ("g", None)]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_time():
+    sink = Sink()
+    coalescer = StreamCoalescer(sink, max_delay=0.01)
+
+    await coalescer.write("abc")
+    await coalescer.write("def")
+    await asyncio.sleep(0.05)
+    assert sink.sent == [("abcdef", None)]
+    assert coalescer.flusher is None
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_sources_separate():
+    sink = Sink()
+    coalescer = StreamCoalescer(sink, max_delay=10)
+    dev = AgentSource("Developer", "developer")
+    cmd = AgentSource("Executor", "executor")
+
+    await coalescer.write("a", source=dev)
+    await coalescer.write("1", source=cmd)
+    await coalescer.write("b", source=dev)
+    await coalescer.write(None, source=cmd)
+    assert sink.sent == [("1", "agent:executor"), (None, "agent:executor")]
+
+    await coalescer.flush()
+    assert sink.sent[2:] == [("ab", "agent:developer")]
+    assert not coalescer.pending
+
+
+@pytest.mark.asyncio
+async def test_coalesce_reports_background_errors():
+    async def failing_sink(chunk, source):
+        raise ConnectionError("closed")
+
+    coalescer = StreamCoalescer(failing_sink, max_delay=0.01)
+    await coalescer.write("abc")
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ConnectionError):
+        await coalescer.write("def")